@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiler import compile_program, default_options
+from time_report import TimeReport
+from program_generator import ProgramGenerator
+
+# shapes of the generated programs, each of them stresses different parts of the compiler
+PROGRAMS = {
+    "functions":   {"functions": 2000, "depth": 1, "expression_length": 4, "array_size": 16},
+    "nesting":     {"functions": 50, "depth": 30, "expression_length": 4, "array_size": 16},
+    "expressions": {"functions": 50, "depth": 2, "expression_length": 120, "array_size": 16},
+    "arrays":      {"functions": 200, "depth": 3, "expression_length": 12, "array_size": 8192},
+}
+
+parser = argparse.ArgumentParser(description="Measures the time and the peak allocated memory of each phase of the compiler on large synthetic programs.")
+parser.add_argument("programs", nargs='*', type=str, default=list(PROGRAMS), help=f"Generated programs to be compiled, any of: {', '.join(PROGRAMS)}.")
+parser.add_argument("-x", "--scale", type=float, default=1, help="Multiplier of the number of functions of the generated programs.")
+parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of measured runs, the best time of each phase is reported.")
+parser.add_argument("-o", "--output", type=str, help="Name of a JSON file to write the results to.")
+parser.add_argument("-c", "--compare", type=str, help="Name of a JSON file with earlier results to compare the results with.")
+args = parser.parse_args()
+
+def measure(parameters: dict, repeat: int) -> dict:
+    # the times are measured without tracing of allocations, which slows the compilation down, the peak memory in one more run
+    program = ProgramGenerator(**parameters).generate()
+    with tempfile.NamedTemporaryFile("w", suffix=".c", delete=False) as f:
+        f.write(program)
+        input_file_name = f.name
+    options = default_options(no_comments=True)
+    try:
+        compile_program([input_file_name], options) # the library is loaded and cached before the measurement
+        reports = [TimeReport(trace_memory=False) for _ in range(repeat)] + [TimeReport(trace_memory=True)]
+        for report in reports:
+            compile_program([input_file_name], options, report)
+    finally:
+        os.remove(input_file_name)
+
+    phases = {"total": [report.total for report in reports], **{name: [report.phases[name] for report in reports] for name in reports[0].phases}}
+    return {"parameters": parameters, "lines": program.count('\n'),
+            "phases": {name: {**measurements[0].counts, "time": min(measurement.time for measurement in measurements[:-1]), "peak_memory": measurements[-1].peak_memory}
+                       for name, measurements in phases.items()}}
+
+def compare(results: dict, baseline: dict):
+    print(f"\n{'Program':<12} {'Phase':<20} {'Baseline [ms]':>14} {'Current [ms]':>13} {'Change':>8}")
+    for program, result in results["programs"].items():
+        for phase, measurement in result["phases"].items():
+            baseline_measurement = baseline.get("programs", {}).get(program, {}).get("phases", {}).get(phase)
+            if baseline_measurement and baseline_measurement["time"] > 0:
+                change = (measurement["time"] / baseline_measurement["time"] - 1) * 100
+                print(f"{program:<12} {phase:<20} {baseline_measurement['time'] * 1000:>14.1f} {measurement['time'] * 1000:>13.1f} {change:>+7.1f}%")
+
+if "__main__" == __name__:
+    results = {"python": platform.python_version(), "platform": platform.platform(), "repeat": args.repeat, "programs": {}}
+    for program in args.programs:
+        parameters = {**PROGRAMS[program], "functions": max(1, round(PROGRAMS[program]["functions"] * args.scale))}
+        result = results["programs"][program] = measure(parameters, args.repeat)
+        print(f"{program}: {result['lines']} lines")
+        for phase, measurement in result["phases"].items():
+            counts = ', '.join(f"{name}={count}" for name, count in measurement.items() if name not in ("time", "peak_memory"))
+            print(f"    {phase:<20} {measurement['time'] * 1000:>10.1f} ms {measurement['peak_memory'] / (1024 * 1024):>8.1f} MB  {counts}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(results, json.load(f))
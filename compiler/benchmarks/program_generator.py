@@ -0,0 +1,94 @@
+import argparse
+import random
+
+OPERATORS = ["+", "-", "*", "&", "|", "^", "<<", ">>"]
+CONDITIONS = ["<", ">", "<=", ">=", "==", "!="]
+
+class ProgramGenerator():
+    # generates a valid program of the compiled subset of C, the same parameters and seed always give the same program
+    def __init__(self, functions: int = 1000, depth: int = 6, expression_length: int = 16, array_size: int = 256, seed: int = 0):
+        self.functions = functions
+        self.depth = depth
+        self.expression_length = expression_length
+        self.array_size = array_size
+        self.random = random.Random(seed)
+
+    def generate(self) -> str:
+        lines = [f"int global_{i} = {i * 7 + 1};" for i in range(8)] + [""]
+        for i in range(self.functions):
+            lines += self._function(i) + [""]
+        lines += ["int main()", "{", f"    return f{self.functions - 1}(1, 2);" if self.functions else "    return 0;", "}", ""]
+        return '\n'.join(lines)
+
+    def _function(self, i: int) -> list[str]:
+        # each function calls the previous one, so all of them are reachable from 'main'
+        self.variables = ["a", "b", "x0", f"global_{i % 8}"]
+        lines = [f"int f{i}(int a, int b)", "{", f"    int array[{self.array_size}];", "    int x0 = a + b;"]
+        lines += self._block(self.depth, 1, f"f{i - 1}" if i > 0 else None)
+        lines += [f"    return {self._expression(self.expression_length)};", "}"]
+        return lines
+
+    def _block(self, depth: int, indent: int, callee: str|None) -> list[str]:
+        prefix = "    " * indent
+        name = f"x{indent}"
+        lines = [f"{prefix}int {name} = {self._expression(self.expression_length)};"]
+        self.variables.append(name)
+        if callee is not None and indent == 1:
+            lines.append(f"{prefix}{name} = {name} + {callee}({self._expression(3)}, {self._expression(3)});")
+        lines.append(f"{prefix}array[{self._index()}] = {self._expression(self.expression_length)};")
+        if depth > 0:
+            statement = self.random.choice(["if", "while", "for"])
+            counter = f"i{indent}"
+            if statement == "if":
+                lines.append(f"{prefix}if ({self._condition()})")
+            elif statement == "while":
+                lines.append(f"{prefix}while ({name} < {self.random.randint(0, 100)})")
+            else:
+                lines.append(f"{prefix}for (int {counter} = 0; {counter} < {self.random.randint(2, 16)}; {counter} = {counter} + 1)")
+            lines.append(prefix + "{")
+            lines += self._block(depth - 1, indent + 1, callee)
+            if statement == "while": # the loop variable approaches the bound
+                lines.append(f"{prefix}    {name} = {name} + 1;")
+            lines.append(prefix + "}")
+            if statement == "if":
+                lines += [f"{prefix}else", prefix + "{", f"{prefix}    {name} = {self._expression(self.expression_length)};", prefix + "}"]
+        self.variables.remove(name)
+        return lines
+
+    def _expression(self, length: int) -> str:
+        # a random mix of operands, nested parentheses and array accesses
+        if length <= 1:
+            choice = self.random.random()
+            if choice < 0.6:
+                return self.random.choice(self.variables)
+            elif choice < 0.8:
+                return str(self.random.randint(0, 1000))
+            else:
+                return f"array[{self._index()}]"
+        left = self.random.randint(1, length - 1)
+        expression = f"{self._expression(left)} {self.random.choice(OPERATORS)} {self._expression(length - left)}"
+        return f"({expression})" if self.random.random() < 0.5 else expression
+
+    def _index(self) -> str:
+        return str(self.random.randint(0, self.array_size - 1))
+
+    def _condition(self) -> str:
+        return f"{self._expression(3)} {self.random.choice(CONDITIONS)} {self._expression(3)}"
+
+if "__main__" == __name__:
+    parser = argparse.ArgumentParser(description="Generates a large synthetic program of the compiled subset of C.")
+    parser.add_argument("-f", "--functions", type=int, default=1000, help="Number of generated functions.")
+    parser.add_argument("-d", "--depth", type=int, default=6, help="Nesting depth of the statements in each function.")
+    parser.add_argument("-e", "--expression_length", type=int, default=16, help="Number of operands of the generated expressions.")
+    parser.add_argument("-a", "--array_size", type=int, default=256, help="Size of the local array of each function.")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Seed of the random generator.")
+    parser.add_argument("-o", "--output", type=str, help="Name of a file to write the program to, stdout by default.")
+    args = parser.parse_args()
+
+    program = ProgramGenerator(functions=args.functions, depth=args.depth, expression_length=args.expression_length,
+                               array_size=args.array_size, seed=args.seed).generate()
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(program)
+    else:
+        print(program)
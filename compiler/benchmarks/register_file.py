@@ -0,0 +1,60 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from registers import RegisterFile
+from constructs import Variable, Constant
+from writer import HighAssemblyWriter
+
+parser = argparse.ArgumentParser(description="Measures the throughput of the register file in loaded operands per second on a synthetic operand stream.")
+parser.add_argument("-e", "--expressions", type=int, default=100_000, help="Number of expressions in the operand stream.")
+parser.add_argument("-n", "--number_of_registers", type=int, default=7, help="Number of registers of the register file (at least 7).")
+parser.add_argument("-v", "--variables", type=int, default=16, help="Number of distinct variables used in the expressions.")
+parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of measured runs, the best one is reported.")
+parser.add_argument("--seed", type=int, default=0, help="Seed of the operand stream.")
+args = parser.parse_args()
+
+def operand_stream(expressions: int, variables: list[Variable], seed: int):
+    # expressions like 'a = b op c op ... op d', a variable or a constant per operand
+    generator = random.Random(seed)
+    for _ in range(expressions):
+        operands = [generator.choice(variables) if generator.random() < 0.8 else Constant(value=generator.randrange(100))
+                    for _ in range(generator.randrange(2, 6))]
+        yield generator.choice(variables), operands, generator.random() < 0.05
+
+def run(stream: list, number_of_registers: int) -> int:
+    register_file = RegisterFile(number_of_registers=number_of_registers, writer=HighAssemblyWriter(comments=False))
+    loaded_operands = 0
+    for assigned_variable, operands, control_flow in stream:
+        register_file.load_operand(operands[0])
+        for operand in operands[1:]:
+            register_file.load_operand(operand)
+            register_file.get_for_intermediate_result()
+        loaded_operands += len(operands)
+
+        register_file.clear_last_instruction()
+        register = register_file.load_operand(assigned_variable, False)
+        register_file.write_register(register.name)
+        register_file.clear_last_instruction()
+        register_file.expression_end()
+        if control_flow: # end of a block, like an 'if' or a 'while'
+            register_file.store_written()
+            register_file.invalidate()
+    return loaded_operands
+
+if "__main__" == __name__:
+    variables = [Variable(type="int", name=f"v{i}", stack_offset=-(i + 2)) for i in range(args.variables)]
+    stream = list(operand_stream(args.expressions, variables, args.seed))
+
+    best_time = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        loaded_operands = run(stream, args.number_of_registers)
+        best_time = min(best_time, time.perf_counter() - start)
+
+    print(f"operands:   {loaded_operands}")
+    print(f"time:       {best_time:.3f} s")
+    print(f"throughput: {loaded_operands / best_time:,.0f} operands/s")
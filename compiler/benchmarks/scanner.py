@@ -0,0 +1,43 @@
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scanner import Scanner
+
+parser = argparse.ArgumentParser(description="Measures the throughput of the scanner in tokens per second.")
+parser.add_argument("-s", "--size", type=float, default=4, help="Size of the scanned input in megabytes.")
+parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of measured runs, the best one is reported.")
+args = parser.parse_args()
+
+if "__main__" == __name__:
+    path_to_compiler = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sources = ""
+    for file_name in sorted(glob.glob(os.path.join(path_to_compiler, "sample_programs", "*.c")) + glob.glob(os.path.join(path_to_compiler, "lib", "*.c"))):
+        with open(file_name, "r") as f:
+            sources += f.read() + "\n"
+
+    with tempfile.NamedTemporaryFile("w", suffix=".c", delete=False) as f:
+        input_file_name = f.name
+        size = 0
+        while size < args.size * 1024 * 1024:
+            f.write(sources)
+            size += len(sources)
+
+    try:
+        best_time = float("inf")
+        for _ in range(args.repeat):
+            scanner = Scanner(file_names=[input_file_name])
+            start = time.perf_counter()
+            number_of_tokens = sum(1 for _ in scanner.scan())
+            best_time = min(best_time, time.perf_counter() - start)
+
+        print(f"input:      {size / (1024 * 1024):.2f} MB, {scanner.line_number} lines")
+        print(f"tokens:     {number_of_tokens}")
+        print(f"time:       {best_time:.3f} s")
+        print(f"throughput: {number_of_tokens / best_time:,.0f} tokens/s")
+    finally:
+        os.remove(input_file_name)
@@ -0,0 +1,43 @@
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from target_assembly_generator import TargetAssemblyGenerator
+from high_assembly import parse_instruction
+from writer import Writer
+
+parser = argparse.ArgumentParser(description="Measures the throughput of the target assembly generator in high assembly instructions per second.")
+parser.add_argument("-l", "--lines", type=int, default=200_000, help="Minimal number of translated high assembly instructions.")
+parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of measured runs, the best one is reported.")
+args = parser.parse_args()
+
+if "__main__" == __name__:
+    path_to_compiler = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as build_directory:
+        # the high assembly of the paint program covers the instructions generated from C as well as the hand written libraries
+        high_assembly_file_name = os.path.join(build_directory, "paint.asm")
+        subprocess.run([sys.executable, os.path.join(path_to_compiler, "compiler.py"), os.path.join(path_to_compiler, "sample_programs", "paint.c"),
+                        "-a", os.path.join(path_to_compiler, "sample_programs", "paint_interrupt_handling.json"), 
+                        "-i", high_assembly_file_name, "-o", os.path.join(build_directory, "paint.has")], 
+                       check=True, cwd=path_to_compiler)
+        with open(high_assembly_file_name, "r") as f:
+            high_assembly_code = f.read().split('\n')
+
+    # the compiler hands the instruction records over in memory, the text is parsed only once
+    high_assembly_code = [instruction for instruction in map(parse_instruction, high_assembly_code) if instruction is not None]
+    high_assembly_code = high_assembly_code * (args.lines // len(high_assembly_code) + 1)
+    best_time = float("inf")
+    for _ in range(args.repeat):
+        target_assembly_generator = TargetAssemblyGenerator(high_assembly_code=high_assembly_code, writer=Writer(output_file=io.StringIO()))
+        start = time.perf_counter()
+        target_assembly_generator.generate()
+        best_time = min(best_time, time.perf_counter() - start)
+
+    print(f"instructions: {len(high_assembly_code)}")
+    print(f"time:         {best_time:.3f} s")
+    print(f"throughput:   {len(high_assembly_code) / best_time:,.0f} instructions/s")
@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from variable_table import VariableTable
+from constructs import Variable
+
+parser = argparse.ArgumentParser(description="Measures the throughput of the variable table in lookups per second on deeply nested synthetic functions.")
+parser.add_argument("-f", "--functions", type=int, default=200, help="Number of synthetic functions.")
+parser.add_argument("-d", "--depth", type=int, default=32, help="Nesting depth of the scopes in each function.")
+parser.add_argument("-l", "--lookups", type=int, default=20, help="Number of identifier lookups in each scope.")
+parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of measured runs, the best one is reported.")
+args = parser.parse_args()
+
+def run(functions: int, depth: int, lookups: int) -> int:
+    # the same sequence of calls as the parser makes for functions with a variable declared in every nested block
+    variable_table = VariableTable()
+    variable_table.increase_scope()
+    variable_table.add(Variable(type="int", name="GLOBAL", label="@GLOBAL"))
+    number_of_lookups = 0
+    for function in range(functions):
+        variable_table.increase_scope()
+        variable_table.add(Variable(type="int", name="parameter", stack_offset=2))
+        for level in range(depth):
+            variable_table.increase_scope()
+            variable_table.add(Variable(type="int", name=f"v{level}", stack_offset=-(level + 2)))
+            for i in range(lookups): # variables of all enclosing scopes, the parameter and the global variable
+                name = f"v{i * 7 % (level + 1)}" if i % 4 else ("parameter" if i % 8 else "GLOBAL")
+                if variable_table.find(name) is None:
+                    raise Exception(f"Variable {name} not found.")
+            number_of_lookups += lookups
+        for level in range(depth + 1):
+            variable_table.decrease_scope()
+    return number_of_lookups
+
+if "__main__" == __name__:
+    best_time = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        number_of_lookups = run(args.functions, args.depth, args.lookups)
+        best_time = min(best_time, time.perf_counter() - start)
+
+    print(f"lookups:    {number_of_lookups}")
+    print(f"time:       {best_time:.3f} s")
+    print(f"throughput: {number_of_lookups / best_time:,.0f} lookups/s")
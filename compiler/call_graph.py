@@ -0,0 +1,38 @@
+from enums import HighAssemblyInstructions
+from constructs import Function, ReturnValue
+from high_assembly import Instruction, FUNCTION_LABELS
+
+class CallGraph():
+    # functions calling each other, only the functions reachable from 'main' and from the interrupt handlers are emitted
+    def __init__(self):
+        self.calls: dict[str, set[str]] = {}
+        self.roots: set[str] = {"main"}
+
+    def add_function(self, function: Function):
+        self.calls[function.name] = {command.function.name for command in function.body if isinstance(command, ReturnValue)}
+
+    def add_assembly_function(self, function_name: str|None, instructions: list[Instruction]):
+        # every identifier naming a function is a call, i.e. the target of a CALL, a jump or the handler of a SISA
+        # code outside of functions is always emitted, so everything it refers to is reachable
+        calls = self.calls.setdefault(function_name, set()) if function_name is not None else self.roots
+        for instruction in instructions:
+            if instruction.opcode in FUNCTION_LABELS:
+                continue
+            identifiers = [operand for operand in instruction.operands if isinstance(operand, str)]
+            calls.update(identifiers)
+            if instruction.opcode == HighAssemblyInstructions.SISA: # interrupt handlers are called by the hardware
+                self.roots.update(identifiers)
+
+    def reachable(self) -> set[str]:
+        reachable = set()
+        stack = [root for root in self.roots if root in self.calls]
+        while stack:
+            function_name = stack.pop()
+            if function_name not in reachable:
+                reachable.add(function_name)
+                stack += [callee for callee in self.calls[function_name] if callee in self.calls and callee not in reachable]
+        return reachable
+
+    def __str__(self) -> str:
+        reachable = self.reachable()
+        return '\n'.join([f"{name}{'' if name in reachable else ' (unreachable)'}: {', '.join(sorted(calls & self.calls.keys()))}" for name, calls in self.calls.items()])
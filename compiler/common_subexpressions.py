@@ -0,0 +1,145 @@
+from enums import InternalAlphabet, Keywords, Operators, TargetAssemblyInstructions, Types
+from constructs import Comment, Constant, Function, IntermediateResult, ReturnValue, Variable
+from high_assembly_generator import FIRST_OPERAND_OPERATORS, INDIRECT_MEMORY_OPERATORS, INTERMEDIATE_RESULT_OPERATORS
+from register_allocation import BOUNDARY_COMMANDS
+from inliner import local_variable
+from loop_invariants import LOAD_OPERATORS, STORE_OPERATORS, assignment, computation_positions, replaced_statement
+from strength_reduction import INSTRUCTION_COSTS
+
+# instructions computing an operator, the multiplications run in the multi-cycle multiplier and the indexed loads add the address first,
+# the other operators take one instruction
+OPERATOR_COSTS = {Operators.MULTIPLY: INSTRUCTION_COSTS[TargetAssemblyInstructions.MUL], Operators.OFFSET_DEREFERENCE: 2}
+# instructions of the variable holding a repeated computation, i.e. the move of the computed value to it and its store at the end of the block
+VARIABLE_COST = 2
+
+class CommonSubexpressionElimination():
+    # computes the computations repeated in a basic block, i.e. in the statements between two keywords or scope boundaries, once to a new
+    # local variable assigned before the statement of the first one and uses the variable in all of them, the computations are numbered by
+    # their operators and operands with the versions of the variables, which change with their assignments, and of the memory, which changes
+    # with the stores and the calls, so the repeated computations have the same values, the conditions and the headers of 'for' loops stay
+    def __init__(self) -> None:
+        self.eliminated = 0 # number of replaced repetitions
+        self.function_variables = 0
+
+    def eliminate(self, functions: list[Function]):
+        for function in functions:
+            self._eliminate_function(function)
+
+    def _eliminate_function(self, function: Function):
+        self.function_variables = 0
+        new_body = []
+        block: list[list] = [] # statements of the current basic block, a comment is a statement on its own
+        header_statements = 0 # statements of the header of a 'for' loop, which stay as they are
+        keyword = None
+        start = 0
+        for i, command in enumerate(function.body):
+            if isinstance(command, Keywords) or command in BOUNDARY_COMMANDS:
+                new_body += self._eliminate_block(function, block) + [command]
+                block = []
+                if command == InternalAlphabet.SCOPE_INCREMENT:
+                    header_statements = 3 if keyword == Keywords.FOR else 0
+                    keyword = None
+                elif isinstance(command, Keywords):
+                    keyword = command
+                start = i + 1
+            elif isinstance(command, Comment) and i == start:
+                block.append([command])
+                start = i + 1
+            elif command == InternalAlphabet.EXPRESSION_END:
+                statement = function.body[start:i + 1]
+                if header_statements > 0 or start > 0 and isinstance(function.body[start - 1], Keywords) or InternalAlphabet.EQUAL_ZERO_JUMP in statement:
+                    header_statements = max(header_statements - 1, 0)
+                    new_body += self._eliminate_block(function, block) + statement
+                    block = []
+                else:
+                    block.append(statement)
+                start = i + 1
+        function.body = new_body + self._eliminate_block(function, block) + function.body[start:]
+
+    def _eliminate_block(self, function: Function, block: list[list]) -> list:
+        # the statements of the block with the repeated computations replaced by variables
+        versions: dict[Variable, int] = {}
+        memory = 0
+        occurrences: dict[tuple, list[tuple[int, int, list[int]]]] = {} # statement, position and computation of each occurrence of a computation
+        assigned: list[set[Variable]] = [set() for _ in block] # variables assigned in each statement
+        for s, statement in enumerate(block):
+            if isinstance(statement[0], Comment):
+                continue
+            produced = [p for p, command in enumerate(statement) if command in INTERMEDIATE_RESULT_OPERATORS]
+            operands = lambda p: [p - 1] if statement[p] in FIRST_OPERAND_OPERATORS or statement[p] in INDIRECT_MEMORY_OPERATORS or statement[p] == Operators.UNARY_PLUS else [p - 2, p - 1]
+            referenced = {command.number for command in statement if isinstance(command, IntermediateResult)}
+            keys: dict[int, tuple|None] = {}
+            changed = False # a call or an assignment in the statement changed the operands of the following computations
+            for p, command in enumerate(statement):
+                if isinstance(command, ReturnValue):
+                    memory += 1
+                    changed = True
+                elif command == Operators.ASSIGNMENT:
+                    target = statement[p - 2]
+                    if isinstance(target, Variable):
+                        versions[target] = versions.get(target, 0) + 1
+                        assigned[s].add(target)
+                    else: # a store through a pointer or to an array
+                        memory += 1
+                    changed = True
+                elif command in INTERMEDIATE_RESULT_OPERATORS:
+                    keys[p] = None
+                    if changed or command in STORE_OPERATORS:
+                        continue
+                    key = [command, memory if command in LOAD_OPERATORS else None]
+                    for q in operands(p):
+                        operand = statement[q]
+                        if isinstance(operand, IntermediateResult):
+                            key.append(keys[produced[operand.number]])
+                        elif isinstance(operand, Constant):
+                            key.append((Constant, operand.value))
+                        elif isinstance(operand, Variable):
+                            key.append((operand, versions.get(operand, 0), memory if operand.global_scope else None))
+                        else:
+                            key.append(None)
+                    if None not in key[2:]:
+                        keys[p] = tuple(key)
+                        if produced.index(p) in referenced: # the result of the statement itself is not computed again
+                            occurrences.setdefault(keys[p], []).append((s, p, computation_positions(statement, p, produced, operands)))
+
+        # the largest computations first, a computation inside a replaced one is not repeated any more
+        replaced: dict[int, dict[int, Variable]] = {}
+        removed: dict[int, set[int]] = {}
+        assignments: dict[int, list] = {}
+        for key, computations in sorted(occurrences.items(), key=lambda item: -len(item[1][0][2])):
+            computations = [(s, p, computation) for s, p, computation in computations if p not in removed.get(s, ())]
+            cost = sum(OPERATOR_COSTS.get(block[s][r], 1) for s, _, computation in computations[:1] for r in computation if block[s][r] in INTERMEDIATE_RESULT_OPERATORS)
+            if len(computations) < 2 or (len(computations) - 1) * cost <= VARIABLE_COST:
+                continue
+            self.eliminated += len(computations) - 1
+            s, p, computation = computations[0]
+            statement = block[s]
+            produced = [r for r, command in enumerate(statement) if command in INTERMEDIATE_RESULT_OPERATORS]
+            target = statement[-4] if (statement[-2] == Operators.ASSIGNMENT and isinstance(statement[-3], IntermediateResult) and
+                                       statement[-3].number == produced.index(p)) else None
+            if (isinstance(target, Variable) and not target.global_scope and target.type != Types.ARRAY and computations[1][0] > s and
+                not any(target in assigned[t] for t in range(s + 1, computations[-1][0]))): # the variable assigned the first computation keeps its value
+                variable = target
+                computations = computations[1:]
+            else:
+                variable = local_variable(function, Variable("int", name=str(self.function_variables)), "common")
+                self.function_variables += 1
+                assignments.setdefault(s, []).extend(assignment([statement[r] for r in computation], computation, produced, variable))
+            for s, p, computation in computations:
+                number = [r for r, command in enumerate(block[s]) if command in INTERMEDIATE_RESULT_OPERATORS].index(p)
+                reference = next(r for r, command in enumerate(block[s]) if isinstance(command, IntermediateResult) and command.number == number)
+                replaced.setdefault(s, {})[reference] = variable
+                removed.setdefault(s, set()).update(computation)
+
+        new_block = []
+        for s, statement in enumerate(block):
+            if s in assignments: # before the comments preceding the statement
+                position = len(new_block)
+                while position > 0 and isinstance(new_block[position - 1], Comment):
+                    position -= 1
+                new_block[position:position] = assignments[s]
+            if s in replaced:
+                produced = [p for p, command in enumerate(statement) if command in INTERMEDIATE_RESULT_OPERATORS]
+                statement = replaced_statement(statement, replaced[s], removed[s], produced)
+            new_block += statement
+        return new_block
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import pickle
+import sys
+from constructs import Function, FunctionCall, Variable
+from high_assembly import Instruction
+
+class LibraryUnit():
+    # everything a library file contributes to a compilation, restored from the cache instead of scanning, parsing and generating it again
+    def __init__(self, functions: list[Function], function_calls: list[FunctionCall]|None = None, global_expressions: list|None = None,
+                 sections: list[tuple[str|None, list[Instruction], list[str]]]|None = None):
+        self.functions = functions
+        self.function_calls = function_calls if function_calls is not None else []
+        self.global_expressions = global_expressions if global_expressions is not None else []
+        # high assembly of each function, as records and as the text written when an intermediate file is requested
+        self.sections = sections if sections is not None else []
+
+    def global_variables(self) -> list[Variable]:
+        return [expression for expression in self.global_expressions if isinstance(expression, Variable)]
+
+    def external_global_variables(self) -> set[str]:
+        # global variables used by the functions of the unit but defined elsewhere, the unit is valid only if they are still defined
+        defined = {variable.name for variable in self.global_variables()}
+        return {command.name for function in self.functions for command in function.body 
+                if isinstance(command, Variable) and command.global_scope and command.name not in defined}
+
+class CompilationCache():
+    # persistent cache of library units keyed by the content of their files and the version of the compiler
+    def __init__(self, directory: str, options: str = "", enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.memory: dict[str, LibraryUnit] = {} # units already loaded or stored by this process
+        self.version = self._compiler_version(options) if enabled else ""
+
+    def key(self, *contents: str|bytes) -> str:
+        key = hashlib.sha256(self.version.encode())
+        for content in contents: # lengths are hashed too, so the contents cannot shift between each other
+            content = content.encode() if isinstance(content, str) else content
+            key.update(f"{len(content)}:".encode())
+            key.update(content)
+        return key.hexdigest()
+
+    def load(self, key: str) -> LibraryUnit|None:
+        if not self.enabled:
+            return None
+        elif key in self.memory:
+            self.hits += 1
+            return self.memory[key]
+
+        try:
+            with open(os.path.join(self.directory, key), "rb") as f:
+                unit = pickle.load(f)
+        except Exception: # missing, truncated or written by an incompatible version, the unit is compiled again
+            unit = None
+
+        if unit is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.memory[key] = unit
+        return unit
+
+    def store(self, key: str, unit: LibraryUnit):
+        if not self.enabled:
+            return
+
+        self.memory[key] = unit
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary_file_name = os.path.join(self.directory, f"{key}.{os.getpid()}.tmp")
+            with open(temporary_file_name, "wb") as f:
+                pickle.dump(unit, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_file_name, os.path.join(self.directory, key)) # concurrent compilations never see a partial file
+        except OSError: # the compilation does not depend on the cache being writable
+            pass
+
+    def _compiler_version(self, options: str) -> str:
+        # sources of the compiler itself, any change of the compiler invalidates all cached units
+        version = hashlib.sha256(f"{sys.version_info.major}.{sys.version_info.minor} {options}".encode())
+        compiler_directory = os.path.dirname(os.path.abspath(__file__))
+        for file_name in sorted(os.listdir(compiler_directory)):
+            if file_name.endswith(".py"):
+                with open(os.path.join(compiler_directory, file_name), "rb") as f:
+                    version.update(f.read())
+        return version.hexdigest()
@@ -0,0 +1,85 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+import traceback
+from typing import Callable
+
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "build", "compiler.sock")
+
+class CompileRequestHandler(socketserver.StreamRequestHandler):
+    # a request is a line with a JSON object {"arguments": [...], "directory": "..."},
+    # the response is a line with a JSON object {"exit_code": ..., "stdout": "...", "stderr": "..."}
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        stdout, stderr = io.StringIO(), io.StringIO()
+        directory = os.getcwd()
+        try:
+            os.chdir(request["directory"]) # relative file names are relative to the directory of the client
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                exit_code = self.server.compile(request["arguments"])
+        except SystemExit as e: # e.g. invalid arguments
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            stderr.write(traceback.format_exc())
+            exit_code = 1
+        finally:
+            os.chdir(directory)
+        self.wfile.write(json.dumps({"exit_code": exit_code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}).encode() + b"\n")
+
+class CompileServer(socketserver.UnixStreamServer):
+    # compiles programs in one long running process, so the library, the compiled regular expressions and the caches stay loaded
+    def __init__(self, socket_path: str, compile: Callable[[list[str]], int]):
+        if os.path.exists(socket_path): # left by a server, which did not exit cleanly
+            os.remove(socket_path)
+        super().__init__(socket_path, CompileRequestHandler)
+        self.socket_path = socket_path
+        self.compile = compile
+
+def serve(socket_path: str, compile: Callable[[list[str]], int]) -> int:
+    with CompileServer(socket_path, compile) as server:
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+    return 0
+
+def request(socket_path: str, arguments: list[str]) -> int:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps({"arguments": arguments, "directory": os.getcwd()}).encode() + b"\n")
+        with client.makefile("rb") as f:
+            response = json.loads(f.readline())
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["exit_code"]
+
+def watch(file_names: Callable[[], list[str]], compile: Callable[[], int], interval: float = 0.2) -> int:
+    # compiles again whenever any of the files changes, until interrupted
+    modification_times = None
+    try:
+        while True:
+            current_modification_times = {file_name: os.path.getmtime(file_name) if os.path.exists(file_name) else None for file_name in file_names()}
+            if current_modification_times != modification_times:
+                modification_times = current_modification_times
+                start = time.perf_counter()
+                exit_code = compile()
+                print(f"[{time.strftime('%H:%M:%S')}] {'compiled' if exit_code == 0 else 'failed'} in {(time.perf_counter() - start) * 1000:.0f} ms", file=sys.stderr)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        return 0
+
+if "__main__" == __name__:
+    # lightweight client of a running 'compiler.py --serve', it does not import the compiler
+    parser = argparse.ArgumentParser(description="Compiles a program by a running 'compiler.py --serve', other arguments are passed to the compiler.")
+    parser.add_argument("-S", "--socket", type=str, default=DEFAULT_SOCKET, help="Socket of the compile server.")
+    args, compiler_arguments = parser.parse_known_args()
+    exit(request(args.socket, compiler_arguments))
@@ -2,6 +2,7 @@ import argparse
 import os
 import sys
 import json
+import io
 from target_assembly_generator import TargetAssemblyGenerator
 from high_assembly_generator import HighAssemblyGenerator
 from registers import RegisterFile
@@ -12,117 +13,214 @@ from variable_table import VariableTable
 from scanner import Scanner
 from parser import Parser
 from global_expressions import GlobalExpressions
-from writer import Writer
-from constructs import Function, Variable
-
-parser = argparse.ArgumentParser()
-parser.add_argument("file_names", nargs='+', type=str, help="Names of files to be compiled.")
-parser.add_argument("-a", "--assembly", nargs='+', type=str, help="Names of configuration files with linkable high level assembly.")
-parser.add_argument("-s", "--same", action="store_true", help="Use the name of first input file as names for output files.")
-parser.add_argument("-i", "--intermediate", type=str, help="Name of a file to write compiled code to high level assembly.")
-parser.add_argument("-o", "--output", type=str, help="Name of a file to write compiled code to HaDes assembly.")
-parser.add_argument("-c", "--compile", action="store_true", help="Compile to binary.")
-parser.add_argument("-nl", "--no_library", action="store_true", help="Do not include library functions.")
-parser.add_argument("-nb", "--no_build_in", action="store_true", help="Do not include build in functions.")
-parser.add_argument("-g", "--global_variables", type=str, default="global_variables.json", help="Name of a file containing global variable definitions.")
-parser.add_argument("-d", "--debug", action="store_true", help="Print the internal state of the compiler to stderr.")
-args = parser.parse_args()
+from writer import Writer, HighAssemblyWriter
+from constructs import Variable
+from enums import CallingConventions
+from high_assembly import Instruction
+from compilation_cache import CompilationCache, LibraryUnit
+from library import Library, assembly_unit
+from call_graph import CallGraph
+from parallel_generator import ParallelGenerator
+from compile_server import serve, watch, DEFAULT_SOCKET
+from time_report import TimeReport
+from peephole import PeepholeOptimizer, RULES as PEEPHOLE_RULES
+from inliner import Inliner, INLINE_LIMIT
+from loop_invariants import LoopInvariantCodeMotion
+from common_subexpressions import CommonSubexpressionElimination
 
-if "__main__" == __name__:
-    c_program = ""
-    os.makedirs(os.path.join(os.path.dirname(__file__), "build"), exist_ok=True)
-    for file_name in args.file_names:
-        with open(file_name, "r") as f:
-            c_program += f.read()
-    
-    path_to_lib = os.path.join(os.path.dirname(__file__), "lib")
-    if not args.no_library:
-        # include library functions in *.c files in lib directory
-        for file_name in os.listdir(path_to_lib):
-            if file_name.endswith(".c"):
-                with open(os.path.join(path_to_lib, file_name), "r") as f:
-                    c_program += f.read()
-
-    if args.same:
-        args.file_name = args.file_names[0]
-        if '/' in args.file_name:
-            args.file_name = args.file_name[args.file_name.rfind('/') + 1:]
-        args.same = args.file_name[:args.file_name.rfind('.')]
-        args.intermediate = args.file_name[:args.file_name.rfind('.')] + ".asm"
-        args.output = args.file_name[:args.file_name.rfind('.')] + ".has"
-    
-    if args.intermediate:
-        args.intermediate = os.path.join(os.path.dirname(__file__), "build", args.intermediate)
-        high_assembly_file = open(args.intermediate, "w")
-    else:
-        high_assembly_file = None
-
-    if args.output:
-        args.output = os.path.join(os.path.dirname(__file__), "build", args.output)
-        target_assembly_file = open(args.output, "w")
-    else:
-        target_assembly_file = sys.stdout    
-    
+COMPILER_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+def argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file_names", nargs='*', type=str, help="Names of files to be compiled.")
+    parser.add_argument("-a", "--assembly", nargs='+', type=str, help="Names of configuration files with linkable high level assembly.")
+    parser.add_argument("-s", "--same", action="store_true", help="Use the name of first input file as names for output files.")
+    parser.add_argument("-i", "--intermediate", type=str, help="Name of a file to write compiled code to high level assembly.")
+    parser.add_argument("-o", "--output", type=str, help="Name of a file to write compiled code to HaDes assembly.")
+    parser.add_argument("-c", "--compile", action="store_true", help="Compile to binary.")
+    parser.add_argument("-nl", "--no_library", action="store_true", help="Do not include library functions.")
+    parser.add_argument("-nb", "--no_build_in", action="store_true", help="Do not include build in functions.")
+    parser.add_argument("-g", "--global_variables", type=str, default="global_variables.json", help="Name of a file containing global variable definitions.")
+    parser.add_argument("-nc", "--no_comments", action="store_true", help="Do not annotate the generated assembly with comments.")
+    parser.add_argument("-nca", "--no_cache", action="store_true", help="Do not use the compilation cache of library functions.")
+    parser.add_argument("-cd", "--cache_directory", type=str, default="cache", help="Name of a directory in which the compiled library functions are cached.")
+    parser.add_argument("-nf", "--no_folding", action="store_true", help="Do not evaluate constant expressions and do not propagate known values of local variables at compile time.")
+    parser.add_argument("-nsr", "--no_strength_reduction", action="store_true", help="Do not replace multiplications by constants with shifts, additions and subtractions.")
+    parser.add_argument("-nra", "--no_register_allocation", action="store_true", help="Do not keep the most used local variables in registers across statements and loops.")
+    parser.add_argument("-nmf", "--no_minimal_frames", action="store_true", help="Save all general purpose registers and set the frame pointer in every function.")
+    parser.add_argument("-ntc", "--no_tail_calls", action="store_true", help="Call a function returning its own recursive call instead of jumping to its start.")
+    parser.add_argument("-nsc", "--no_short_circuits", action="store_true", help="Evaluate the conditions of 'if', 'while' and 'for' statements as a whole instead of jumping, as soon as their value is known.")
+    parser.add_argument("-ni", "--no_inlining", action="store_true", help="Do not replace calls of small functions by their bodies.")
+    parser.add_argument("-il", "--inline_limit", type=int, default=INLINE_LIMIT,
+                        help=f"Maximal growth of a function by an inlined call, i.e. the size of the callee minus the cost of the call, {INLINE_LIMIT} by default.")
+    parser.add_argument("-ir", "--inline_report", action="store_true", help="Print the calls considered for inlining, their costs and whether they were inlined to stderr.")
+    parser.add_argument("-nli", "--no_loop_invariants", action="store_true", help="Do not move the computations of loops, whose operands do not change in the loop, before the loop.")
+    parser.add_argument("-ncs", "--no_common_subexpressions", action="store_true", help="Compute a computation repeated in a basic block with the same operands each time instead of once to a variable.")
+    parser.add_argument("-pr", "--peephole_rules", nargs='*', type=str, default=list(PEEPHOLE_RULES), choices=list(PEEPHOLE_RULES), metavar="RULE",
+                        help=f"Rules of the peephole optimization of the HaDes assembly, any of: {', '.join(PEEPHOLE_RULES)}, all of them by default, none disables it.")
+    parser.add_argument("-ps", "--peephole_statistics", action="store_true", help="Print the number of instructions removed by each rule of the peephole optimization to stderr.")
+    parser.add_argument("-ku", "--keep_unused", action="store_true", help="Emit also functions, which are not reachable from 'main' or from an interrupt handler.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes generating the functions in parallel.")
+    parser.add_argument("-b", "--batch", action="store_true", help="Compile each file as a separate program in one process, outputs are named as with '--same'.")
+    parser.add_argument("-tr", "--time_report", nargs='?', type=str, const="table", choices=["table", "json"],
+                        help="Print the wall time, the counts of tokens and instructions and the peak allocated memory of each phase and function to stderr.")
+    parser.add_argument("-sv", "--serve", nargs='?', type=str, const=DEFAULT_SOCKET, metavar="SOCKET",
+                        help="Compile the programs sent by 'compile_server.py' to a UNIX socket in one long running process.")
+    parser.add_argument("-w", "--watch", action="store_true", help="Compile again whenever an input file or a library file changes.")
+    parser.add_argument("-d", "--debug", action="store_true", help="Print the internal state of the compiler to stderr.")
+    return parser
+
+def default_options(**options) -> argparse.Namespace:
+    # options of the command line with their default values, e.g. default_options(no_comments=True, intermediate=True)
+    return argparse.Namespace(**{**vars(argument_parser().parse_args([])), **options})
+
+class CompilationArtifacts():
+    def __init__(self, target_assembly: str, high_assembly: str|None, high_assembly_code: list[Instruction], function_declaration_table: FunctionDeclarationTable,
+                 time_report: TimeReport, peephole_optimizer: PeepholeOptimizer, inliner: Inliner):
+        self.target_assembly = target_assembly        # HaDes assembly
+        self.high_assembly = high_assembly            # text of the high assembly, only when 'intermediate' is set in the options
+        self.high_assembly_code = high_assembly_code  # high assembly as instruction records
+        self.function_declaration_table = function_declaration_table
+        self.time_report = time_report                # measurements of the phases, only when 'time_report' is set in the options
+        self.peephole_optimizer = peephole_optimizer  # rules applied to the HaDes assembly and the numbers of instructions they removed
+        self.inliner = inliner                        # calls considered for inlining
+
+# libraries and caches shared by the programs compiled with the same options in this process
+libraries: dict[tuple, Library] = {}
+compilation_caches: dict[tuple, CompilationCache] = {}
+
+def load_library(options: argparse.Namespace) -> Library:
+    cache_key = (options.cache_directory, options.no_comments, options.no_folding, options.no_register_allocation, options.no_minimal_frames, options.no_tail_calls, options.no_short_circuits, options.no_cache)
+    if cache_key not in compilation_caches:
+        compilation_caches[cache_key] = CompilationCache(directory=os.path.join(COMPILER_DIRECTORY, "build", options.cache_directory),
+                                                         options=f"comments={not options.no_comments},folding={not options.no_folding},register_allocation={not options.no_register_allocation},minimal_frames={not options.no_minimal_frames},tail_calls={not options.no_tail_calls},short_circuits={not options.no_short_circuits}", enabled=not options.no_cache)
+    library_key = cache_key + (options.global_variables, options.no_build_in, options.no_library)
+    if library_key not in libraries or not libraries[library_key].is_current():
+        libraries[library_key] = Library(path=os.path.join(COMPILER_DIRECTORY, "lib"), global_variables_file_name=options.global_variables,
+                                         compilation_cache=compilation_caches[cache_key], comments=not options.no_comments,
+                                         build_in=not options.no_build_in, c_library=not options.no_library)
+    return libraries[library_key]
+
+def compile_program(sources: list[str], options: argparse.Namespace, time_report: TimeReport|None = None) -> CompilationArtifacts:
+    # compiles the C source files 'sources' to a single program, raises an exception when the program is not valid
+    if time_report is None:
+        time_report = TimeReport(enabled=bool(options.time_report))
+    with time_report:
+        return _compile_program(sources, options, time_report)
+
+def _compile_program(sources: list[str], options: argparse.Namespace, time_report: TimeReport) -> CompilationArtifacts:
+    with time_report.phase("library"):
+        library = load_library(options)
+    compilation_cache = library.compilation_cache
     function_declaration_table = FunctionDeclarationTable()
-    high_assembly_writer = Writer(in_file=args.intermediate, in_memory=True, output_file=high_assembly_file)
+    high_assembly_writer = HighAssemblyWriter(in_file=bool(options.intermediate), output_file=io.StringIO(), buffered=True, comments=not options.no_comments)
     variable_table = VariableTable()
 
-    with open(os.path.join(path_to_lib, args.global_variables), "r") as f:
-        global_variables = json.load(f)
-        variable_table.increase_scope()
-        for variable in global_variables:
-            type, name, value = variable["type"], variable["name"], variable["value"]
-            variable_table.add(Variable(type=type, name=name, label=f"@{name}"))
-            high_assembly_writer.raw(f"@{name}: {value}")
-
-    if not args.no_build_in:
-        # include build in functions in *.asm files in lib directory described by *.json files
-        path_to_lib = os.path.join(os.path.dirname(__file__), "lib")
-        for file_name in os.listdir(path_to_lib):
-            if file_name.endswith(".json"):
-                with open(os.path.join(path_to_lib, file_name), "r") as f:
+    variable_table.increase_scope()
+    for variable in library.global_variables:
+        type, name, value = variable["type"], variable["name"], variable["value"]
+        variable_table.add(Variable(type=type, name=name, label=f"@{name}"))
+        high_assembly_writer.global_variable(name, value)
+
+    # high assembly of build in functions and of linked assembly files, emitted when the reachable functions are known
+    assembly_units: list[LibraryUnit] = list(library.assembly_units)
+    if options.assembly:
+        with time_report.phase("linked assembly"):
+            for assembly_file in options.assembly:
+                with open(assembly_file, "r") as f:
                     asm_config = json.load(f)
-                    if isinstance(asm_config, list):
-                        continue
-                    file_name = asm_config["file_name"]
-                    with open(os.path.join(path_to_lib, file_name), "r") as f:
-                        for line in f.readlines():
-                            high_assembly_writer.raw(line.rstrip())
-                    
-                    for function in asm_config["functions"]:
-                        function_declaration_table.add(Function(name=function["name"], number_of_parameters=function["number_of_parameters"], return_type=function["return_type"]))
-
-    if args.assembly:
-        for assembly_file in args.assembly:
-            with open(assembly_file, "r") as f:
-                asm_config = json.load(f)
-                with open(asm_config["file_name"], "r") as f:
-                    for line in f.readlines():
-                        high_assembly_writer.raw(line.rstrip())
+                    with open(asm_config["file_name"], "r") as f:
+                        assembly_units.append(assembly_unit(asm_config, f.read(), library.unit_writer()))
 
-                for function in asm_config["functions"]:
-                    function_declaration_table.add(Function(name=function["name"], number_of_parameters=function["number_of_parameters"], return_type=function["return_type"]))
+    calling_conventions: dict[str, CallingConventions] = {}
+    for unit in assembly_units:
+        for function in unit.functions:
+            function_declaration_table.add(function)
+            if function.calling_convention != CallingConventions.STACK:
+                calling_conventions[function.name] = function.calling_convention
+    # the code calling the assembly functions depends on their calling conventions
+    calling_conventions_key = ",".join(f"{name}={calling_convention.value}" for name, calling_convention in sorted(calling_conventions.items()))
 
     function_call_table = FunctionCallTable()
     global_expressions = GlobalExpressions()
-    scanner = Scanner(program=c_program)
-    parser = Parser(function_declaration_table=function_declaration_table, function_call_table=function_call_table, 
-                    variable_table=variable_table, global_expressions=global_expressions)
+    scanner = Scanner(file_names=sources)
+    parser = Parser(function_declaration_table=function_declaration_table, function_call_table=function_call_table,
+                    variable_table=variable_table, global_expressions=global_expressions, constant_folding=not options.no_folding)
     semantic_analyzer = SemanticAnalyzer(function_declaration_table=function_declaration_table, function_call_table=function_call_table,
                                          variable_table=variable_table)
     register_file = RegisterFile(number_of_registers=7, writer=high_assembly_writer)
-    high_assembly_generator = HighAssemblyGenerator(function_declaration_table=function_declaration_table, variable_table=variable_table, 
-                                                    global_code=global_expressions, register_file=register_file, writer=high_assembly_writer)
-    target_assembly_writer = Writer(in_file=True, in_memory=False, output_file=target_assembly_file)
-    target_assembly_generator = TargetAssemblyGenerator(high_assembly_code=high_assembly_writer.retrieve_memory(), 
-                                                        writer=target_assembly_writer)
+    high_assembly_generator = HighAssemblyGenerator(function_declaration_table=function_declaration_table, variable_table=variable_table,
+                                                    global_code=global_expressions, register_file=register_file, writer=high_assembly_writer,
+                                                    register_allocation=not options.no_register_allocation, minimal_frames=not options.no_minimal_frames,
+                                                    calling_conventions=calling_conventions, tail_calls=not options.no_tail_calls, short_circuits=not options.no_short_circuits)
+    target_assembly_writer = Writer(in_file=True, in_memory=False, output_file=io.StringIO(), buffered=True, comments=not options.no_comments)
+    target_assembly_generator = TargetAssemblyGenerator(high_assembly_code=high_assembly_writer.retrieve_memory(),
+                                                        writer=target_assembly_writer, strength_reduction=not options.no_strength_reduction)
+    peephole_optimizer = PeepholeOptimizer(rules=options.peephole_rules)
+    inliner = Inliner(functions=function_declaration_table.functions, inline_limit=options.inline_limit)
 
     try:
-        for expression in scanner.scan():
-            parser.parse(*expression)
-        
-        semantic_analyzer.analyze()
-        if args.debug:
+        with time_report.phase("parse"):
+            for expression in time_report.iterate("scan", scanner.scan(), unit="tokens"):
+                parser.parse(*expression)
+        user_functions = list(function_declaration_table.functions.values())
+
+        # library files are parsed after the user files one by one, each of them is either restored from the cache or compiled as a unit
+        library_units: list[tuple[str, LibraryUnit, bool]] = []
+        for library_file_name, source in library.sources:
+            with time_report.phase("cache"):
+                key = compilation_cache.key(source, parser.carried_state(), calling_conventions_key)
+                library_unit = compilation_cache.load(key)
+            if library_unit is not None and all(variable_table.exists(name) for name in library_unit.external_global_variables()):
+                for variable in library_unit.global_variables():
+                    variable_table.add(variable)
+                global_expressions.add(library_unit.global_expressions)
+                for function in library_unit.functions:
+                    function_declaration_table.add(function)
+                for function_call in library_unit.function_calls:
+                    function_call_table.add(function_call)
+                library_units.append((key, library_unit, True))
+            else:
+                declared_functions = set(function_declaration_table.functions)
+                function_calls = set(map(id, function_call_table.functions.values()))
+                number_of_global_expressions = len(global_expressions.expressions)
+                with time_report.phase("parse"):
+                    for expression in time_report.iterate("scan", Scanner(program=source).scan(), unit="tokens"):
+                        parser.parse(*expression)
+
+                library_unit = LibraryUnit(functions=[function for name, function in function_declaration_table.functions.items() if name not in declared_functions],
+                                           function_calls=[function_call for function_call in function_call_table.functions.values() if id(function_call) not in function_calls],
+                                           global_expressions=global_expressions.expressions[number_of_global_expressions:])
+                library_units.append((key, library_unit, False))
+
+        with time_report.phase("semantic analysis"):
+            semantic_analyzer.analyze()
+        if not options.no_inlining: # only into the user functions, so the cached library functions do not depend on the program
+            with time_report.phase("inlining"):
+                inliner.inline([function for function in user_functions if len(function.body) > 0])
+                time_report.count("inlining", calls=len([call for call in inliner.calls if call.reason is None]))
+        if not options.no_loop_invariants: # as the inlining, only in the user functions
+            with time_report.phase("loop invariants"):
+                loop_invariant_code_motion = LoopInvariantCodeMotion()
+                loop_invariant_code_motion.move([function for function in user_functions if len(function.body) > 0])
+                time_report.count("loop invariants", computations=loop_invariant_code_motion.moved)
+        if not options.no_common_subexpressions: # as the inlining, only in the user functions
+            with time_report.phase("common subexpressions"):
+                common_subexpression_elimination = CommonSubexpressionElimination()
+                common_subexpression_elimination.eliminate([function for function in user_functions if len(function.body) > 0])
+                time_report.count("common subexpressions", computations=common_subexpression_elimination.eliminated)
+        with time_report.phase("call graph"):
+            call_graph = CallGraph()
+            for function in function_declaration_table.functions.values():
+                if len(function.body) > 0:
+                    call_graph.add_function(function)
+            for unit in assembly_units:
+                for function_name, instructions, _ in unit.sections:
+                    call_graph.add_assembly_function(function_name, instructions)
+            reachable_functions = call_graph.reachable()
+        emitted = lambda function_name: options.keep_unused or function_name is None or function_name in reachable_functions
+
+        if options.debug:
             print("Internal global code representation:", file=sys.stderr)
             print(global_expressions, file=sys.stderr)
             print("Internal function code representation:", file=sys.stderr)
@@ -131,23 +229,67 @@ if "__main__" == __name__:
             print(variable_table, file=sys.stderr)
             print("Function call table:", file=sys.stderr)
             print(function_call_table, file=sys.stderr)
+            print("\nCall graph:", file=sys.stderr)
+            print(call_graph, file=sys.stderr)
+            print(f"\nCompilation cache: {compilation_cache.hits} hits, {compilation_cache.misses} misses", file=sys.stderr)
 
-        variable_table.reset_scope_counter()
-        high_assembly_generator.generate()
-        target_assembly_generator.generate()
-
-        if args.intermediate:
-            high_assembly_file.close()
-        if args.output:
-            target_assembly_file.close()
-        
-        if args.compile and args.output:
-            os.system(f"wine ../_bin/hoasm.exe -I ../_assembler/inc {args.output}")
-            output_file_stripped = args.output[:args.output.rfind('.')]
-            os.system(f"wine ../_bin/hlink.exe -L ../_assembler/inc -o {output_file_stripped}.hix {output_file_stripped}.ho")
+        with time_report.phase("high assembly"):
+            for unit in assembly_units:
+                for function_name, instructions, lines in unit.sections:
+                    if emitted(function_name):
+                        high_assembly_writer.extend(instructions, lines)
 
-    except Exception as e:
-        if args.debug:
+            variable_table.reset_scope_counter()
+            high_assembly_generator.generate_global_code()
+            user_functions = [function for function in user_functions if emitted(function.name)]
+            missing_library_functions = [function for _, library_unit, cached in library_units if not cached for function in library_unit.functions]
+            if options.jobs > 1: # user functions and library functions missing in the cache are generated at once
+                parallel_generator = ParallelGenerator(jobs=options.jobs, comments=not options.no_comments, strength_reduction=not options.no_strength_reduction,
+                                                       register_allocation=not options.no_register_allocation, minimal_frames=not options.no_minimal_frames,
+                                                       calling_conventions=calling_conventions, tail_calls=not options.no_tail_calls, short_circuits=not options.no_short_circuits)
+                generated_functions = parallel_generator.generate_functions(user_functions + missing_library_functions)
+                for function in user_functions:
+                    if function.name in generated_functions:
+                        high_assembly_writer.extend(*generated_functions[function.name])
+            else:
+                parallel_generator = None
+                high_assembly_generator.generate_functions(user_functions, time_report)
+
+            for key, library_unit, cached in library_units:
+                if not cached: # all functions are generated for the cache, each of them with an empty register file, so they do not depend on each other
+                    if parallel_generator:
+                        library_unit.sections = [(function.name, *generated_functions[function.name]) for function in library_unit.functions]
+                    else:
+                        writer = library.unit_writer()
+                        HighAssemblyGenerator(function_declaration_table=function_declaration_table, variable_table=variable_table, global_code=global_expressions,
+                                              register_file=RegisterFile(number_of_registers=7, writer=writer), writer=writer,
+                                              register_allocation=not options.no_register_allocation, minimal_frames=not options.no_minimal_frames,
+                                              calling_conventions=calling_conventions, tail_calls=not options.no_tail_calls, short_circuits=not options.no_short_circuits).generate_functions(library_unit.functions, time_report)
+                        library_unit.sections = writer.sections()
+                    compilation_cache.store(key, library_unit)
+                for function_name, instructions, lines in library_unit.sections:
+                    if emitted(function_name):
+                        high_assembly_writer.extend(instructions, lines)
+            time_report.count("high assembly", instructions=len(high_assembly_writer.retrieve_memory()))
+        with time_report.phase("target assembly"):
+            if parallel_generator:
+                target_assembly_generator.generate_header()
+                functions_lines, target_assembly_generator.first_function = parallel_generator.translate(high_assembly_writer.retrieve_memory())
+                for function_lines in functions_lines:
+                    target_assembly_writer.write_lines(function_lines)
+                target_assembly_generator.generate_footer()
+                parallel_generator.shutdown()
+            else:
+                target_assembly_generator.generate(time_report)
+            time_report.count("target assembly", lines=len(target_assembly_writer.buffer))
+        with time_report.phase("peephole"):
+            peephole_optimizer.optimize(target_assembly_writer.buffer)
+            time_report.count("peephole", **peephole_optimizer.removed)
+        high_assembly_writer.flush()
+        target_assembly_writer.flush()
+
+    except Exception:
+        if options.debug:
             print("Currently defined function:", file=sys.stderr)
             print(parser.current_function, end="\n\n", file=sys.stderr)
             print("Current parser state:", file=sys.stderr)
@@ -156,11 +298,83 @@ if "__main__" == __name__:
             print(parser.expression_parser.state, end="\n\n", file=sys.stderr)
             print("Current expression:", file=sys.stderr)
             print(parser.expression_parser.expression, end="\n\n", file=sys.stderr)
+        raise
 
-        if args.debug:
-            raise e
-        else:
+    return CompilationArtifacts(target_assembly=target_assembly_writer.output_file.getvalue(),
+                                high_assembly=high_assembly_writer.output_file.getvalue() if options.intermediate else None,
+                                high_assembly_code=high_assembly_writer.retrieve_memory(), function_declaration_table=function_declaration_table,
+                                time_report=time_report, peephole_optimizer=peephole_optimizer, inliner=inliner)
+
+def main(argv: list[str] = None) -> int:
+    parser = argument_parser()
+    args = parser.parse_args(argv)
+    os.makedirs(os.path.join(COMPILER_DIRECTORY, "build"), exist_ok=True)
+    if args.serve:
+        return serve(args.serve, main)
+    if not args.file_names:
+        parser.error("the following arguments are required: file_names")
+    if args.watch:
+        return watch(lambda: watched_files(args), lambda: compile_files(args))
+    return compile_files(args)
+
+def watched_files(args: argparse.Namespace) -> list[str]:
+    # the input files, the linked assembly files with their configurations and the content of the lib directory
+    file_names = list(args.file_names)
+    for assembly_file in args.assembly or []:
+        file_names.append(assembly_file)
+        try:
+            with open(assembly_file, "r") as f:
+                file_names.append(json.load(f)["file_name"])
+        except (OSError, ValueError, KeyError):
+            pass
+    library_path = os.path.join(COMPILER_DIRECTORY, "lib")
+    return file_names + [os.path.join(library_path, file_name) for file_name in sorted(os.listdir(library_path))]
+
+def compile_files(args: argparse.Namespace) -> int:
+    exit_code = 0
+    for file_names in ([[file_name] for file_name in args.file_names] if args.batch else [args.file_names]):
+        options = argparse.Namespace(**vars(args))
+        if args.same or args.batch:
+            file_name = os.path.basename(file_names[0])
+            options.intermediate = file_name[:file_name.rfind('.')] + ".asm"
+            options.output = file_name[:file_name.rfind('.')] + ".has"
+        if options.intermediate:
+            options.intermediate = os.path.join(COMPILER_DIRECTORY, "build", options.intermediate)
+        if options.output:
+            options.output = os.path.join(COMPILER_DIRECTORY, "build", options.output)
+
+        try:
+            artifacts = compile_program(file_names, options)
+        except Exception as e:
+            if args.debug:
+                raise e
             print("Error:", file=sys.stderr)
             print(e, file=sys.stderr)
-            exit(1)
-        
+            if not args.batch:
+                return 1
+            exit_code = 1
+            continue
+
+        if options.intermediate:
+            with open(options.intermediate, "w") as f:
+                f.write(artifacts.high_assembly)
+        if options.output:
+            with open(options.output, "w") as f:
+                f.write(artifacts.target_assembly)
+        else:
+            sys.stdout.write(artifacts.target_assembly)
+        if options.time_report:
+            print(artifacts.time_report.json() if options.time_report == "json" else artifacts.time_report.table(), file=sys.stderr)
+        if options.peephole_statistics:
+            print(artifacts.peephole_optimizer.report(), file=sys.stderr)
+        if options.inline_report:
+            print(artifacts.inliner.report(), file=sys.stderr)
+
+        if options.compile and options.output:
+            os.system(f"wine ../_bin/hoasm.exe -I ../_assembler/inc {options.output}")
+            output_file_stripped = options.output[:options.output.rfind('.')]
+            os.system(f"wine ../_bin/hlink.exe -L ../_assembler/inc -o {output_file_stripped}.hix {output_file_stripped}.ho")
+    return exit_code
+
+if "__main__" == __name__:
+    exit(main())
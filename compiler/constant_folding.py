@@ -0,0 +1,63 @@
+from typing import Callable
+from enums import Operators
+
+MASK = 0xFFFFFFFF
+# largest constant, which is the same 16 bit immediate operand of HaDes instructions, whether it is sign extended (arithmetic and comparisons)
+# or zero extended (logic, shifts and LDI), results outside of 0..MAX_IMMEDIATE are left to be computed at runtime
+MAX_IMMEDIATE = 0x7FFF
+
+def signed(value: int) -> int:
+    value &= MASK
+    return value - (1 << 32) if value & 0x80000000 else value
+
+def _cyclic_shift_left(value: int, amount: int) -> int:
+    amount &= 31
+    return ((value << amount) | (value >> (32 - amount))) & MASK
+
+def _cyclic_shift_right(value: int, amount: int) -> int:
+    amount &= 31
+    return ((value >> amount) | (value << (32 - amount))) & MASK
+
+# operators with the semantics of the HaDes instructions they are translated to, operands and results are unsigned 32 bit values,
+# '!', '&&' and '||' compare their operands with zero and result in 0 or 1, shifts use the lowest 5 bits of the amount, right shift is logical,
+# '>>>' is translated to a cyclic shift left (CSHL) and '<<<' to a cyclic shift right (CSHR), comparisons are signed and result in 0 or 1
+UNARY_OPERATIONS: dict[Operators, Callable[[int], int]] = {
+    Operators.UNARY_PLUS: lambda a: a,
+    Operators.UNARY_MINUS: lambda a: -a & MASK,
+    Operators.BITWISE_NOT: lambda a: ~a & MASK,
+    Operators.LOGICAL_NOT: lambda a: int(a == 0),
+}
+
+BINARY_OPERATIONS: dict[Operators, Callable[[int, int], int]] = {
+    Operators.MULTIPLY: lambda a, b: a * b & MASK,
+    Operators.PLUS: lambda a, b: (a + b) & MASK,
+    Operators.MINUS: lambda a, b: (a - b) & MASK,
+    Operators.LEFT_SHIFT: lambda a, b: (a << (b & 31)) & MASK,
+    Operators.RIGHT_SHIFT: lambda a, b: a >> (b & 31),
+    Operators.RIGHT_ROTATION_SHIFT: _cyclic_shift_left,
+    Operators.LEFT_ROTATION_SHIFT: _cyclic_shift_right,
+    Operators.LOGICAL_LESS: lambda a, b: int(signed(a) < signed(b)),
+    Operators.LOGICAL_LESS_OR_EQUAL: lambda a, b: int(signed(a) <= signed(b)),
+    Operators.LOGICAL_GREATER: lambda a, b: int(signed(a) > signed(b)),
+    Operators.LOGICAL_GREATER_OR_EQUAL: lambda a, b: int(signed(a) >= signed(b)),
+    Operators.LOGICAL_EQUAL: lambda a, b: int(a == b),
+    Operators.LOGICAL_NOT_EQUAL: lambda a, b: int(a != b),
+    Operators.BITWISE_AND: lambda a, b: a & b,
+    Operators.BITWISE_XOR: lambda a, b: a ^ b,
+    Operators.BITWISE_OR: lambda a, b: a | b,
+    Operators.LOGICAL_AND: lambda a, b: int(a != 0 and b != 0),
+    Operators.LOGICAL_OR: lambda a, b: int(a != 0 or b != 0),
+}
+
+def is_foldable(operator: Operators) -> bool:
+    return operator in UNARY_OPERATIONS or operator in BINARY_OPERATIONS
+
+def evaluate(operator: Operators, *operands: int) -> int:
+    # value of a constant expression as computed by the HaDes CPU, i.e. an unsigned 32 bit value
+    operands = [operand & MASK for operand in operands]
+    if len(operands) == 1:
+        return UNARY_OPERATIONS[operator](*operands)
+    return BINARY_OPERATIONS[operator](*operands)
+
+def is_immediate(value: int) -> bool:
+    return 0 <= value <= MAX_IMMEDIATE
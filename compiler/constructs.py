@@ -1,4 +1,5 @@
-from enums import InternalAlphabet, Keywords, Operators, Types, VariableUsage
+import bisect
+from enums import CallingConventions, InternalAlphabet, Keywords, Operators, Types, VariableUsage
 
 class Construct():
     def __init__(self, comment, line_number: int = None, token_number: int = None):
@@ -61,6 +62,7 @@ class Function(Construct):
         self.variables: list[Variable] = []
         self.body: list[Variable|Constant|ReturnValue|IntermediateResult|InternalAlphabet|Types|Operators|Keywords] = []
         self.number_of_parameters = number_of_parameters
+        self.calling_convention = CallingConventions.STACK
     
     def assign_parameters_offset(self):
         offset = 1
@@ -125,6 +127,35 @@ class IntermediateResult(Construct):
     def __str__(self) -> str:
         return f"{self.__class__.__name__}.{self.number}"
 
+class IntermediateResultIndex():
+    # positions of the intermediate results of each number and of the return statements in a function body, built once per function,
+    # so the intermediate result produced by an operator is found by a binary search instead of a scan of the body
+    def __init__(self, body: list):
+        self.body = body
+        self.positions: dict[int, list[int]] = {}
+        self.return_positions: list[int] = []
+        for i, command in enumerate(body):
+            if isinstance(command, IntermediateResult):
+                self.positions.setdefault(command.number, []).append(i)
+            elif isinstance(command, Keywords) and command == Keywords.RETURN:
+                self.return_positions.append(i)
+
+    def next(self, number: int, start: int) -> IntermediateResult|None:
+        # the first intermediate result with the number at the position 'start' or after it
+        positions = self.positions.get(number, [])
+        index = bisect.bisect_left(positions, start)
+        return self.body[positions[index]] if index < len(positions) else None
+
+    def previous(self, number: int, end: int) -> IntermediateResult|None:
+        # the last intermediate result with the number at the position 'end' or before it
+        positions = self.positions.get(number, [])
+        index = bisect.bisect_right(positions, end)
+        return self.body[positions[index - 1]] if index > 0 else None
+
+    def previous_return(self, end: int) -> Keywords|None:
+        index = bisect.bisect_right(self.return_positions, end)
+        return self.body[self.return_positions[index - 1]] if index > 0 else None
+
 class Parameter(Construct):
     def __init__(self, number: int, function: FunctionCall):
         super().__init__(f"parameter {number}")
@@ -141,3 +172,14 @@ class ReturnValue(Construct):
     
     def __str__(self) -> str:
         return f"{self.__class__.__name__}.{self.function.name}"
+
+class ConditionJump(Construct):
+    # jump of a part of a condition, which is evaluated part by part, when the value of the part is zero or when it is not, to the start of the part
+    # 'target', the parts are numbered from 0 and the part after the last one is the body, or past the body, when 'target' is None
+    def __init__(self, when_zero: bool, target: int|None):
+        super().__init__(f"jump when {'zero' if when_zero else 'not zero'}")
+        self.when_zero = when_zero
+        self.target = target
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}.{'zero' if self.when_zero else 'not_zero'}.{self.target}"
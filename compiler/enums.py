@@ -87,70 +87,19 @@ class HighAssemblyInstructions(Enum):
 
     def __str__(self) -> str:
         return f"{self.value}"
-    
-    def to_regex(self) -> str:
-        if self == HighAssemblyInstructions.PUSH:
-            return (
-                r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|" + # PUSH <register> (4 groups)
-                r"(^\s*" + self.value + r"\s+(-{0,1}\d+)\s*(;\s*(.*))*$)|"          # PUSH <constant> (4 groups)
-            )
-        elif self == HighAssemblyInstructions.POP:
-            return r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|"  # POP <register>  (4 groups)
-        elif self == HighAssemblyInstructions.PUSHA:
-            return r"(^\s*" + self.value + r"\s*(;\s*(.*))*$)|"  # PUSHA           (3 group)
-        elif self == HighAssemblyInstructions.POPA:
-            return r"(^\s*" + self.value + r"\s*(;\s*(.*))*$)|"  # POPA            (3 group)
-        elif self == HighAssemblyInstructions.LOAD:
-            return (
-                r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+\[([a-z_][a-z0-9_]*)"
-                    r"(?:(\+|\-)(\d+)){0,1}\]\s*(;\s*(.*))*$)|" +                                        # LOAD <register> <memory>          (7 groups)
-                r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+@([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|"  # LOAD <register> <global variable> (5 groups)
-            )
-        elif self == HighAssemblyInstructions.MOV:
-            return (
-                r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+(-{0,1}\d+)\s*(;\s*(.*))*$)|" +       # MOV <register> <constant> (5 groups)
-                r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|"  # MOV <register> <register> (5 groups)
-            )
-        elif self == HighAssemblyInstructions.STORE:
-            return (
-                r"(^\s*" + self.value + r"\s+\[([a-z_][a-z0-9_]*)(?:(\+|\-)(\d+)){0,1}\]"
-                    r"\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|" +                                           # STORE <memory> <register>          (7 groups)
-                r"(^\s*" + self.value + r"\s+@([a-z_][a-z0-9_]*)\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|" + # STORE <global variable> <register> (5 groups)
-                r"(^\s*" + self.value + r"\s+\[([a-z_][a-z0-9_]*)(?:(\+|\-)(\d+)){0,1}\]"                 # STORE <memory> <constant>          (7 groups)
-                    r"\s+(-{0,1}\d+)\s*(;\s*(.*))*$)|"
-            )
-        elif self == HighAssemblyInstructions.CALL:
-            return r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|"     # CALL <function label> (4 groups)
-        elif self == HighAssemblyInstructions.RET or self == HighAssemblyInstructions.RETI:
-            return (
-                r"(^\s*" + self.value + r"\s+(\d+)\s*(;\s*(.*))*$)|" +    # RET/RETI <number of cleared parameters from the stack> (4 groups)
-                r"(^\s*" + self.value + r"\s*(;\s*(.*))*$)|"              # RET/RETI                                               (3 groups)
-            )                  
-        elif self == HighAssemblyInstructions.JMP:
-            return r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_\.]*)\s*(;\s*(.*))*$)|"     # JMP <label> (4 groups)
-        elif self == HighAssemblyInstructions.JZ or self == HighAssemblyInstructions.JNZ:
-            return r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+([a-z_][a-z0-9_\.]*)\s*(;\s*(.*))*$)|" # JZ/JNZ <register> <label> (5 groups)
-        elif self == HighAssemblyInstructions.NOT or self == HighAssemblyInstructions.NEG:
-            return (
-                r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+(-{0,1}\d+)\s*(;\s*(.*))*$)|" +        # NOT/NEG <register> <constant> (5 groups)
-                r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|"   # NOT/NEG <register> <register> (5 groups)
-            )
-        elif self == HighAssemblyInstructions.IN or self == HighAssemblyInstructions.OUT:
-            return r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+(\d+)\s*(;\s*(.*))*$)|"      # IN/OUT <register> <positive constant> (5 groups)
-        elif self == HighAssemblyInstructions.EOF:
-            return r"(^\s*" + self.value + r"\s*(;\s*(.*))*$)|"  # EOF (3 group)
-        elif self == HighAssemblyInstructions.ENI or self == HighAssemblyInstructions.DEI:
-            return r"(^\s*" + self.value + r"\s*(;\s*(.*))*$)|"         # ENI/DEI (3 groups)
-        elif self == HighAssemblyInstructions.SISA:
-            return r"(^\s*" + self.value + r"\s+(1|2|3|4)\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|"  # SISA  <1|2|3|4> <identifier>   (5 groups)
-        else:
-            return self._ALU_instruction_to_regex()
-    
-    def _ALU_instruction_to_regex(self):
-        return (
-            r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+([a-z_][a-z0-9_]*)\s+(-{0,1}\d+)\s*(;\s*(.*))*$)|" +      # <ALU instruction> <register> <register> <constant> (6 groups)
-            r"(^\s*" + self.value + r"\s+([a-z_][a-z0-9_]*)\s+([a-z_][a-z0-9_]*)\s+([a-z_][a-z0-9_]*)\s*(;\s*(.*))*$)|" # <ALU instruction> <register> <register> <register> (6 groups)
-        )
+
+class HighAssemblyDirectives(Enum):
+    LABEL = ":"                                 # <label>:
+    GLOBAL_VARIABLE = "@"                       # @<identifier>: <value>
+    FUNCTION_LABEL = "$"                        # $<function name>:
+    FUNCTION_LABEL_WITHOUT_STACK_FRAME = "&"    # &<function name>:
+    COMMENT = ";"                               # ; <comment>
+
+class OperandTypes(Enum):
+    IDENTIFIER = 1      # register, function name or label
+    CONSTANT = 2
+    MEMORY = 3          # [<register>+<offset>]
+    GLOBAL_VARIABLE = 4 # @<identifier>
 
 class Operators(Enum):
     LOGICAL_NOT = "!"                   # precedence 11
@@ -260,6 +209,7 @@ class InternalAlphabet(Enum):
     SCOPE_INCREMENT = 3
     SCOPE_DECREMENT = 4
     EQUAL_ZERO_JUMP = 5
+    NOT_ZERO_JUMP = 6
 
     def __str__(self) -> str:
         global PRINT_INDENT
@@ -271,8 +221,8 @@ class InternalAlphabet(Enum):
             PRINT_INDENT = PRINT_INDENT[:-2]
             old_indent = PRINT_INDENT
 
-        pre_new_line = f"\n{old_indent}" if self != InternalAlphabet.EXPRESSION_END and self != InternalAlphabet.EQUAL_ZERO_JUMP else ''
-        post_new_line = f"\n{PRINT_INDENT}" if self != InternalAlphabet.EQUAL_ZERO_JUMP else ''
+        pre_new_line = f"\n{old_indent}" if self != InternalAlphabet.EXPRESSION_END and self != InternalAlphabet.EQUAL_ZERO_JUMP and self != InternalAlphabet.NOT_ZERO_JUMP else ''
+        post_new_line = f"\n{PRINT_INDENT}" if self != InternalAlphabet.EQUAL_ZERO_JUMP and self != InternalAlphabet.NOT_ZERO_JUMP else ''
         return f"{pre_new_line}{self.__class__.__name__}.{self.name}{post_new_line}"
 
 class ScopeTypes(Enum):
@@ -302,6 +252,11 @@ class RegisterStates(Enum):
     FREE = 1
     USED = 2
     EMPTY = 3
+    RESERVED = 4
+
+class CallingConventions(Enum):
+    STACK = "stack"         # parameters pushed to the stack and removed by the callee
+    REGISTERS = "registers" # parameters in r1, r2 and r3, which the callee preserves
 
 class TargetAssemblyHelpers(Enum):
     DATA_LABEL = "@data"
@@ -4,6 +4,7 @@ from function_call_table import FunctionCallTable
 from variable_table import VariableTable
 from enums import InternalAlphabet, Operators, Types, VariableUsage
 from constructs import FunctionCall, IntermediateResult, ReturnValue, Variable, Constant, Parameter
+from constant_folding import evaluate, is_foldable, is_immediate, signed
 
 class ExpressionParserStates(Enum):
     UNARY_OPERATOR_OR_OPERAND_OR_OPENED_BRACKET = 1
@@ -44,8 +45,14 @@ BINARY_OPERATORS = [
     Operators.PARAMETER_POSSIBLE_ASSIGNMENT
 ]
 
+# operators, whose operands are addresses, a known value of a variable is not propagated to them
+ADDRESS_OPERATORS = [
+    Operators.DEREFERENCE,
+    Operators.ASSIGNMENT_DEREFERENCE
+]
+
 class ExpressionParser:
-    def __init__(self, function_call_table: FunctionCallTable, variable_table: VariableTable) -> None:
+    def __init__(self, function_call_table: FunctionCallTable, variable_table: VariableTable, constant_folding: bool = True) -> None:
         self.operator_precedence = {
             Operators.LOGICAL_NOT: 11,
             Operators.BITWISE_NOT: 11,
@@ -88,6 +95,9 @@ class ExpressionParser:
         self.new_function_call = None
         self.intermediate_result_counter = 0
         self.identifiers = True
+        self.constant_folding = constant_folding
+        self.constant_expression = False # all operations are folded, e.g. in initializers of global variables
+        self.constant_values: dict[Variable, Constant] = {} # known values of local variables in straight-line code
 
     def allow_identifiers(self):
         self.identifiers = True
@@ -219,7 +229,7 @@ class ExpressionParser:
             
             index_variable = self.operand_stack.pop()
             self.expression.append(index_variable)
-            self.expression.append(scope_result)
+            self.expression.append(self._known_value(scope_result))
             self.expression.append(Operators.OFFSET_DEREFERENCE)
 
             self.operand_stack.append(IntermediateResult(self.intermediate_result_counter))
@@ -258,13 +268,13 @@ class ExpressionParser:
                 self.current_precedence == -1 and len(self.operator_stack) == 0 and len(self.bracket_stack) == 0)
     
     def add_equal_zero_jump(self):
-        self.expression.append(self.operand_stack.pop())
+        self.expression.append(self._known_value(self.operand_stack.pop()))
         self.expression.append(InternalAlphabet.EQUAL_ZERO_JUMP)
     
     def retrieve_expression(self) -> list:
         if self.is_expression_valid():
             if len(self.operand_stack) and (isinstance(self.operand_stack[-1], Variable) or isinstance(self.operand_stack[-1], Constant)):
-                self.expression.append(self.operand_stack.pop())
+                self.expression.append(self._known_value(self.operand_stack.pop()))
             expression = self.expression
             self.expression = []
             self.operand_stack = []
@@ -275,6 +285,30 @@ class ExpressionParser:
             raise Exception()
         return expression
     
+    def retrieve_constant(self) -> int:
+        # value of a constant expression, e.g. of an initializer of a global variable
+        self.add_semicolon()
+        expression = self.retrieve_expression()
+        self.constant_expression = False
+        if len(expression) != 1 or not isinstance(expression[0], Constant):
+            raise Exception()
+        return signed(expression[0].value)
+
+    def forget_constant_values(self):
+        # called at the boundaries of straight-line code, i.e. at jumps, labels and scopes
+        self.constant_values.clear()
+
+    def _known_value(self, operand: Variable|IntermediateResult|Constant) -> Variable|IntermediateResult|Constant:
+        return self.constant_values.get(operand, operand) if isinstance(operand, Variable) else operand
+
+    def _assign_known_value(self, variable: Variable, value: Variable|IntermediateResult|Constant):
+        # only local integer variables are propagated, global variables can be changed by called functions and interrupt handlers
+        if isinstance(variable, Variable):
+            if self.constant_folding and isinstance(value, Constant) and is_immediate(value.value) and variable.type == Types.INT and not variable.global_scope and variable.stack_offset is not None:
+                self.constant_values[variable] = value
+            else:
+                self.constant_values.pop(variable, None)
+
     def _pop_stacks_insert_expression(self, precedence: int):
         while len(self.operator_stack) and precedence <= self.operator_precedence[self.operator_stack[-1]]:
             popped_operator = self.operator_stack.pop()
@@ -282,11 +316,25 @@ class ExpressionParser:
                 popped_operator = Operators.PARAMETER_ASSIGNMENT
 
             operand2 = self.operand_stack.pop()
+            if popped_operator not in ADDRESS_OPERATORS:
+                operand2 = self._known_value(operand2)
             operand1 = None
+            if popped_operator in BINARY_OPERATORS:
+                operand1 = self.operand_stack.pop()
+                if popped_operator == Operators.ASSIGNMENT:
+                    self._assign_known_value(operand1, operand2)
+                else:
+                    operand1 = self._known_value(operand1)
+
+            if (self.constant_folding or self.constant_expression) and is_foldable(popped_operator) and isinstance(operand2, Constant) and (operand1 is None or isinstance(operand1, Constant)):
+                value = evaluate(popped_operator, *[operand.value for operand in (operand1, operand2) if operand is not None])
+                if self.constant_expression or is_immediate(value): # the result is not computed at runtime
+                    self.operand_stack.append(Constant(Types.INT, value, str(signed(value))))
+                    continue
+
             if popped_operator in UNARY_OPERATORS:
                 self.expression.append(operand2)
             elif popped_operator in BINARY_OPERATORS:
-                operand1 = self.operand_stack.pop()
                 self.expression.append(operand1)
                 self.expression.append(operand2)
             
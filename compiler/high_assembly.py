@@ -0,0 +1,94 @@
+from enums import HighAssemblyInstructions, HighAssemblyDirectives, OperandTypes
+
+class MemoryOperand():
+    __slots__ = ("register", "offset")
+
+    def __init__(self, register: str, offset: int|None = None):
+        self.register = register
+        self.offset = offset
+
+    def __str__(self) -> str:
+        if self.offset is None:
+            return f"[{self.register}]"
+        return f"[{self.register}{self.offset:+}]"
+
+class GlobalVariableOperand():
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __str__(self) -> str:
+        return f"@{self.name}"
+
+OPERAND_TYPES = {
+    str: OperandTypes.IDENTIFIER,
+    int: OperandTypes.CONSTANT,
+    MemoryOperand: OperandTypes.MEMORY,
+    GlobalVariableOperand: OperandTypes.GLOBAL_VARIABLE,
+}
+
+class Instruction():
+    __slots__ = ("opcode", "operands", "comment")
+
+    def __init__(self, opcode: HighAssemblyInstructions|HighAssemblyDirectives, operands: tuple = (), comment: str|None = None):
+        self.opcode = opcode
+        self.operands = operands
+        self.comment = comment
+
+    def operand_types(self) -> tuple[OperandTypes, ...]:
+        return tuple([OPERAND_TYPES[type(operand)] for operand in self.operands])
+
+    def __str__(self) -> str:
+        # text of the instruction without the comment
+        if self.opcode == HighAssemblyDirectives.LABEL:
+            return f"{self.operands[0]}:"
+        elif self.opcode == HighAssemblyDirectives.GLOBAL_VARIABLE:
+            return f"{self.opcode.value}{self.operands[0]}: {self.operands[1]}"
+        elif self.opcode == HighAssemblyDirectives.COMMENT:
+            return ""
+        elif isinstance(self.opcode, HighAssemblyDirectives):
+            return f"{self.opcode.value}{self.operands[0]}:"
+        return ' '.join([str(self.opcode)] + [str(operand) for operand in self.operands])
+
+def parse_instruction(line: str) -> Instruction|None:
+    # parses a line of a hand written high assembly, returns None for empty lines
+    code, semicolon, comment = line.partition(';')
+    comment = comment.lstrip() if semicolon else None
+    operands = code.split()
+    if not operands:
+        return Instruction(HighAssemblyDirectives.COMMENT, (), comment) if comment is not None else None
+
+    mnemonic = operands[0]
+    if mnemonic[-1] == ':': # <label>:, @<identifier>: <value>, $<function name>: or &<function name without stack frame>:
+        if mnemonic[0] in DIRECTIVE_PREFIXES:
+            return Instruction(DIRECTIVE_PREFIXES[mnemonic[0]], tuple([mnemonic[1:-1]] + [_parse_operand(operand) for operand in operands[1:]]), comment)
+        elif len(operands) == 1:
+            return Instruction(HighAssemblyDirectives.LABEL, (mnemonic[:-1],), comment)
+    elif mnemonic.upper() in HighAssemblyInstructions.__members__:
+        return Instruction(HighAssemblyInstructions[mnemonic.upper()], tuple(_parse_operand(operand) for operand in operands[1:]), comment)
+
+    raise Exception(f"Unknown high assembly instruction '{line.strip()}'.")
+
+DIRECTIVE_PREFIXES = {
+    HighAssemblyDirectives.GLOBAL_VARIABLE.value: HighAssemblyDirectives.GLOBAL_VARIABLE,
+    HighAssemblyDirectives.FUNCTION_LABEL.value: HighAssemblyDirectives.FUNCTION_LABEL,
+    HighAssemblyDirectives.FUNCTION_LABEL_WITHOUT_STACK_FRAME.value: HighAssemblyDirectives.FUNCTION_LABEL_WITHOUT_STACK_FRAME,
+}
+
+FUNCTION_LABELS = (HighAssemblyDirectives.FUNCTION_LABEL, HighAssemblyDirectives.FUNCTION_LABEL_WITHOUT_STACK_FRAME)
+
+def _parse_operand(operand: str) -> str|int|MemoryOperand|GlobalVariableOperand:
+    if operand[0] == '[': # [<register>], [<register>+<offset>] or [<register>-<offset>]
+        operand = operand[1:-1]
+        for sign in "+-":
+            if sign in operand:
+                register, offset = operand.split(sign)
+                return MemoryOperand(register, int(sign + offset))
+        return MemoryOperand(operand)
+    elif operand[0] == '@':
+        return GlobalVariableOperand(operand[1:])
+    elif operand[0].isdigit() or operand[0] == '-':
+        return int(operand)
+    else:
+        return operand
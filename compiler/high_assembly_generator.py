@@ -1,10 +1,15 @@
+from typing import Iterable
 from global_expressions import GlobalExpressions
-from writer import Writer
-from enums import InternalAlphabet, Keywords, Operators, HighAssemblyInstructions, Types
-from constructs import Comment, Function, IntermediateResult, ReturnValue, Variable, Constant
+from writer import HighAssemblyWriter
+from enums import CallingConventions, InternalAlphabet, Keywords, Operators, HighAssemblyInstructions, Types
+from constructs import Comment, ConditionJump, Function, IntermediateResult, IntermediateResultIndex, Parameter, ReturnValue, Variable, Constant
+from high_assembly import MemoryOperand
 from registers import Register, RegisterFile
+from register_allocation import BOUNDARY_COMMANDS, RegisterAllocation
+from short_circuits import logical_values, short_circuit_conditions
 from function_declaration_table import FunctionDeclarationTable
 from variable_table import VariableTable
+from time_report import TimeReport
 
 FIRST_OPERAND_OPERATORS = [
     Operators.LOGICAL_NOT,
@@ -46,6 +51,9 @@ BOTH_OPERAND_OPERATORS = [
     Operators.OFFSET_ASSIGNMENT_DEREFERENCE
 ]
 
+# operators changing the value of a variable or of the memory
+ASSIGNMENT_OPERATORS = (Operators.ASSIGNMENT, Operators.ASSIGNMENT_DEREFERENCE, Operators.OFFSET_ASSIGNMENT_DEREFERENCE)
+
 INTERMEDIATE_RESULT_OPERATORS = [
     Operators.MULTIPLY,
     Operators.PLUS,
@@ -77,18 +85,28 @@ INTERMEDIATE_RESULT_OPERATORS = [
 
 class HighAssemblyGenerator():
     def __init__(self, function_declaration_table: FunctionDeclarationTable, variable_table: VariableTable, global_code: GlobalExpressions,
-                register_file: RegisterFile, writer: Writer) -> None:
+                register_file: RegisterFile, writer: HighAssemblyWriter, register_allocation: bool = True, minimal_frames: bool = True,
+                calling_conventions: dict[str, CallingConventions]|None = None, tail_calls: bool = True, short_circuits: bool = True) -> None:
         self.function_declaration_table = function_declaration_table
         self.variable_table = variable_table
         self.global_code = global_code
         self.register_file = register_file
         self.writer = writer
+        self.comments = writer.comments # comments are not even built when the writer drops them
+        self.register_allocation = register_allocation
+        self.minimal_frames = minimal_frames
+        self.calling_conventions = calling_conventions or {} # of the functions not using the stack calling convention
+        self.tail_calls = tail_calls
+        self.short_circuits = short_circuits
+        self._reset_function_state()
 
-        # state variables
+    def _reset_function_state(self):
+        # state of the generated function, every function starts with a fresh state, so the functions can be generated independently
         self.register_index = 0
         self.registers: list[Register] = [None, None]
         self.register_names: list[str] = [None, None]
         self.return_expression = False
+        self.tail_call = False
         self.intermediate_result_counter = 0
         self.scope_index = -1
         self.if_scope_ids = []
@@ -104,47 +122,121 @@ class HighAssemblyGenerator():
         self.current_for_last_statement = []
         self.for_last_statement_stack = []
         self.array_assignment = False
-        
+        self.condition_jump = False # the statement is a part of a condition ending with a jump
+        self.condition_part = 0
+        self.condition_targets: set[int] = set() # parts of the current condition, to which its earlier parts jump
+
     def generate(self):
+        self.generate_global_code()
+        self.generate_functions(self.function_declaration_table.functions.values())
+
+    def generate_global_code(self):
         for global_command in self.global_code.expressions: # FIXME: quite ugly solution
             if isinstance(global_command, Variable):
                 variable = global_command
             elif isinstance(global_command, Constant):
-                self.writer.raw(f"{variable.label}: {global_command.value}", f"global constant {variable.name}")
+                self.writer.global_variable(variable.name, global_command.value, f"global constant {variable.name}")
             elif isinstance(global_command, Comment):
                 self.writer.comment(global_command.comment)
         self.writer.new_line()
 
-        for function in self.function_declaration_table.functions.values():
+    def generate_functions(self, functions: Iterable[Function], time_report: TimeReport = TimeReport(enabled=False)):
+        for function in functions:
             if len(function.body) > 0:
                 function: Function = function
-                self.writer.label(f"${function.name}", f"{function.pretty_comment()}")
-                self.register_file.create_stack_frame(function.stack_size())
-                self._generate_function(function)
-                self.writer.new_line()
-
-                # reset state
-                self.register_index = 0
-                self.registers = [None, None]
-                self.register_names = [None, None]
-                self.return_expression = False
-                self.intermediate_result_counter = 0
-                self.scope_index = -1
-                self.if_scope_ids = []
-                self.while_scope_ids = []
-                self.for_scope_ids = []
-                self.current_jump_statement = None
-                self.jump_statement_stack = []
-                self.else_if_counter = 0
-                self.else_if_counter_stack = []
-                self.for_part1 = False
-                self.for_part2 = False
-                self.for_part3 = False
-                self.current_for_last_statement = []
-                self.for_last_statement_stack = []
-                self.array_assignment = False
+                number_of_instructions = len(self.writer.memory)
+                with time_report.function(function.name, "high assembly"):
+                    self._reset_function_state()
+                    if self.short_circuits: # the conditions are split on a copy, so the function stays the same for the inlining of the next program
+                        function = short_circuit_conditions(function)
+                    function = logical_values(function)
+                    allocation = RegisterAllocation(function, [register.name for register in self.register_file.registers]) if self.register_allocation else None
+                    self.writer.function_label(function.name, function.pretty_comment() if self.comments else "")
+                    self.register_file.create_stack_frame(function.stack_size(), not self.minimal_frames or self._needs_frame_pointer(function, allocation))
+                    self._generate_function(function, allocation)
+                    if self.minimal_frames:
+                        self.register_file.finish_stack_frame()
+                    self.writer.new_line()
+                time_report.count_function(function.name, "high assembly", commands=len(function.body), instructions=len(self.writer.memory) - number_of_instructions)
     
-    def _generate_function(self, function: Function):
+    def _needs_frame_pointer(self, function: Function, allocation: RegisterAllocation|None) -> bool:
+        # leaf functions, whose local variables are all kept in registers, do not access their stack frame below the return address
+        if any(isinstance(command, ReturnValue) for command in function.body):
+            return True
+        if any(variable.type == Types.ARRAY for variable in function.parameters + function.variables):
+            return True
+        if allocation is None:
+            return len(function.variables) > 0
+        return any(interval.register is None and interval.variable.stack_offset < 0 for interval in allocation.intervals.values())
+
+    def _find_register_calls(self, body: list) -> tuple[dict[int, list[Variable|Constant|IntermediateResult|ReturnValue|None]], set[int]]:
+        # arguments of the calls of functions with the register calling convention by the index of the call, a variable or a constant is moved
+        # to its register at the call instead of being pushed, when nothing between them calls a function or assigns a value, an intermediate
+        # result or a return value stays in its register, when only such arguments follow it, the other arguments (None) are pushed and
+        # loaded from the stack, the arguments of a nested call are assigned after the enclosing call's arguments preceding the nested call
+        calls, deferred = {}, set()
+        if not self.calling_conventions:
+            return calls, deferred
+        parameter_assignments: list[int] = []
+        for i, command in enumerate(body):
+            if command is Operators.PARAMETER_ASSIGNMENT:
+                parameter_assignments.append(i)
+            elif isinstance(command, ReturnValue):
+                first = len(parameter_assignments) - command.function.number_of_parameters
+                assignments = parameter_assignments[first:]
+                del parameter_assignments[first:]
+                if self.calling_conventions.get(command.function.name) != CallingConventions.REGISTERS:
+                    continue
+                arguments = []
+                for assignment in reversed(assignments):
+                    operand = body[assignment - 1]
+                    if ((isinstance(operand, Constant) or (isinstance(operand, Variable) and operand.type != Types.ARRAY)) and
+                        not any(isinstance(between, ReturnValue) or (isinstance(between, Operators) and between in ASSIGNMENT_OPERATORS) for between in body[assignment + 1:i])):
+                        deferred.update((assignment - 1, assignment))
+                    elif isinstance(operand, (IntermediateResult, ReturnValue)) and all(j in deferred or isinstance(body[j], Parameter) for j in range(assignment + 1, i)):
+                        deferred.update((assignment - 1, assignment) if isinstance(operand, IntermediateResult) else (assignment,)) # the call is still made
+                    else:
+                        operand = None
+                    arguments.append(operand)
+                calls[i] = arguments[::-1]
+        return calls, deferred
+
+    def _find_tail_calls(self, function: Function) -> tuple[dict[int, list[bool]], set[int]]:
+        # recursive calls, whose value is returned, i.e. 'return f(...);' in 'f', by the index of the call with whether each argument is passed,
+        # an argument passing the same parameter unchanged is not pushed, unless an argument assigns a value
+        calls, unchanged = {}, set()
+        body = function.body
+        if not self.tail_calls:
+            return calls, unchanged
+        for i, command in enumerate(body):
+            if not isinstance(command, ReturnValue) or command.function.name != function.name or body[i + 1] != InternalAlphabet.EXPRESSION_END:
+                continue
+            start = i
+            while not (body[start - 1] == InternalAlphabet.EXPRESSION_END or isinstance(body[start - 1], Keywords) or body[start - 1] in BOUNDARY_COMMANDS):
+                start -= 1
+            if body[start - 1] != Keywords.RETURN:
+                continue
+            passed = [True] * function.number_of_parameters
+            if not any(isinstance(between, Operators) and between in ASSIGNMENT_OPERATORS for between in body[start:i]):
+                for j in range(start + 2, i):
+                    if (body[j] is Operators.PARAMETER_ASSIGNMENT and isinstance(body[j - 2], Parameter) and
+                        body[j - 1] is function.parameters[body[j - 2].number] and (j - 3 < start or body[j - 3] is Operators.PARAMETER_ASSIGNMENT)):
+                        passed[body[j - 2].number] = False
+                        unchanged.update((j - 1, j))
+            calls[i] = passed
+        return calls, unchanged
+
+    def _generate_function(self, function: Function, allocation: RegisterAllocation|None):
+        self.intermediate_results = IntermediateResultIndex(function.body)
+        self.register_calls, self.deferred_arguments = self._find_register_calls(function.body)
+        self.tail_call_arguments, unchanged_arguments = self._find_tail_calls(function)
+        self.deferred_arguments |= unchanged_arguments
+        if self.tail_call_arguments: # the tail calls jump here with the new arguments, the stack frame stays
+            self.writer.label(f"{function.name}.start")
+        reservations, releases = {}, {}
+        if allocation is not None:
+            reservations, releases = allocation.reservations, allocation.releases
+
         for i, command in enumerate(function.body):
             if self.for_part3:
                 if command == InternalAlphabet.SCOPE_INCREMENT:
@@ -155,6 +247,9 @@ class HighAssemblyGenerator():
                     self.current_for_last_statement.append((i, command))
                     continue
 
+            for register_name, variable, load in reservations.get(i, ()):
+                self.register_file.reserve(register_name, variable, load)
+
             if isinstance(command, Variable) or isinstance(command, IntermediateResult):
                 self._handle_variable_or_intermediate_result(command, function, i)
             elif isinstance(command, Constant):
@@ -167,15 +262,24 @@ class HighAssemblyGenerator():
                 self._handle_internal_alphabet(command, function, i)
             elif isinstance(command, Keywords):
                 self._handle_keyword(command, function, i)
+            elif isinstance(command, ConditionJump):
+                self._handle_condition_jump(command, function, i)
             elif isinstance(command, Comment):
                 self._handle_comment(command)
 
+            for register_name in releases.get(i, ()):
+                self.register_file.release(register_name)
+
     def _handle_variable_or_intermediate_result(self, command: Variable|IntermediateResult, function: Function, i: int):
+        if i in self.deferred_arguments:
+            return
         self.registers[self.register_index] = self.register_file.load_operand(command, function.body[i + 2] != Operators.ASSIGNMENT)
         self.register_names[self.register_index] = self.registers[self.register_index].name
         self.register_index += 1
 
     def _handle_constant(self, command: Constant, function: Function, i: int):
+        if i in self.deferred_arguments:
+            return
         if function.body[i + 1] == Operators.PARAMETER_ASSIGNMENT:
             self.register_names[self.register_index] = command.value
         elif self.register_index == 0:
@@ -186,61 +290,82 @@ class HighAssemblyGenerator():
         self.register_index += 1
 
     def _handle_return_value(self, command: ReturnValue, function: Function, i: int):
-        self.writer.instruction(f"{HighAssemblyInstructions.CALL} {command.function.name}", command.function.comment)
+        arguments = self.register_calls.get(i)
+        self.register_file.release_global_variables()
+        if i in self.tail_call_arguments:
+            self.register_file.pass_tail_call_arguments(function.parameters, self.tail_call_arguments[i])
+            self.writer.instruction(HighAssemblyInstructions.JMP, (f"{function.name}.start",), f"tail {command.function.comment}" if self.comments else "")
+            self.register_file.invalidate()
+            self.tail_call = True
+            return
+        if arguments is None:
+            self.writer.instruction(HighAssemblyInstructions.CALL, (command.function.name,), command.function.comment)
+        else:
+            saved_registers = self.register_file.load_arguments(arguments)
+            self.writer.instruction(HighAssemblyInstructions.CALL, (command.function.name,), command.function.comment)
+            self.register_file.restore_registers(saved_registers, arguments.count(None))
         self.registers[self.register_index] = self.register_file.get_return_value(command.function, isinstance(function.body[i + 1], ReturnValue))
         self.register_names[self.register_index] = self.registers[self.register_index].name if self.registers[self.register_index] else None
         self.register_index += 1
 
     def _handle_operator(self, command: Operators, function: Function, i: int):
+        if i in self.deferred_arguments:
+            self.register_index = 0
+            return
         self.register_file.resolve_register_names(self.register_names)
         # TODO: refactor - reduce duplicate code
         if command in INTERMEDIATE_RESULT_OPERATORS:
             result_register = self.register_file.get_for_intermediate_result()
             if command in FIRST_OPERAND_OPERATORS:
-                self.writer.instruction(f"{command.to_high_assembly_instruction()} {result_register.name} {self.register_names[0]}", 
-                                        f"{result_register.name} = {command.value.replace('U', '')}{function.body[i - 1].comment}")
-                self._set_intermediate_result_comment(function, i + 1, f"{command.value.replace('U', '')}{function.body[i - 1].comment}")
+                self.writer.instruction(command.to_high_assembly_instruction(), (result_register.name, self.register_names[0]), 
+                                        f"{result_register.name} = {command.value.replace('U', '')}{function.body[i - 1].comment}" if self.comments else "")
+                if self.comments:
+                    self._set_intermediate_result_comment(function, i + 1, f"{command.value.replace('U', '')}{function.body[i - 1].comment}")
             elif command in BOTH_OPERAND_OPERATORS:
                 if command == Operators.OFFSET_DEREFERENCE:
-                    self.writer.instruction(f"{command.to_high_assembly_instruction()} {result_register.name} {self.register_names[0]} {self.register_names[1]}",
-                                            f"{result_register.name} = {function.body[i - 2].comment} + {function.body[i - 1].comment}")
-                    self.writer.instruction(f"{HighAssemblyInstructions.LOAD} {result_register.name} [{result_register.name}]",
-                                            f"{result_register.name} = {function.body[i - 2].comment}[{function.body[i - 1].comment}]")
-                    self._set_intermediate_result_comment(function, i + 1, f"{function.body[i - 2].comment}[{function.body[i - 1].comment}]")
+                    self.writer.instruction(command.to_high_assembly_instruction(), (result_register.name, self.register_names[0], self.register_names[1]),
+                                            f"{result_register.name} = {function.body[i - 2].comment} + {function.body[i - 1].comment}" if self.comments else "")
+                    self.writer.instruction(HighAssemblyInstructions.LOAD, (result_register.name, MemoryOperand(result_register.name)),
+                                            f"{result_register.name} = {function.body[i - 2].comment}[{function.body[i - 1].comment}]" if self.comments else "")
+                    if self.comments:
+                        self._set_intermediate_result_comment(function, i + 1, f"{function.body[i - 2].comment}[{function.body[i - 1].comment}]")
                 else:
                     if command == Operators.OFFSET_ASSIGNMENT_DEREFERENCE:
                         command = Operators.PLUS
                         self.array_assignment = True
-                    self.writer.instruction(f"{command.to_high_assembly_instruction()} {result_register.name} {self.register_names[0]} {self.register_names[1]}",
-                                            f"{result_register.name} = {function.body[i - 2].comment} {command.value} {function.body[i - 1].comment}")
-                    self._set_intermediate_result_comment(function, i + 1, f"{function.body[i - 2].comment} {command.value} {function.body[i - 1].comment}")
+                    self.writer.instruction(command.to_high_assembly_instruction(), (result_register.name, self.register_names[0], self.register_names[1]),
+                                            f"{result_register.name} = {function.body[i - 2].comment} {command.value} {function.body[i - 1].comment}" if self.comments else "")
+                    if self.comments:
+                        self._set_intermediate_result_comment(function, i + 1, f"{function.body[i - 2].comment} {command.value} {function.body[i - 1].comment}")
                     
             elif command in INDIRECT_MEMORY_OPERATORS:
                 if command == Operators.ASSIGNMENT_DEREFERENCE:
                     self.array_assignment = True
-                    self.writer.instruction(f"{Operators.ASSIGNMENT.to_high_assembly_instruction()} {result_register.name} {self.register_names[0]}", 
-                                            f"{result_register.name} = *{function.body[i - 1].comment}")
+                    self.writer.instruction(Operators.ASSIGNMENT.to_high_assembly_instruction(), (result_register.name, self.register_names[0]), 
+                                            f"{result_register.name} = *{function.body[i - 1].comment}" if self.comments else "")
                 else:
-                    self.writer.instruction(f"{command.to_high_assembly_instruction()} {result_register.name} [{self.register_names[0]}]", 
-                                            f"{result_register.name} = *{function.body[i - 1].comment}")
-                self._set_intermediate_result_comment(function, i + 1, f"*{function.body[i - 1].comment}", False)
+                    self.writer.instruction(command.to_high_assembly_instruction(), (result_register.name, MemoryOperand(self.register_names[0])), 
+                                            f"{result_register.name} = *{function.body[i - 1].comment}" if self.comments else "")
+                if self.comments:
+                    self._set_intermediate_result_comment(function, i + 1, f"*{function.body[i - 1].comment}", False)
             elif command == Operators.UNARY_PLUS:
-                self.writer.instruction(f"{command.to_high_assembly_instruction()} {result_register.name} {self.register_names[0]} 0", 
-                                        f"{command.value.replace('U', '')}{function.body[i - 1].comment} - dummy")
-                self._set_intermediate_result_comment(function, i + 1, f"{command.value.replace('U', '')}{function.body[i - 1].comment} - dummy")
+                self.writer.instruction(command.to_high_assembly_instruction(), (result_register.name, self.register_names[0], 0), 
+                                        f"{command.value.replace('U', '')}{function.body[i - 1].comment} - dummy" if self.comments else "")
+                if self.comments:
+                    self._set_intermediate_result_comment(function, i + 1, f"{command.value.replace('U', '')}{function.body[i - 1].comment} - dummy")
             self.intermediate_result_counter += 1
         else:
-            self.register_file.clear_last_instruction()
+            self.register_file.clear_last_instruction(self.register_names[0] if command == Operators.ASSIGNMENT and not self.array_assignment else None)
             if command in FIRST_OPERAND_OPERATORS: # currently only PUSH
-                self.writer.instruction(f"{command.to_high_assembly_instruction()} {self.register_names[0]}", f"push {function.body[i - 1].comment}")
+                self.writer.instruction(command.to_high_assembly_instruction(), (self.register_names[0],), f"push {function.body[i - 1].comment}" if self.comments else "")
             elif command in BOTH_OPERAND_OPERATORS:
                 if command == Operators.ASSIGNMENT and self.array_assignment:
                     self.array_assignment = False
-                    self.writer.instruction(f"{HighAssemblyInstructions.STORE} [{self.register_names[0]}] {self.register_names[1]}",
-                                            f"*{function.body[i - 2].comment} {command.value} {function.body[i - 1].comment}")
+                    self.writer.instruction(HighAssemblyInstructions.STORE, (MemoryOperand(self.register_names[0]), self.register_names[1]),
+                                            f"*{function.body[i - 2].comment} {command.value} {function.body[i - 1].comment}" if self.comments else "")
                 else:
-                    self.writer.instruction(f"{command.to_high_assembly_instruction()} {self.register_names[0]} {self.register_names[1]}",
-                                            f"{function.body[i - 2].comment} {command.value} {function.body[i - 1].comment}")
+                    self.writer.instruction(command.to_high_assembly_instruction(), (self.register_names[0], self.register_names[1]),
+                                            f"{function.body[i - 2].comment} {command.value} {function.body[i - 1].comment}" if self.comments else "")
                     if command == Operators.ASSIGNMENT:
                         self.register_file.write_register(self.register_names[0])
 
@@ -248,19 +373,29 @@ class HighAssemblyGenerator():
 
     def _handle_internal_alphabet(self, command: InternalAlphabet, function: Function, i: int):
         if command == InternalAlphabet.EXPRESSION_END:
-            if self.return_expression:
+            if self.condition_jump: # the next part of the condition follows
+                self.condition_jump = False
+                self.condition_part += 1
+                if self.condition_part in self.condition_targets:
+                    self.register_file.invalidate()
+                    self.writer.label(f"{self._jump_label(function)}_part_{self.condition_part}")
+            elif self.return_expression and self.tail_call: # the function already jumped to its start
+                self.return_expression = False
+                self.tail_call = False
+            elif self.return_expression:
                 self.return_expression = False
                 self.register_file.assign_return_register(lambda x: self._find_intermediate_result(function, i, x))
                 self.register_file.store_global_variables()
                 self.register_file.destroy_stack_frame()
-                self.writer.instruction(f"{HighAssemblyInstructions.RET} {function.number_of_parameters}", f"clean {function.number_of_parameters} function parameter{'s' if function.number_of_parameters != 1 else ''} from the stack and return")
+                self.writer.instruction(HighAssemblyInstructions.RET, (function.number_of_parameters,), f"clean {function.number_of_parameters} function parameter{'s' if function.number_of_parameters != 1 else ''} from the stack and return")
                 self.register_file.invalidate()
             elif self.for_part1:
                 self.for_part1 = False
                 self.for_part2 = True
                 self.register_file.store_written()
                 self.register_file.invalidate()
-                self.writer.comment(f"{Keywords.FOR.to_label(function.name, self.for_scope_ids, self.scope_index)} condition")
+                if self.comments:
+                    self.writer.comment(f"{Keywords.FOR.to_label(function.name, self.for_scope_ids, self.scope_index)} condition")
                 self.writer.label(f"{Keywords.FOR.to_label(function.name, self.for_scope_ids, self.scope_index)}_start")
             elif self.for_part2:
                 self.for_part2 = False
@@ -270,22 +405,20 @@ class HighAssemblyGenerator():
             self.intermediate_result_counter = 0
             self.register_index = 0
 
-        elif command == InternalAlphabet.EQUAL_ZERO_JUMP:
+        elif command == InternalAlphabet.EQUAL_ZERO_JUMP or command == InternalAlphabet.NOT_ZERO_JUMP:
             self.register_file.resolve_register_names(self.register_names)
-            if self.current_jump_statement == Keywords.IF or self.current_jump_statement == Keywords.ELSE_IF or self.current_jump_statement == Keywords.ELSE:
-                self.writer.instruction(f"{HighAssemblyInstructions.JZ} {self.register_names[0]} {self.current_jump_statement.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter - 1)}_{'end' if self.current_jump_statement == Keywords.WHILE or self.current_jump_statement == Keywords.FOR else 'skip'}", 
-                                        f"jump when not {function.body[i - 1].comment}")
-                self.writer.comment(f"{self.current_jump_statement.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter - 1)} body")
-            elif self.current_jump_statement == Keywords.WHILE:
-                self.writer.instruction(f"{HighAssemblyInstructions.JZ} {self.register_names[0]} {self.current_jump_statement.to_label(function.name, self.while_scope_ids, self.scope_index)}_end", 
-                                        f"jump when not {function.body[i - 1].comment}")
-                self.writer.comment(f"{self.current_jump_statement.to_label(function.name, self.while_scope_ids, self.scope_index)} body")
-            elif self.current_jump_statement == Keywords.FOR:
-                self.writer.instruction(f"{HighAssemblyInstructions.JZ} {self.register_names[0]} {self.current_jump_statement.to_label(function.name, self.for_scope_ids, self.scope_index)}_end", 
-                                        f"jump when not {function.body[i - 1].comment}")
-                self.writer.comment(f"{self.current_jump_statement.to_label(function.name, self.for_scope_ids, self.scope_index)} body")
+            if command == InternalAlphabet.EQUAL_ZERO_JUMP:
+                self.writer.instruction(HighAssemblyInstructions.JZ, (self.register_names[0], self._exit_label(function)), f"jump when not {function.body[i - 1].comment}" if self.comments else "")
             else:
-                raise Exception("Unknown jump statement")
+                self.writer.instruction(HighAssemblyInstructions.JNZ, (self.register_names[0], self._exit_label(function)), f"jump when {function.body[i - 1].comment}" if self.comments else "")
+            self.register_file.clear_last_instruction() # a variable tested on its own stays cached, but its register can be used again
+            if self.condition_part + 1 in self.condition_targets: # the earlier parts of the condition jump to the body
+                self.register_file.invalidate()
+                self.writer.label(f"{self._jump_label(function)}_part_{self.condition_part + 1}")
+            if self.comments:
+                self.writer.comment(f"{self._jump_label(function)} body")
+            self.condition_part = 0
+            self.condition_targets = set()
 
         elif command == InternalAlphabet.SCOPE_INCREMENT:
             if not self.for_part1 and self.current_jump_statement: # no increment for first 'for' statement or empty statements
@@ -306,7 +439,7 @@ class HighAssemblyGenerator():
                     self.register_file.store_written()
                     self.register_file.invalidate()
                     if function.body[i + 1] == Keywords.ELSE_IF or function.body[i + 1] == Keywords.ELSE:
-                        self.writer.instruction(f"{HighAssemblyInstructions.JMP} {Keywords.IF.to_label(function.name, self.if_scope_ids, self.scope_index)}_end")
+                        self.writer.instruction(HighAssemblyInstructions.JMP, (f"{Keywords.IF.to_label(function.name, self.if_scope_ids, self.scope_index)}_end",))
                     self.writer.label(f"{self.current_jump_statement.to_label(function.name, self.if_scope_ids, self.scope_index)}_skip")
                     if function.body[i + 1] != Keywords.ELSE and function.body[i + 1] != Keywords.ELSE_IF:
                         self.if_scope_ids[self.scope_index] += 1
@@ -315,7 +448,7 @@ class HighAssemblyGenerator():
                     self.register_file.store_written()
                     self.register_file.invalidate()
                     if function.body[i + 1] == Keywords.ELSE_IF or function.body[i + 1] == Keywords.ELSE:
-                        self.writer.instruction(f"{HighAssemblyInstructions.JMP} {Keywords.IF.to_label(function.name, self.if_scope_ids, self.scope_index)}_end")
+                        self.writer.instruction(HighAssemblyInstructions.JMP, (f"{Keywords.IF.to_label(function.name, self.if_scope_ids, self.scope_index)}_end",))
                         self.writer.label(f"{self.current_jump_statement.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter - 1)}_skip")
                     else:
                         self.writer.label(f"{Keywords.IF.to_label(function.name, self.if_scope_ids, self.scope_index)}_end")
@@ -332,18 +465,19 @@ class HighAssemblyGenerator():
                 elif self.current_jump_statement == Keywords.WHILE:
                     self.register_file.store_written()
                     self.register_file.invalidate()
-                    self.writer.instruction(f"{HighAssemblyInstructions.JMP} {Keywords.WHILE.to_label(function.name, self.while_scope_ids, self.scope_index)}_start")
+                    self.writer.instruction(HighAssemblyInstructions.JMP, (f"{Keywords.WHILE.to_label(function.name, self.while_scope_ids, self.scope_index)}_start",))
                     self.writer.label(f"{Keywords.WHILE.to_label(function.name, self.while_scope_ids, self.scope_index)}_end")
                     self.writer.new_line()
                     self.while_scope_ids[self.scope_index] += 1
                 
                 elif self.current_jump_statement == Keywords.FOR:
                     saved_for_statement = self.for_last_statement_stack.pop()
-                    self.writer.comment(f"{Keywords.FOR.to_label(function.name, self.for_scope_ids, self.scope_index)} increment")
+                    if self.comments:
+                        self.writer.comment(f"{Keywords.FOR.to_label(function.name, self.for_scope_ids, self.scope_index)} increment")
                     self._process_last_for_statement(saved_for_statement, function)
                     self.register_file.store_written()
                     self.register_file.invalidate()
-                    self.writer.instruction(f"{HighAssemblyInstructions.JMP} {Keywords.FOR.to_label(function.name, self.for_scope_ids, self.scope_index)}_start")
+                    self.writer.instruction(HighAssemblyInstructions.JMP, (f"{Keywords.FOR.to_label(function.name, self.for_scope_ids, self.scope_index)}_start",))
                     self.writer.label(f"{Keywords.FOR.to_label(function.name, self.for_scope_ids, self.scope_index)}_end")
                     self.writer.new_line()
                     self.for_scope_ids[self.scope_index] += 1
@@ -352,7 +486,34 @@ class HighAssemblyGenerator():
                 self.scope_index -= 1
 
         elif command == InternalAlphabet.FUNCTION_END:
-            self.writer.raw(f"{HighAssemblyInstructions.EOF} ; end of function {function.name if function.name else ''}")
+            self.writer.end_of_function(f"end of function {function.name if function.name else ''}")
+
+    def _handle_condition_jump(self, command: ConditionJump, function: Function, i: int):
+        # nothing is written in a condition, so only the cached registers are dropped at the start of a part another part jumps to
+        self.register_file.resolve_register_names(self.register_names)
+        if command.target is None:
+            label = self._exit_label(function)
+        else:
+            label = f"{self._jump_label(function)}_part_{command.target}"
+            self.condition_targets.add(command.target)
+        self.writer.instruction(HighAssemblyInstructions.JZ if command.when_zero else HighAssemblyInstructions.JNZ, (self.register_names[0], label),
+                                f"jump when {'not ' if command.when_zero else ''}{function.body[i - 1].comment}" if self.comments else "")
+        self.register_file.clear_last_instruction()
+        self.condition_jump = True
+
+    def _jump_label(self, function: Function) -> str:
+        # label of the 'if', 'else if', 'while' or 'for' statement, whose condition is evaluated
+        if self.current_jump_statement == Keywords.IF or self.current_jump_statement == Keywords.ELSE_IF or self.current_jump_statement == Keywords.ELSE:
+            return self.current_jump_statement.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter - 1)
+        elif self.current_jump_statement == Keywords.WHILE:
+            return self.current_jump_statement.to_label(function.name, self.while_scope_ids, self.scope_index)
+        elif self.current_jump_statement == Keywords.FOR:
+            return self.current_jump_statement.to_label(function.name, self.for_scope_ids, self.scope_index)
+        raise Exception("Unknown jump statement")
+
+    def _exit_label(self, function: Function) -> str:
+        # label past the body of the statement, where its condition jumps, when it is false
+        return f"{self._jump_label(function)}_{'end' if self.current_jump_statement == Keywords.WHILE or self.current_jump_statement == Keywords.FOR else 'skip'}"
 
     def _handle_keyword(self, command: Keywords, function: Function, i: int):
         if command == Keywords.IF or command == Keywords.ELSE_IF or command == Keywords.ELSE or command == Keywords.WHILE or command == Keywords.FOR:
@@ -368,24 +529,29 @@ class HighAssemblyGenerator():
         elif command == Keywords.IF:
             self.current_jump_statement = Keywords.IF
             self.writer.new_line()
-            self.writer.comment(f"{command.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter)} header")
+            if self.comments:
+                self.writer.comment(f"{command.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter)} header")
             self.register_file.store_written()
         elif command == Keywords.ELSE_IF:
             self.current_jump_statement = Keywords.ELSE_IF
-            self.writer.comment(f"{command.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter)} header")
+            if self.comments:
+                self.writer.comment(f"{command.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter)} header")
             self.else_if_counter += 1
         elif command == Keywords.ELSE:
             self.current_jump_statement = Keywords.ELSE
-            self.writer.comment(f"{command.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter)}")
+            if self.comments:
+                self.writer.comment(f"{command.to_label(function.name, self.if_scope_ids, self.scope_index, self.else_if_counter)}")
         elif command == Keywords.WHILE:
             self.current_jump_statement = Keywords.WHILE
-            self.writer.comment(f"{command.to_label(function.name, self.while_scope_ids, self.scope_index)} header")
+            if self.comments:
+                self.writer.comment(f"{command.to_label(function.name, self.while_scope_ids, self.scope_index)} header")
             self.register_file.store_written()
             self.writer.label(f"{command.to_label(function.name, self.while_scope_ids, self.scope_index)}_start")
             self.register_file.invalidate()
         elif command == Keywords.FOR:
             self.current_jump_statement = Keywords.FOR
-            self.writer.comment(f"{command.to_label(function.name, self.for_scope_ids, self.scope_index)} assignment")
+            if self.comments:
+                self.writer.comment(f"{command.to_label(function.name, self.for_scope_ids, self.scope_index)} assignment")
             self.for_part1 = True
     
     def _process_last_for_statement(self, commands: list[tuple], function: Function):
@@ -408,24 +574,18 @@ class HighAssemblyGenerator():
 
 # functions to print better comments
     def _set_intermediate_result_comment(self, function: Function, function_index: int, comment: str, bracket: bool = True):
-        for command in function.body[function_index:]:
-            if isinstance(command, IntermediateResult) and command.number == self.intermediate_result_counter:
-                command.set_comment(comment, bracket)
-                return
-        
-        for command in reversed(function.body[:function_index + 1]):
-            if isinstance(command, Keywords) and command == Keywords.RETURN:
-                command.set_comment(comment)
-                return
+        intermediate_result = self.intermediate_results.next(self.intermediate_result_counter, function_index)
+        if intermediate_result is not None:
+            intermediate_result.set_comment(comment, bracket)
+            return
+
+        return_keyword = self.intermediate_results.previous_return(function_index)
+        if return_keyword is not None:
+            return_keyword.set_comment(comment)
     
     def _find_intermediate_result(self, function: Function, function_index: int, number: int) -> IntermediateResult:
-        for command in reversed(function.body[:function_index + 1]):
-            if isinstance(command, IntermediateResult) and command.number == number:
-                return command
-        
-        for command in reversed(function.body[:function_index + 1]):
-            if isinstance(command, Keywords) and command == Keywords.RETURN:
-                return command
-
-        return None
+        intermediate_result = self.intermediate_results.previous(number, function_index)
+        if intermediate_result is not None:
+            return intermediate_result
+        return self.intermediate_results.previous_return(function_index)
         
@@ -0,0 +1,258 @@
+from enums import InternalAlphabet, Keywords, Operators, Types
+from constructs import Comment, Function, IntermediateResult, Parameter, ReturnValue, Variable, Constant
+from high_assembly_generator import INTERMEDIATE_RESULT_OPERATORS
+from register_allocation import BOUNDARY_COMMANDS, LOOP_WEIGHT, MAX_LOOP_DEPTH
+
+# growth of a function by an inlined call, i.e. the size of the callee minus the saved call, above which the call is not inlined
+INLINE_LIMIT = 20
+# instructions of a call saved by inlining, i.e. the jump and the return, the stack frame and the saved registers of the callee, and per argument
+CALL_COST = 8
+ARGUMENT_COST = 1
+
+class InlinedCall():
+    def __init__(self, caller: str, callee: str, size: int, benefit: int, reason: str|None = None) -> None:
+        self.caller = caller
+        self.callee = callee
+        self.size = size
+        self.benefit = benefit
+        self.reason = reason # why the call is not inlined, None when it is
+
+class Inliner():
+    # replaces calls of small functions by their bodies, the calls must be whole statements, i.e. 'f(...);', 'v = f(...);' or 'return f(...);',
+    # the arguments are assigned to copies of the parameters, unless they are constants or local variables and the parameter is never assigned,
+    # the local variables of the callee become local variables of the caller and its return statements assign the returned value to 'v',
+    # so they must be the last statements of the callee (possibly in the branches of an 'if' statement), except of 'return f(...);'
+    def __init__(self, functions: dict[str, Function], inline_limit: int = INLINE_LIMIT) -> None:
+        self.functions = functions
+        self.inline_limit = inline_limit
+        self.calls: list[InlinedCall] = []
+
+    def inline(self, callers: list[Function]):
+        # the callers are processed after the functions they call, so the calls inlined into a callee are inlined with it
+        processed = set()
+        def visit(function: Function):
+            processed.add(function.name)
+            for command in function.body:
+                if isinstance(command, ReturnValue) and command.function.name not in processed:
+                    callee = self.functions.get(command.function.name)
+                    if callee is not None and callee in callers:
+                        visit(callee)
+            self._inline_calls(function)
+        for function in callers:
+            if function.name not in processed:
+                visit(function)
+
+    def report(self) -> str:
+        width = max([len("call")] + [len(f"{call.caller} -> {call.callee}") for call in self.calls])
+        lines = [f"{'call':<{width}}  {'size':>6}  {'benefit':>7}  inlined"]
+        lines += [f"{call.caller + ' -> ' + call.callee:<{width}}  {call.size:>6}  {call.benefit:>7}  {call.reason or 'yes'}" for call in self.calls]
+        lines.append(f"{len([call for call in self.calls if call.reason is None])} of {len(self.calls)} calls inlined")
+        return '\n'.join(lines)
+
+    def _inline_calls(self, caller: Function):
+        body = caller.body
+        new_body = []
+        scopes: list[bool] = [] # whether the scope is a loop
+        loop_keyword = None
+        header_statements = 0 # statements of the header of a 'for' loop, which are not inlined into
+        start = 0
+        call = False # whether the current statement calls a function
+        for i, command in enumerate(body):
+            if isinstance(command, ReturnValue):
+                call = True
+            elif isinstance(command, Comment) and i == start: # comments precede the statements
+                new_body.append(command)
+                start = i + 1
+            elif isinstance(command, Keywords) or command in BOUNDARY_COMMANDS:
+                if command in (Keywords.WHILE, Keywords.FOR, Keywords.IF, Keywords.ELSE_IF, Keywords.ELSE):
+                    loop_keyword = command if command in (Keywords.WHILE, Keywords.FOR) else None
+                elif command == InternalAlphabet.SCOPE_INCREMENT:
+                    scopes.append(loop_keyword is not None)
+                    header_statements = 3 if loop_keyword == Keywords.FOR else 0
+                    loop_keyword = None
+                elif command == InternalAlphabet.SCOPE_DECREMENT:
+                    scopes.pop()
+                new_body.append(command)
+                start = i + 1
+            elif command == InternalAlphabet.EXPRESSION_END:
+                statement = body[start:i + 1]
+                returned = start > 0 and body[start - 1] == Keywords.RETURN
+                replacement = None
+                if header_statements > 0:
+                    header_statements -= 1
+                elif call:
+                    replacement = self._inline_statement(caller, statement, returned, sum(scopes))
+                if replacement is None:
+                    new_body += statement
+                else:
+                    if returned: # the inlined body returns the value itself
+                        new_body.pop()
+                    new_body += replacement
+                start = i + 1
+                call = False
+        caller.body = new_body
+
+    def _inline_statement(self, caller: Function, statement: list, returned: bool, loop_depth: int) -> list|None:
+        # the commands replacing the statement or None, when its call is not inlined
+        calls = [k for k, command in enumerate(statement) if isinstance(command, ReturnValue)]
+        if len(calls) != 1:
+            return None
+        call = calls[0]
+        target = None
+        if call == len(statement) - 2:
+            arguments = statement[:call]
+        elif (not returned and call == len(statement) - 3 and statement[call + 1] == Operators.ASSIGNMENT
+              and isinstance(statement[call - 1], Variable) and statement[call - 1].type != Types.ARRAY):
+            target = statement[call - 1]
+            arguments = statement[:call - 1]
+        else:
+            return None
+
+        callee = self.functions.get(statement[call].function.name)
+        if callee is None or len(callee.body) == 0:
+            return None
+        segments = self._argument_segments(arguments, callee.number_of_parameters)
+        if segments is None:
+            return None
+
+        size = _size(callee)
+        benefit = (CALL_COST + ARGUMENT_COST * callee.number_of_parameters) * LOOP_WEIGHT ** min(loop_depth, MAX_LOOP_DEPTH)
+        reason = self._rejection(caller, callee, returned)
+        if reason is None and size - benefit > self.inline_limit:
+            reason = "too large"
+        self.calls.append(InlinedCall(caller.name, callee.name, size, benefit, reason))
+        if reason is not None:
+            return None
+
+        variables: dict[Variable, Variable|Constant] = {}
+        commands = []
+        assigned = _assigned_variables(callee)
+        produced = 0 # intermediate results of the preceding arguments
+        for parameter, segment in zip(callee.parameters, segments):
+            operand = segment[-2]
+            if (len(segment) == 3 and parameter not in assigned and
+                (isinstance(operand, Constant) or (isinstance(operand, Variable) and not operand.global_scope and operand.type != Types.ARRAY))):
+                variables[parameter] = operand
+            else:
+                variables[parameter] = local_variable(caller, parameter, callee.name)
+                renumbered = _renumbered(segment, produced)
+                commands += renumbered[:-3] + [variables[parameter], renumbered[-2], Operators.ASSIGNMENT, InternalAlphabet.EXPRESSION_END]
+            produced += sum(command in INTERMEDIATE_RESULT_OPERATORS for command in segment)
+        for variable in callee.variables:
+            variables[variable] = local_variable(caller, variable, callee.name)
+
+        body = callee.body[1:-1]
+        start = 0
+        for k, command in enumerate(body):
+            if k < start:
+                continue
+            elif command != Keywords.RETURN:
+                commands.append(variables.get(command, command) if isinstance(command, Variable) else
+                                IntermediateResult(command.number) if isinstance(command, IntermediateResult) else command)
+                continue
+            end = body.index(InternalAlphabet.EXPRESSION_END, k)
+            expression = [variables.get(command, command) if isinstance(command, Variable) else command for command in _renumbered(body[k + 1:end])]
+            start = end + 1
+            if returned:
+                commands += [Keywords.RETURN] + expression + [InternalAlphabet.EXPRESSION_END]
+            elif target is not None:
+                commands += _assignment(target, expression)
+            elif any(isinstance(command, ReturnValue) or command in (Operators.ASSIGNMENT, Operators.ASSIGNMENT_DEREFERENCE, Operators.OFFSET_ASSIGNMENT_DEREFERENCE)
+                     for command in expression): # the returned value is not used, but its expression has side effects
+                commands += _assignment(local_variable(caller, Variable("int", name="result"), callee.name), expression)
+        return commands
+
+    def _argument_segments(self, arguments: list, number_of_parameters: int) -> list[list]|None:
+        # commands computing each argument, each segment ends with the parameter marker, the operand and the parameter assignment
+        segments = []
+        start = 0
+        for k, command in enumerate(arguments):
+            if command == Operators.PARAMETER_ASSIGNMENT:
+                segment = arguments[start:k + 1]
+                if len(segment) < 3 or not isinstance(segment[-3], Parameter) or segment[-3].number != len(segments):
+                    return None
+                segments.append(segment)
+                start = k + 1
+        if start != len(arguments) or len(segments) != number_of_parameters:
+            return None
+        return segments
+
+    def _rejection(self, caller: Function, callee: Function, returned: bool) -> str|None:
+        # why the callee cannot be inlined into the caller, None when it can
+        if callee is caller or any(isinstance(command, ReturnValue) and command.function.name == callee.name for command in callee.body):
+            return "recursive"
+        if Keywords.BREAK in callee.body:
+            return "break"
+        if any(variable not in callee.parameters and variable not in callee.variables and not variable.global_scope
+               for variable in callee.body if isinstance(variable, Variable)):
+            return "unknown variable"
+        if not returned and not _tail_returns(callee.body):
+            return "return not at the end"
+        return None
+
+def _size(function: Function) -> int:
+    # number of the operands, operators and keywords of the body
+    return sum(not isinstance(command, (InternalAlphabet, Parameter, IntermediateResult, Comment)) for command in function.body)
+
+def _assigned_variables(function: Function) -> set[Variable]:
+    return {function.body[k - 2] for k, command in enumerate(function.body) if command == Operators.ASSIGNMENT}
+
+def local_variable(function: Function, template: Variable, prefix: str) -> Variable:
+    # a new local variable of the function below its other local variables
+    lowest = min([variable.stack_offset for variable in function.variables], default=-1)
+    variable = Variable(stack_offset=lowest - template.stack_size, name=f"{prefix}.{template.name}")
+    variable.type = template.type
+    variable.stack_size = template.stack_size
+    function.add_variable(variable)
+    return variable
+
+def _renumbered(commands: list, produced: int = 0) -> list:
+    # the commands with new intermediate results, which are numbered in each statement, 'produced' are the intermediate results
+    # of the statement before the commands, which now start a statement
+    return [IntermediateResult(command.number - produced) if isinstance(command, IntermediateResult) else command for command in commands]
+
+def _assignment(target: Variable, expression: list) -> list:
+    # statement assigning the value of the expression to the variable
+    if len(expression) == 1:
+        return [target, expression[0], Operators.ASSIGNMENT, InternalAlphabet.EXPRESSION_END]
+    elif isinstance(expression[-1], ReturnValue):
+        return expression[:-1] + [target, expression[-1], Operators.ASSIGNMENT, InternalAlphabet.EXPRESSION_END]
+    produced = sum(command in INTERMEDIATE_RESULT_OPERATORS for command in expression)
+    return expression + [target, IntermediateResult(produced - 1), Operators.ASSIGNMENT, InternalAlphabet.EXPRESSION_END]
+
+def _tail_returns(body: list) -> bool:
+    # whether all return statements end the function, i.e. they are followed only by the ends of the branches of 'if' statements
+    loops: list[bool] = []
+    loop_keyword = None
+    for k, command in enumerate(body):
+        if command in (Keywords.WHILE, Keywords.FOR, Keywords.IF, Keywords.ELSE_IF, Keywords.ELSE):
+            loop_keyword = command if command in (Keywords.WHILE, Keywords.FOR) else None
+        elif command == InternalAlphabet.SCOPE_INCREMENT:
+            loops.append(loop_keyword is not None)
+            loop_keyword = None
+        elif command == InternalAlphabet.SCOPE_DECREMENT:
+            loops.pop()
+        elif command == Keywords.RETURN:
+            if any(loops):
+                return False
+            j = body.index(InternalAlphabet.EXPRESSION_END, k) + 1
+            while body[j] != InternalAlphabet.FUNCTION_END:
+                if body[j] == InternalAlphabet.SCOPE_DECREMENT or isinstance(body[j], Comment):
+                    j += 1
+                elif body[j] == Keywords.ELSE or body[j] == Keywords.ELSE_IF: # the other branches are skipped
+                    j = scope_end(body, body.index(InternalAlphabet.SCOPE_INCREMENT, j))
+                else:
+                    return False
+    return True
+
+def scope_end(body: list, start: int) -> int:
+    # position after the scope decrement matching the scope increment at 'start'
+    depth = 0
+    for k in range(start, len(body)):
+        if body[k] == InternalAlphabet.SCOPE_INCREMENT:
+            depth += 1
+        elif body[k] == InternalAlphabet.SCOPE_DECREMENT:
+            depth -= 1
+            if depth == 0:
+                return k + 1
+    return len(body)
@@ -6,8 +6,7 @@
    RET                                  ; return
 EOF
 
-&display_7segment:                      ; int display_7segment(int value)
-   POP eax                              ; get value
-   OUT eax 224                          ; display value
+&display_7segment:                      ; int display_7segment(int value), parameter in r1
+   OUT r1 224                           ; display value
    RET                                  ; return
 EOF
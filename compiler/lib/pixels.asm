@@ -1,51 +1,32 @@
 
-&draw_pixel:                            ; int draw_pixel(int x, int y, int color)
-   PUSH edx                             ; save return address
-   LOAD edx [esp+3]                     ; load x
-   LOAD eax [esp+2]                     ; load y
-   MUL eax eax 640                      ; compute offset to row y
-   ADD eax eax edx                      ; add offset to colum x
+&draw_pixel:                            ; int draw_pixel(int x, int y, int color), parameters in r1, r2 and r3
+   MUL eax r2 640                       ; compute offset to row y
+   ADD eax eax r1                       ; add offset to colum x
    OUT eax 160                          ; set the VGA cursor
-   LOAD eax [esp+1]                     ; load color
-   OUT eax 161                          ; write the color to the VGA
-   POP edx                              ; restore return address
-   ADD esp esp 3                        ; pop parameters
+   OUT r3 161                           ; write the color to the VGA
    RET                                  ; return
 EOF
 
 
-&draw_quad_pixel:                       ; int draw_quad_pixel(int x, int y, int color)
-   PUSH edx                             ; save return address
-   LOAD edx [esp+2]                     ; load y
-   LOAD eax [esp+3]                     ; load x
-   MUL eax eax 640                      ; compute offset to row x
-   ADD eax eax edx                      ; add offset to colum y
+&draw_quad_pixel:                       ; int draw_quad_pixel(int x, int y, int color), parameters in r1, r2 and r3
+   MUL eax r1 640                       ; compute offset to row x
+   ADD eax eax r2                       ; add offset to colum y
    OUT eax 160                          ; set the VGA cursor
-   LOAD eax [esp+1]                     ; load color
-   OUT eax 162                          ; write the color to the VGA
-   POP edx                              ; restore return address
-   ADD esp esp 3                        ; pop parameters
+   OUT r3 162                           ; write the color to the VGA
    RET                                  ; return
 EOF
 
-&get_pixel:                             ; int get_pixel(int x, int y)
-   PUSH edx                             ; save return address
-   LOAD edx [esp+2]                     ; load x
-   LOAD eax [esp+1]                     ; load y
-   MUL eax eax 640                      ; compute offset to row y
-   ADD eax eax edx                      ; add offset to colum x
+&get_pixel:                             ; int get_pixel(int x, int y), parameters in r1 and r2
+   MUL eax r2 640                       ; compute offset to row y
+   ADD eax eax r1                       ; add offset to colum x
    OUT eax 160                          ; set the VGA cursor
-   LOAD eax [esp+1]                     ; load color
    IN eax 161                           ; get a color of the pixel
-   POP edx                              ; restore return address
-   ADD esp esp 2                        ; pop parameters
    RET                                  ; return
 EOF
 
-&set_background:                        ; int set_background(int color)
+&set_background:                        ; int set_background(int color), parameter in r1
    OUT r0 160                           ; reset the VGA cursor
-   POP eax                              ; get the color from the stack
-   AND eax eax 15                       ; mask the color
+   AND eax r1 15                        ; mask the color
    PUSH edx                             ; save return address
    MOV edx eax                          ; copy the color to edx
    SHL eax eax 4                        ; shift the color to the next nibble
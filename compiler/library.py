@@ -0,0 +1,71 @@
+import io
+import json
+import os
+from enums import CallingConventions
+from constructs import Function
+from writer import HighAssemblyWriter
+from compilation_cache import CompilationCache, LibraryUnit
+
+# registers of the parameters of functions with the register calling convention
+PARAMETER_REGISTERS = ("r1", "r2", "r3")
+
+class Library():
+    # content of the lib directory, loaded once and shared by all programs compiled with the same options in one process
+    def __init__(self, path: str, global_variables_file_name: str, compilation_cache: CompilationCache, comments: bool = True,
+                 build_in: bool = True, c_library: bool = True):
+        self.path = path
+        self.compilation_cache = compilation_cache
+        self.comments = comments
+        self.modification_times = self._modification_times()
+
+        with open(os.path.join(path, global_variables_file_name), "r") as f:
+            self.global_variables: list[dict] = json.load(f)
+
+        # build in functions in *.asm files in lib directory described by *.json files
+        self.assembly_units: list[LibraryUnit] = []
+        if build_in:
+            for file_name in os.listdir(path):
+                if file_name.endswith(".json"):
+                    with open(os.path.join(path, file_name), "r") as f:
+                        asm_config = json.load(f)
+                    if isinstance(asm_config, list):
+                        continue
+                    with open(os.path.join(path, asm_config["file_name"]), "r") as f:
+                        assembly = f.read()
+                    key = compilation_cache.key(json.dumps(asm_config, sort_keys=True), assembly)
+                    library_unit = compilation_cache.load(key)
+                    if library_unit is None:
+                        library_unit = assembly_unit(asm_config, assembly, self.unit_writer())
+                        compilation_cache.store(key, library_unit)
+                    self.assembly_units.append(library_unit)
+
+        # library functions in *.c files in lib directory, parsed after the files of each program
+        self.sources: list[tuple[str, str]] = []
+        if c_library:
+            for file_name in os.listdir(path):
+                if file_name.endswith(".c"):
+                    with open(os.path.join(path, file_name), "r") as f:
+                        self.sources.append((os.path.join(path, file_name), f.read()))
+
+    def is_current(self) -> bool:
+        # a long running process reloads the library, when a file in the lib directory changed
+        return self._modification_times() == self.modification_times
+
+    def _modification_times(self) -> dict[str, float]:
+        return {file_name: os.path.getmtime(os.path.join(self.path, file_name)) for file_name in os.listdir(self.path)}
+
+    def unit_writer(self) -> HighAssemblyWriter:
+        return HighAssemblyWriter(in_file=True, output_file=io.StringIO(), buffered=True, comments=self.comments)
+
+def assembly_unit(asm_config: dict, assembly: str, writer: HighAssemblyWriter) -> LibraryUnit:
+    for line in assembly.splitlines():
+        writer.raw(line.rstrip())
+    return LibraryUnit(functions=[assembly_function(function) for function in asm_config["functions"]], sections=writer.sections())
+
+def assembly_function(function_config: dict) -> Function:
+    # the parameters are pushed to the stack, unless the function declares the register calling convention
+    function = Function(name=function_config["name"], number_of_parameters=function_config["number_of_parameters"], return_type=function_config["return_type"])
+    function.calling_convention = CallingConventions(function_config.get("calling_convention", CallingConventions.STACK.value))
+    if function.calling_convention == CallingConventions.REGISTERS and function.number_of_parameters > len(PARAMETER_REGISTERS):
+        raise Exception(f"Function '{function.name}' has more than {len(PARAMETER_REGISTERS)} parameters for the register calling convention.")
+    return function
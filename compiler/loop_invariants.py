@@ -0,0 +1,168 @@
+from enums import InternalAlphabet, Keywords, Operators, Types
+from constructs import Comment, Constant, Function, IntermediateResult, ReturnValue, Variable
+from high_assembly_generator import FIRST_OPERAND_OPERATORS, INDIRECT_MEMORY_OPERATORS, INTERMEDIATE_RESULT_OPERATORS
+from register_allocation import BOUNDARY_COMMANDS
+from inliner import local_variable, scope_end
+from short_circuits import LOGICAL_OPERATORS
+
+# operators reading the memory, their results change with the stores and the calls in the loop
+LOAD_OPERATORS = (Operators.DEREFERENCE, Operators.OFFSET_DEREFERENCE)
+# operators writing the memory, their addresses are computed in the loop
+STORE_OPERATORS = (Operators.ASSIGNMENT_DEREFERENCE, Operators.OFFSET_ASSIGNMENT_DEREFERENCE)
+
+class LoopInvariantCodeMotion():
+    # moves the computations of the loops, whose operands do not change in the loop, i.e. constants and variables, which are not assigned in the loop,
+    # to new local variables assigned before the loop, global variables do not change only in loops without calls and the memory only in loops
+    # without calls and stores, the loops are processed from the outermost one, so a computation leaves all loops, in which it does not change
+    def __init__(self) -> None:
+        self.moved = 0 # number of moved computations
+        self.function_moved = 0
+
+    def move(self, functions: list[Function]):
+        for function in functions:
+            self._move_function(function)
+
+    def _move_function(self, function: Function):
+        body = function.body
+        self.function_moved = 0
+        k = 0
+        while k < len(body):
+            if body[k] == Keywords.WHILE or body[k] == Keywords.FOR:
+                end = scope_end(body, body.index(InternalAlphabet.SCOPE_INCREMENT, k))
+                preheader = self._move_loop(function, body, k, end)
+                start = k
+                while start > 0 and isinstance(body[start - 1], Comment): # comments precede the statements
+                    start -= 1
+                body[start:start] = preheader
+                k += len(preheader)
+            k += 1
+
+    def _move_loop(self, function: Function, body: list, start: int, end: int) -> list:
+        # replaces the invariant computations of the loop between 'start' and 'end' by variables and returns the statements assigning them
+        loop = body[start:end]
+        assigned = {loop[j - 2] for j, command in enumerate(loop) if command == Operators.ASSIGNMENT}
+        calls = any(isinstance(command, ReturnValue) for command in loop)
+        stores = calls or any(command in STORE_OPERATORS for command in loop)
+        invariant_operand = lambda operand: (isinstance(operand, Constant) or (isinstance(operand, Variable) and operand.type != Types.ARRAY and
+                                             operand not in assigned and not (operand.global_scope and calls)))
+
+        preheader = []
+        variables: dict[tuple, Variable] = {}
+        new_loop = []
+        statement_start = 0
+        header_statements = 1 if loop[0] == Keywords.FOR else 0 # the initialization of a 'for' loop runs once
+        for j, command in enumerate(loop):
+            if isinstance(command, (Keywords, Comment)) or command in BOUNDARY_COMMANDS:
+                new_loop += loop[statement_start:j + 1]
+                statement_start = j + 1
+            elif command == InternalAlphabet.EXPRESSION_END:
+                statement = loop[statement_start:j + 1]
+                if header_statements > 0:
+                    header_statements -= 1
+                elif any(isinstance(command, IntermediateResult) or (isinstance(command, Variable) and command.global_scope) for command in statement):
+                    statement = self._move_statement(function, statement, invariant_operand, stores, variables, preheader)
+                new_loop += statement
+                statement_start = j + 1
+        body[start:end] = new_loop + loop[statement_start:]
+        return preheader
+
+    def _move_statement(self, function: Function, statement: list, invariant_operand, stores: bool, variables: dict[tuple, Variable], preheader: list) -> list:
+        # the statement with its invariant computations replaced by variables, the computations with the same operands share a variable,
+        # the operands of '!', '&&' and '||' in a condition stay, as the short-circuited condition evaluates them only when they are needed
+        produced = [p for p, command in enumerate(statement) if command in INTERMEDIATE_RESULT_OPERATORS] # position of each intermediate result
+        operands = lambda p: [p - 1] if statement[p] in FIRST_OPERAND_OPERATORS or statement[p] in INDIRECT_MEMORY_OPERATORS or statement[p] == Operators.UNARY_PLUS else [p - 2, p - 1]
+        short_circuited = LOGICAL_OPERATORS if InternalAlphabet.EQUAL_ZERO_JUMP in statement else ()
+        invariant: dict[int, bool] = {}
+        def is_invariant(p: int) -> bool:
+            if p not in invariant:
+                command = statement[p]
+                if command in STORE_OPERATORS or (command in LOAD_OPERATORS and stores) or command in short_circuited:
+                    invariant[p] = False
+                else:
+                    invariant[p] = all(is_invariant(produced[statement[q].number]) if isinstance(statement[q], IntermediateResult) else
+                                       invariant_operand(statement[q]) or (command == Operators.OFFSET_DEREFERENCE and q == p - 2 and isinstance(statement[q], Variable))
+                                       for q in operands(p))
+            return invariant[p]
+
+        replaced: dict[int, Variable] = {} # positions of the replaced operands
+        removed: set[int] = set()
+        referenced = {command.number for command in statement if isinstance(command, IntermediateResult)}
+        for p, command in enumerate(statement):
+            if not (isinstance(command, Operators) or command == InternalAlphabet.EQUAL_ZERO_JUMP) or (command in INTERMEDIATE_RESULT_OPERATORS and produced.index(p) in referenced):
+                continue
+            pending = [p] # the operators, whose results are not used by other operators, and the computations of their operands
+            while pending:
+                o = pending.pop()
+                if statement[o] in short_circuited:
+                    continue
+                for q in ([o - 1] if statement[o] == InternalAlphabet.EQUAL_ZERO_JUMP else operands(o)):
+                    operand = statement[q]
+                    if isinstance(operand, IntermediateResult):
+                        root = produced[operand.number]
+                        if not is_invariant(root):
+                            pending.append(root)
+                            continue
+                        computation = computation_positions(statement, root, produced, operands)
+                        removed.update(computation)
+                        key = tuple(_key(statement[r], computation, produced) for r in computation)
+                    elif (isinstance(operand, Variable) and operand.global_scope and invariant_operand(operand) and
+                          not (statement[o] == Operators.ASSIGNMENT and q == o - 2)): # a global variable is loaded once before the loop
+                        computation = [q]
+                        key = (operand,)
+                    else:
+                        continue
+                    if key not in variables:
+                        variables[key] = local_variable(function, Variable("int", name=str(self.function_moved)), "invariant")
+                        preheader += assignment([statement[r] for r in computation], computation, produced, variables[key])
+                        self.moved += 1
+                        self.function_moved += 1
+                    replaced[q] = variables[key]
+
+        if not replaced:
+            return statement
+        return replaced_statement(statement, replaced, removed, produced)
+
+def computation_positions(statement: list, root: int, produced: list[int], operands) -> list[int]:
+    # positions of the operator at 'root' and of the operators and operands computing its operands in the order of the statement
+    positions = []
+    pending = [root]
+    while pending:
+        p = pending.pop()
+        positions.append(p)
+        for q in operands(p):
+            positions.append(q)
+            if isinstance(statement[q], IntermediateResult):
+                pending.append(produced[statement[q].number])
+    return sorted(positions)
+
+def _key(command, computation: list[int], produced: list[int]):
+    # identifies a command of a computation, its intermediate results are numbered from the start of the computation
+    if isinstance(command, IntermediateResult):
+        return (IntermediateResult, sum(p in computation for p in produced[:command.number]))
+    elif isinstance(command, Constant):
+        return (Constant, command.value)
+    return command
+
+def assignment(commands: list, computation: list[int], produced: list[int], variable: Variable) -> list:
+    # statement assigning the computation to the variable, its intermediate results are numbered from the start of the statement
+    commands = [IntermediateResult(_key(command, computation, produced)[1]) if isinstance(command, IntermediateResult) else command for command in commands]
+    if len(commands) == 1:
+        return [variable, commands[0], Operators.ASSIGNMENT, InternalAlphabet.EXPRESSION_END]
+    number = sum(command in INTERMEDIATE_RESULT_OPERATORS for command in commands) - 1
+    return commands + [variable, IntermediateResult(number), Operators.ASSIGNMENT, InternalAlphabet.EXPRESSION_END]
+
+def replaced_statement(statement: list, replaced: dict[int, Variable], removed: set[int], produced: list[int]) -> list:
+    # the statement with the operands at the positions 'replaced' replaced by variables and the commands at the positions 'removed' left out,
+    # its remaining intermediate results are numbered again
+    removed_numbers = [number for number, p in enumerate(produced) if p in removed]
+    new_statement = []
+    for p, command in enumerate(statement):
+        if p in replaced:
+            new_statement.append(replaced[p])
+        elif p in removed:
+            continue
+        elif isinstance(command, IntermediateResult):
+            new_statement.append(IntermediateResult(command.number - sum(number < command.number for number in removed_numbers)))
+        else:
+            new_statement.append(command)
+    return new_statement
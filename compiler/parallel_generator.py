@@ -0,0 +1,77 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
+from enums import CallingConventions, HighAssemblyInstructions
+from constructs import Function
+from high_assembly import Instruction, FUNCTION_LABELS
+from high_assembly_generator import HighAssemblyGenerator
+from target_assembly_generator import TargetAssemblyGenerator
+from registers import RegisterFile
+from writer import Writer, HighAssemblyWriter
+
+class ParallelGenerator():
+    # generates the high and the target assembly of separate functions in a pool of processes,
+    # the results are stitched in the order of the functions, so the output is the same as of a serial build
+    def __init__(self, jobs: int, comments: bool = True, strength_reduction: bool = True, register_allocation: bool = True, minimal_frames: bool = True,
+                 calling_conventions: dict[str, CallingConventions]|None = None, tail_calls: bool = True, short_circuits: bool = True):
+        self.jobs = jobs
+        self.comments = comments
+        self.strength_reduction = strength_reduction
+        self.register_allocation = register_allocation
+        self.minimal_frames = minimal_frames
+        self.calling_conventions = calling_conventions or {}
+        self.tail_calls = tail_calls
+        self.short_circuits = short_circuits
+        self.pool = ProcessPoolExecutor(max_workers=jobs)
+
+    def generate_functions(self, functions: list[Function]) -> dict[str, tuple[list[Instruction], list[str]]]:
+        # returns the high assembly of each function as records and as lines of the intermediate file
+        functions = [function for function in functions if len(function.body) > 0]
+        results = self.pool.map(_generate_function, functions, [self.comments] * len(functions), [self.register_allocation] * len(functions), [self.minimal_frames] * len(functions),
+                                [self.calling_conventions] * len(functions), [self.tail_calls] * len(functions), [self.short_circuits] * len(functions), chunksize=self._chunk_size(len(functions)))
+        return {function.name: result for function, result in zip(functions, results)}
+
+    def translate(self, instructions: list[Instruction]) -> tuple[list[list[str]], bool]:
+        # returns the lines of target assembly of each function and whether a function is open at the end
+        chunks, first_function = _split_by_functions(instructions)
+        lines = list(self.pool.map(_translate, chunks, [self.comments] * len(chunks), [self.strength_reduction] * len(chunks),
+                                   chunksize=self._chunk_size(len(chunks))))
+        return lines, first_function
+
+    def shutdown(self):
+        self.pool.shutdown()
+
+    def _chunk_size(self, number_of_tasks: int) -> int:
+        return max(1, number_of_tasks // (self.jobs * 4))
+
+def _generate_function(function: Function, comments: bool, register_allocation: bool, minimal_frames: bool,
+                       calling_conventions: dict[str, CallingConventions], tail_calls: bool, short_circuits: bool) -> tuple[list[Instruction], list[str]]:
+    writer = HighAssemblyWriter(in_file=True, output_file=io.StringIO(), buffered=True, comments=comments)
+    HighAssemblyGenerator(function_declaration_table=None, variable_table=None, global_code=None, register_file=RegisterFile(number_of_registers=7, writer=writer),
+                          writer=writer, register_allocation=register_allocation, minimal_frames=minimal_frames,
+                          calling_conventions=calling_conventions, tail_calls=tail_calls, short_circuits=short_circuits).generate_functions([function])
+    return writer.retrieve_memory(), writer.buffer
+
+def _translate(chunk: tuple[bool, list[Instruction]], comments: bool, strength_reduction: bool) -> list[str]:
+    first_function, instructions = chunk
+    writer = Writer(in_file=True, in_memory=False, output_file=io.StringIO(), buffered=True, comments=comments)
+    target_assembly_generator = TargetAssemblyGenerator(high_assembly_code=instructions, writer=writer, strength_reduction=strength_reduction)
+    target_assembly_generator.first_function = first_function
+    target_assembly_generator.translate(instructions)
+    return writer.buffer
+
+def _split_by_functions(instructions: list[Instruction]) -> tuple[list[tuple[bool, list[Instruction]]], bool]:
+    # splits the code at function labels, each part is translated with the state the serial translation would have at its start
+    chunks = []
+    start = 0
+    start_first_function = first_function = True
+    for i, instruction in enumerate(instructions):
+        if instruction.opcode in FUNCTION_LABELS:
+            if i > start:
+                chunks.append((start_first_function, instructions[start:i]))
+            start, start_first_function = i, first_function
+            first_function = False
+        elif instruction.opcode == HighAssemblyInstructions.EOF:
+            first_function = True
+    if start < len(instructions):
+        chunks.append((start_first_function, instructions[start:]))
+    return chunks, first_function
@@ -35,7 +35,7 @@ class ParserStates(Enum):
     
 class Parser:
     def __init__(self, function_declaration_table: FunctionDeclarationTable, function_call_table: FunctionCallTable, 
-                       variable_table: VariableTable, global_expressions: GlobalExpressions):
+                       variable_table: VariableTable, global_expressions: GlobalExpressions, constant_folding: bool = True):
         self.function_declaration_table = function_declaration_table
         self.function_call_table = function_call_table
         self.variable_table = variable_table
@@ -69,14 +69,18 @@ class Parser:
         self.current_function = None
         self.current_variable = None
         self.for_counter = 0
-        self.expression_parser = ExpressionParser(function_call_table=self.function_call_table, variable_table=self.variable_table)
+        self.expression_parser = ExpressionParser(function_call_table=self.function_call_table, variable_table=self.variable_table,
+                                                  constant_folding=constant_folding)
         self.global_variable_or_function_type = None
         self.global_variable_or_function_name = None
         self.global_expressions = global_expressions
         self.global_assignment_mode = False
-        self.global_assignment_string = ""
         self.variable_offset = 0
     
+    def carried_state(self) -> str:
+        # state left by the already parsed files, which changes the code of the next parsed file (the offset of its first local variable)
+        return str(self.current_variable.stack_size if self.current_variable else None)
+
     def parse(self, token: Tokens, value: str, line_number: int, token_number: int):
         try:
             if self.global_assignment_mode:
@@ -105,6 +109,7 @@ class Parser:
 
     def keyword(self, value: str):
         value = Keywords(value)
+        self.expression_parser.forget_constant_values() # values of variables are not known after a jump or at a label
         if Keywords.RETURN == value and (ParserStates.STATEMENT == self.state or ParserStates.STATEMENT_OR_ELSE == self.state):
             self.current_function.body.append(value)
             self.state = ParserStates.EXPRESSION
@@ -191,10 +196,12 @@ class Parser:
                     self.expression_parser.add_equal_zero_jump() # if, else if, while
                 self.current_function.body += self.expression_parser.retrieve_expression()
                 self.current_function.body.append(InternalAlphabet.EXPRESSION_END)
+                self.expression_parser.forget_constant_values()
         else:
             raise Exception()
 
     def opened_curly_bracket(self, _: str):
+        self.expression_parser.forget_constant_values()
         if ParserStates.FUNCTION_BODY_OPENED == self.state:
             self.scope_type_stack.append(ScopeTypes.FUNCTION)
             self.current_function.body.append(InternalAlphabet.FUNCTION_START)
@@ -221,6 +228,7 @@ class Parser:
         
         popped_scope_type = self.scope_type_stack.pop()
         self.variable_table.decrease_scope(self.current_function.name)
+        self.expression_parser.forget_constant_values()
         
         if popped_scope_type == ScopeTypes.FUNCTION:
             self.state = ParserStates.FUNCTION_RETURN_TYPE_OR_GLOBAL_VARIABLE_TYPE
@@ -289,6 +297,7 @@ class Parser:
             self.current_variable = Variable(self.global_variable_or_function_type, None, self.global_variable_or_function_name)
             self.variable_table.add(self.current_variable)
             self.global_assignment_mode = True
+            self.expression_parser.constant_expression = True
             return
         elif ParserStates.EXPRESSION == self.state:
             self.expression_parser.add_assignment()
@@ -322,6 +331,8 @@ class Parser:
             self.current_function.body += self.expression_parser.retrieve_expression()
             self.current_function.body.append(InternalAlphabet.EXPRESSION_END)
 
+            if self.for_counter != 0: # the condition and the step of a for loop are executed repeatedly
+                self.expression_parser.forget_constant_values()
             if self.for_counter == 1:
                 self.for_counter += 1
             elif self.for_counter == 2:
@@ -359,14 +370,19 @@ class Parser:
     def _resolve_global_assignment(self, token: Tokens, value: str):
         if Tokens.SEMICOLON == token:
             self.global_expressions.add(self.current_variable)
-            self.global_expressions.add(Constant(Types.INT, int(eval(self.global_assignment_string))))
+            self.global_expressions.add(Constant(Types.INT, self.expression_parser.retrieve_constant()))
             self.global_expressions.add(Operators.ASSIGNMENT)
             self.global_expressions.add(InternalAlphabet.EXPRESSION_END)
-            self.global_assignment_string = ""
             self.state = ParserStates.FUNCTION_RETURN_TYPE_OR_GLOBAL_VARIABLE_TYPE
             self.global_assignment_mode = False
             self.current_variable.set_label(f"@{self.current_variable.name}")
-        elif Tokens.CLOSED_BRACKET == token or Tokens.OPENED_BRACKET == token or Tokens.INTEGER == token or Tokens.OPERATOR == token:
-            self.global_assignment_string += value
+        elif Tokens.OPENED_BRACKET == token:
+            self.expression_parser.add_opened_bracket()
+        elif Tokens.CLOSED_BRACKET == token:
+            self.expression_parser.add_closed_bracket()
+        elif Tokens.INTEGER == token:
+            self.expression_parser.add_constant_operand(Constant(type=Types.INT, value=int(value), comment=value))
+        elif Tokens.OPERATOR == token:
+            self.expression_parser.add_operator(value)
         else:
             raise Exception()
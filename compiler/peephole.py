@@ -0,0 +1,243 @@
+from typing import Callable
+from enums import TargetAssemblyInstructions, TargetAssemblyRegisters
+
+INSTRUCTIONS = {instruction.value: instruction for instruction in TargetAssemblyInstructions}
+ESP = str(TargetAssemblyRegisters.ESP)
+# instructions without a destination register, MOV writes its second operand
+NON_WRITING_INSTRUCTIONS = {
+    TargetAssemblyInstructions.STORE, TargetAssemblyInstructions.OUT, TargetAssemblyInstructions.JMP, TargetAssemblyInstructions.JREG,
+    TargetAssemblyInstructions.BEQZ, TargetAssemblyInstructions.BNEZ, TargetAssemblyInstructions.BOV,
+}
+# instructions after which the values of the registers are not known, they end the window
+TRANSFER_INSTRUCTIONS = {TargetAssemblyInstructions.JMP, TargetAssemblyInstructions.JAL, TargetAssemblyInstructions.JREG, TargetAssemblyInstructions.RETI}
+JUMP_INSTRUCTIONS = {TargetAssemblyInstructions.JMP, TargetAssemblyInstructions.BEQZ, TargetAssemblyInstructions.BNEZ}
+
+class TargetInstruction():
+    # an instruction line of the HaDes assembly, it is split to its operands, comment and indent only when a rule inspects them
+    def __init__(self, opcode: TargetAssemblyInstructions, line: str|None = None, operands: list[str] = None, comment: str = None, indent: str = None) -> None:
+        self.opcode = opcode
+        self.mnemonic = opcode.value # plain string, which is faster to look up than the enum
+        self.line = line # original text, None when the instruction was changed
+        self._operands = operands
+        self._comment = comment
+        self._indent = indent
+
+    @property
+    def operands(self) -> list[str]:
+        if self._operands is None:
+            parts = self.line.partition(';')[0].split(None, 1)
+            self._operands = [operand.strip() for operand in parts[1].split(',')] if len(parts) > 1 else []
+        return self._operands
+
+    @property
+    def comment(self) -> str:
+        if self._comment is None:
+            self._comment = self.line.partition(';')[2].strip()
+        return self._comment
+
+    @property
+    def indent(self) -> str:
+        if self._indent is None:
+            self._indent = self.line[:len(self.line) - len(self.line.lstrip())]
+        return self._indent
+
+    def destination(self) -> str|None:
+        if self.opcode == TargetAssemblyInstructions.MOV:
+            return self.operands[1]
+        if self.opcode in NON_WRITING_INSTRUCTIONS or not self.operands:
+            return None
+        return self.operands[0]
+
+    def stack_adjustment(self) -> int|None:
+        # change of the stack pointer by 'SUBI @esp, #n', 'ADDI @esp, @esp, #n' etc., None for other instructions
+        if self.opcode not in (TargetAssemblyInstructions.ADDI, TargetAssemblyInstructions.SUBI) or (self.line is not None and ESP not in self.line):
+            return None
+        if self.operands[0] != ESP or self.operands[-2] != ESP:
+            return None
+        value = int(self.operands[-1][1:], 0)
+        return value if self.opcode == TargetAssemblyInstructions.ADDI else -value
+
+    def format(self) -> str:
+        if self.line is not None:
+            return self.line
+        text = f"{self.opcode} {', '.join(self.operands)}" if self.operands else f"{self.opcode}"
+        return f"{f'{self.indent}{text}':<40}; {self.comment}" if self.comment else f"{self.indent}{text}"
+
+def parse_line(line: str) -> TargetInstruction|str:
+    # lines, which are not instructions (labels, comments, directives), are returned unchanged
+    stripped = line.lstrip()
+    opcode = INSTRUCTIONS.get(stripped[:stripped.find(' ')] if ' ' in stripped else stripped)
+    if opcode is None or '\n' in line:
+        return line
+    return TargetInstruction(opcode, line)
+
+def _instruction(opcode: TargetAssemblyInstructions, operands: list[str], template: TargetInstruction, comment: str = None) -> TargetInstruction:
+    return TargetInstruction(opcode, operands=operands, comment=template.comment if comment is None else comment, indent=template.indent)
+
+# rules of the pattern library, each of them gets the instructions of a window, which starts at the current instruction and does not cross labels
+# and control transfers, and the labels directly following the first instruction, a rule returns the number of the replaced instructions of the
+# window and their replacement, or None when it does not match
+
+def _store_load(window: list[TargetInstruction], labels: set[str]) -> tuple[int, list[TargetInstruction]]|None:
+    # 'STORE rA, b, #k' 'LOAD rB, b, #k' loads the stored value, which is still in rA
+    if len(window) < 2 or window[0].opcode != TargetAssemblyInstructions.STORE or window[1].opcode != TargetAssemblyInstructions.LOAD:
+        return None
+    store, load = window[0], window[1]
+    if store.operands[1:] != load.operands[1:]:
+        return None
+    if load.operands[0] == store.operands[0]:
+        return 2, [store]
+    return 2, [store, _instruction(TargetAssemblyInstructions.MOV, [store.operands[0], load.operands[0]], load)]
+
+def _self_move(window: list[TargetInstruction], labels: set[str]) -> tuple[int, list[TargetInstruction]]|None:
+    if window[0].opcode == TargetAssemblyInstructions.MOV and window[0].operands[0] == window[0].operands[1]:
+        return 1, []
+    return None
+
+def _jump_to_next(window: list[TargetInstruction], labels: set[str]) -> tuple[int, list[TargetInstruction]]|None:
+    if window[0].opcode in JUMP_INSTRUCTIONS and window[0].operands[-1][1:] in labels:
+        return 1, []
+    return None
+
+def _push_pop(window: list[TargetInstruction], labels: set[str]) -> tuple[int, list[TargetInstruction]]|None:
+    # 'SUBI @esp, #1' 'STORE rA, @esp, #0' 'LOAD rB, @esp, #0' 'ADDI @esp, #1' is a move from rA to rB
+    if len(window) < 4 or window[0].stack_adjustment() != -1 or window[3].stack_adjustment() != 1:
+        return None
+    store, load = window[1], window[2]
+    if (store.opcode != TargetAssemblyInstructions.STORE or load.opcode != TargetAssemblyInstructions.LOAD
+            or store.operands[1:] != [ESP, "#0"] or load.operands[1:] != [ESP, "#0"] or store.operands[0] == ESP or load.operands[0] == ESP):
+        return None
+    if store.operands[0] == load.operands[0]:
+        return 4, []
+    return 4, [_instruction(TargetAssemblyInstructions.MOV, [store.operands[0], load.operands[0]], load)]
+
+def _stack_adjustments(window: list[TargetInstruction], labels: set[str]) -> tuple[int, list[TargetInstruction]]|None:
+    # two adjustments of the stack pointer in a row are merged to one, e.g. of a pop followed by a push
+    if len(window) < 2:
+        return None
+    first, second = window[0].stack_adjustment(), window[1].stack_adjustment()
+    if first is None or second is None:
+        return None
+    total = first + second
+    if total == 0:
+        return 2, []
+    comment = ", ".join(comment for comment in (window[0].comment, window[1].comment) if comment)
+    opcode = TargetAssemblyInstructions.ADDI if total > 0 else TargetAssemblyInstructions.SUBI
+    return 2, [_instruction(opcode, [ESP, f"#{abs(total)}"], window[0], comment)]
+
+def _constant_reload(window: list[TargetInstruction], labels: set[str]) -> tuple[int, list[TargetInstruction]]|None:
+    # 'LDI r, #c' is repeated, while r still holds the constant, e.g. edx for constant pushes and stores
+    if window[0].opcode != TargetAssemblyInstructions.LDI:
+        return None
+    register = window[0].operands[0]
+    for i, instruction in enumerate(window[1:], 1):
+        if instruction.opcode == TargetAssemblyInstructions.LDI and instruction.operands == window[0].operands:
+            return i + 1, window[:i]
+        if instruction.destination() == register:
+            return None
+    return None
+
+# rules are tried in this order at each instruction, longer patterns first, only at the instructions the patterns start with,
+# each rule is given the number of instructions it inspects at most, the size of the window is the limit of 'constant_reload'
+RULES: dict[str, tuple[set[TargetAssemblyInstructions], int|None, Callable[[list[TargetInstruction], set[str]], tuple[int, list[TargetInstruction]]|None]]] = {
+    "push_pop": ({TargetAssemblyInstructions.SUBI}, 4, _push_pop),
+    "stack_adjustments": ({TargetAssemblyInstructions.ADDI, TargetAssemblyInstructions.SUBI}, 2, _stack_adjustments),
+    "store_load": ({TargetAssemblyInstructions.STORE}, 2, _store_load),
+    "self_move": ({TargetAssemblyInstructions.MOV}, 1, _self_move),
+    "jump_to_next": (JUMP_INSTRUCTIONS, 1, _jump_to_next),
+    "constant_reload": ({TargetAssemblyInstructions.LDI}, None, _constant_reload),
+}
+
+class PeepholeOptimizer():
+    # removes redundant instructions from the generated HaDes assembly by matching the rules on a window sliding over the instructions,
+    # after a replacement the window moves back, so the new instructions are matched with the preceding ones again
+    def __init__(self, rules: list[str] = list(RULES), window_size: int = 6) -> None:
+        self.window_size = window_size
+        # rules and window sizes by the mnemonics of the instructions
+        self.rules = {opcode.value: [(name, rule) for name in rules for opcodes, _, rule in [RULES[name]] if opcode in opcodes] for opcode in TargetAssemblyInstructions}
+        self.window_sizes = {opcode.value: max([size or window_size for name in rules for opcodes, size, _ in [RULES[name]] if opcode in opcodes], default=0)
+                             for opcode in TargetAssemblyInstructions}
+        self.transfers = {opcode.value for opcode in TRANSFER_INSTRUCTIONS}
+        self.removed = {name: 0 for name in rules} # instructions removed by each rule
+
+    def optimize(self, lines: list[str]):
+        # optimizes the lines in place
+        if not self.removed:
+            return
+        entries: list[TargetInstruction|str|None] = [parse_line(line) for line in lines]
+        i = 0
+        while i < len(entries):
+            entry = entries[i]
+            rules = self.rules[entry.mnemonic] if isinstance(entry, TargetInstruction) else None
+            if not rules:
+                i += 1
+                continue
+            positions = self._window(entries, i, self.window_sizes[entry.mnemonic])
+            window = [entries[position] for position in positions]
+            labels = self._following_labels(entries, i) if entry.opcode in JUMP_INSTRUCTIONS else set()
+            for name, rule in rules:
+                result = rule(window, labels)
+                if result is not None:
+                    replaced, replacement = result
+                    self.removed[name] += replaced - len(replacement)
+                    for j, position in enumerate(positions[:replaced]):
+                        entries[position] = replacement[j] if j < len(replacement) else None
+                    i = self._previous(entries, i)
+                    break
+            else:
+                i += 1
+        lines[:] = [entry.format() if isinstance(entry, TargetInstruction) else entry for entry in entries if entry is not None]
+
+    def _window(self, entries: list, start: int, size: int) -> list[int]:
+        # positions of the instructions from 'start' up to a label, a directive or a control transfer
+        positions = []
+        for position in range(start, len(entries)):
+            entry = entries[position]
+            if isinstance(entry, TargetInstruction):
+                positions.append(position)
+                if len(positions) == size or entry.mnemonic in self.transfers:
+                    break
+            elif entry is not None and not _is_transparent(entry):
+                break
+        return positions
+
+    def _following_labels(self, entries: list, start: int) -> set[str]:
+        labels = set()
+        for position in range(start + 1, len(entries)):
+            entry = entries[position]
+            if entry is None or (isinstance(entry, str) and _is_transparent(entry)):
+                continue
+            label = _label(entry) if isinstance(entry, str) else None
+            if label is None:
+                break
+            labels.add(label)
+        return labels
+
+    def _previous(self, entries: list, start: int) -> int:
+        # position of the instruction 'window_size' instructions before 'start'
+        count = 0
+        for position in range(start - 1, -1, -1):
+            entry = entries[position]
+            if isinstance(entry, TargetInstruction):
+                count += 1
+                if count == self.window_size:
+                    return position
+            elif entry is not None and not _is_transparent(entry):
+                return position + 1
+        return 0
+
+    def report(self) -> str:
+        width = max([len("rule")] + [len(name) for name in self.removed])
+        lines = [f"{'rule':<{width}}  removed instructions"]
+        lines += [f"{name:<{width}}  {removed:>20}" for name, removed in self.removed.items()]
+        lines.append(f"{'total':<{width}}  {sum(self.removed.values()):>20}")
+        return '\n'.join(lines)
+
+def _label(line: str) -> str|None:
+    code = line.partition(';')[0].strip()
+    return code[:-1] if code.endswith(':') and ' ' not in code else None
+
+def _is_transparent(line: str) -> bool:
+    # empty lines and comments do not end a window
+    stripped = line.strip()
+    return not stripped or stripped.startswith(';')
@@ -0,0 +1,211 @@
+from enums import InternalAlphabet, Keywords, Operators, Types
+from constructs import ConditionJump, Constant, Function, IntermediateResult, ReturnValue, Variable
+
+# commands, which are statements on their own, the other commands form statements ending with EXPRESSION_END
+BOUNDARY_COMMANDS = (InternalAlphabet.FUNCTION_START, InternalAlphabet.FUNCTION_END, InternalAlphabet.SCOPE_INCREMENT, InternalAlphabet.SCOPE_DECREMENT)
+# operators without a result in a register
+RESULTLESS_OPERATORS = (Operators.ASSIGNMENT, Operators.PARAMETER_ASSIGNMENT, Operators.PARAMETER_POSSIBLE_ASSIGNMENT)
+# weight of an occurrence of a variable in a loop relative to an occurrence outside of it
+LOOP_WEIGHT = 10
+MAX_LOOP_DEPTH = 3
+
+class Statement():
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.end = start
+        self.commands: list[tuple[int, object]] = []
+        self.checkpoints: list[tuple[int, list[Variable]]] = [] # registers needed at an instruction, without the loaded variables, and the loaded variables
+        self.loop_depth = 0
+        self.scope_depth = 0
+
+class Loop():
+    def __init__(self, keyword: Keywords, start: int) -> None:
+        self.keyword = keyword
+        self.start = start # statement of the keyword
+        self.end = None # statement of the last scope decrement
+        self.body_start = None
+        self.body_end = None
+        self.body_depth = None
+
+class LiveInterval():
+    def __init__(self, variable: Variable) -> None:
+        self.variable = variable
+        self.start = None
+        self.end = None
+        self.occurrences: list[tuple[int, int]] = [] # (statement, body index)
+        self.weight = 0
+        self.register = None
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return self.start <= end and start <= self.end
+
+class RegisterAllocation():
+    # global allocation of the registers to the local variables of a function, the variables used the most (in loops) are kept in a register
+    # from their first to their last use, i.e. they are never loaded from or stored to the stack frame in between, the statements of the live
+    # ranges must leave enough registers for their own operands and intermediate results, the other variables are cached by the register file
+    def __init__(self, function: Function, register_names: list[str]) -> None:
+        self.function = function
+        self.register_names = register_names
+        self.statements: list[Statement] = []
+        self.loops: list[Loop] = []
+        self.intervals: dict[Variable, LiveInterval] = {}
+        self.reservations: dict[int, list[tuple[str, Variable, bool]]] = {} # body index -> (register, variable, load)
+        self.releases: dict[int, list[str]] = {} # body index -> registers
+        self._split_statements()
+        self._find_loops()
+        self._build_intervals()
+        self._allocate()
+
+    def _split_statements(self):
+        statement = None
+        for i, command in enumerate(self.function.body):
+            if (isinstance(command, InternalAlphabet) and command in BOUNDARY_COMMANDS) or isinstance(command, Keywords):
+                if statement is not None:
+                    self.statements.append(statement)
+                statement = Statement(i)
+                self.statements.append(statement)
+                statement = None
+                continue
+
+            if statement is None:
+                statement = Statement(i)
+            statement.commands.append((i, command))
+            statement.end = i
+            if command == InternalAlphabet.EXPRESSION_END:
+                self.statements.append(statement)
+                statement = None
+        if statement is not None:
+            self.statements.append(statement)
+
+    def _find_loops(self):
+        # a while loop spans from its keyword to the end of its body, a for loop to the end of its scope, which contains the three parts and the body
+        scopes: list[tuple[str, Loop|None]] = []
+        waiting_loop = None
+        for s, statement in enumerate(self.statements):
+            command = self.function.body[statement.start]
+            statement.scope_depth = len(scopes)
+            if command == Keywords.WHILE or command == Keywords.FOR:
+                waiting_loop = Loop(command, s)
+                self.loops.append(waiting_loop)
+            elif command == InternalAlphabet.SCOPE_INCREMENT:
+                if waiting_loop is not None:
+                    if waiting_loop.keyword == Keywords.WHILE:
+                        waiting_loop.body_start, waiting_loop.body_depth = s, len(scopes) + 1
+                        scopes.append(("body", waiting_loop))
+                    else:
+                        scopes.append(("for", waiting_loop))
+                    waiting_loop = None
+                elif scopes and scopes[-1][0] == "for" and scopes[-1][1].body_start is None:
+                    scopes[-1][1].body_start, scopes[-1][1].body_depth = s, len(scopes) + 1
+                    scopes.append(("body", scopes[-1][1]))
+                else:
+                    scopes.append(("block", None))
+            elif command == InternalAlphabet.SCOPE_DECREMENT and scopes:
+                kind, loop = scopes.pop()
+                if kind == "body":
+                    loop.body_end = s
+                    if loop.keyword == Keywords.WHILE:
+                        loop.end = s
+                elif kind == "for":
+                    loop.end = s
+
+        self.loops = [loop for loop in self.loops if loop.end is not None and loop.body_start is not None and loop.body_end is not None]
+        for loop in self.loops:
+            for statement in self.statements[loop.start:loop.end + 1]:
+                statement.loop_depth += 1
+
+    def _build_intervals(self):
+        body = self.function.body
+        for s, statement in enumerate(self.statements):
+            self._find_checkpoints(statement)
+            for i, command in statement.commands:
+                if isinstance(command, Variable) and command.type != Types.ARRAY and command.stack_offset and not command.global_scope:
+                    interval = self.intervals.get(command)
+                    if interval is None:
+                        interval = self.intervals[command] = LiveInterval(command)
+                        interval.start = 0 if command.stack_offset > 0 else s # parameters are live from the start of the function
+                    interval.end = s
+                    interval.occurrences.append((s, i))
+                    interval.weight += LOOP_WEIGHT ** min(statement.loop_depth, MAX_LOOP_DEPTH)
+
+        # a variable used in a loop is live in the whole loop, unless it is first written in the body of the loop, where it does not survive the iteration
+        for interval in self.intervals.values():
+            first_statement, first_index = interval.occurrences[0]
+            first_write = body[first_index + 2] == Operators.ASSIGNMENT and interval.variable.stack_offset < 0
+            changed = True
+            while changed:
+                changed = False
+                for loop in self.loops:
+                    if not interval.overlaps(loop.start, loop.end) or (loop.start >= interval.start and loop.end <= interval.end):
+                        continue
+                    if (first_write and loop.body_start <= interval.start and interval.end <= loop.body_end
+                            and self.statements[first_statement].scope_depth == loop.body_depth):
+                        continue
+                    interval.start, interval.end = min(interval.start, loop.start), max(interval.end, loop.end)
+                    changed = True
+
+    def _find_checkpoints(self, statement: Statement):
+        # operands and pending intermediate results at each instruction of the statement, as the high assembly generator loads them to registers
+        body = self.function.body
+        pending = loaded = operands = intermediate_operands = 0
+        variables = []
+        for i, command in statement.commands:
+            if isinstance(command, IntermediateResult):
+                intermediate_operands += 1
+                operands += 1
+            elif isinstance(command, Variable):
+                variables.append(command)
+                operands += 1
+            elif isinstance(command, Constant):
+                loaded += operands == 0 and body[i + 1] != Operators.PARAMETER_ASSIGNMENT
+                operands += 1
+            elif isinstance(command, ReturnValue):
+                operands += 1
+            elif (isinstance(command, (Operators, ConditionJump)) or command == InternalAlphabet.EQUAL_ZERO_JUMP or command == InternalAlphabet.NOT_ZERO_JUMP
+                  or command == InternalAlphabet.EXPRESSION_END):
+                statement.checkpoints.append((pending + loaded, variables))
+                pending -= intermediate_operands
+                if isinstance(command, Operators) and command not in RESULTLESS_OPERATORS:
+                    pending += 1
+                    statement.checkpoints.append((pending, []))
+                loaded = operands = intermediate_operands = 0
+                variables = []
+
+    def _register_need(self, statement: Statement, pinned: set[Variable]) -> int:
+        return max((base + sum(variable not in pinned for variable in variables) for base, variables in statement.checkpoints), default=0)
+
+    def _allocate(self):
+        number_of_registers = len(self.register_names)
+        pinned_counts = [0] * len(self.statements)
+        pinned_variables = [set() for _ in self.statements]
+        needs = [self._register_need(statement, set()) for statement in self.statements]
+        allocated: dict[str, list[LiveInterval]] = {register_name: [] for register_name in self.register_names}
+
+        # the variables with the most (weighted) uses per statement of their live range first
+        candidates = [interval for interval in self.intervals.values() if len(interval.occurrences) > 1]
+        candidates.sort(key=lambda interval: (-interval.weight / (interval.end - interval.start + 1), interval.start))
+        for interval in candidates:
+            register_name = next((register_name for register_name in self.register_names
+                                  if not any(other.overlaps(interval.start, interval.end) for other in allocated[register_name])), None)
+            if register_name is None:
+                continue
+            statements = range(interval.start, interval.end + 1)
+            occurring = {s for s, _ in interval.occurrences}
+            # the need of a statement using the variable decreases, when the variable is pinned, it is computed only when the statement is short of registers
+            if not all(pinned_counts[s] + 1 + needs[s] <= number_of_registers
+                       or (s in occurring and pinned_counts[s] + 1 + self._register_need(self.statements[s], pinned_variables[s] | {interval.variable}) <= number_of_registers)
+                       for s in statements):
+                continue
+
+            interval.register = register_name
+            allocated[register_name].append(interval)
+            for s in statements:
+                pinned_counts[s] += 1
+            for s in occurring:
+                pinned_variables[s].add(interval.variable)
+                needs[s] = self._register_need(self.statements[s], pinned_variables[s])
+
+        for intervals in allocated.values():
+            for interval in intervals:
+                self.reservations.setdefault(self.statements[interval.start].start, []).append((interval.register, interval.variable, interval.variable.stack_offset > 0))
+                self.releases.setdefault(self.statements[interval.end].end, []).append(interval.register)
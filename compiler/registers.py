@@ -1,11 +1,14 @@
+import heapq
 from typing import Callable
 from enums import RegisterStates, HighAssemblyInstructions, Types
 from constructs import Construct, Function, Variable, Constant, IntermediateResult, ReturnValue
-from writer import Writer
+from writer import HighAssemblyWriter
+from high_assembly import Instruction, MemoryOperand, GlobalVariableOperand
 
 class Register():
-    def __init__(self, name: str, state: RegisterStates = RegisterStates.EMPTY) -> None:
+    def __init__(self, name: str, state: RegisterStates = RegisterStates.EMPTY, index: int = None) -> None:
         self.name = name
+        self.index = index
         self.state = state
         self.value = None
         self.usage = 0
@@ -26,67 +29,75 @@ class Register():
         self.written = False
             
 class RegisterFile():
-    def __init__(self, number_of_registers: int, writer: Writer) -> None:
+    def __init__(self, number_of_registers: int, writer: HighAssemblyWriter) -> None:
         if number_of_registers < 7:
             raise Exception("Number of registers must be at least 7.")
         self.number_of_registers = number_of_registers
-        self.registers = [Register(f"r{i}") for i in range(1, number_of_registers - 3)]
+        self.registers = [Register(f"r{i + 1}", index=i) for i in range(number_of_registers - 4)]
         self.EAX = Register("eax", RegisterStates.USED)
         self.EDX = Register("edx", RegisterStates.USED)
         self.ESP = Register("esp", RegisterStates.USED)
         self.EBP = Register("ebp", RegisterStates.USED)
         self.writer = writer
+        self.comments = writer.comments
         self.intermediate_results_counter = 0
         self.usage_counter = 0
         self.used_registers_in_instruction: list[Register] = []
         self.last_assigned_register: Register = None
-        self.register_string = ", ".join([register.name for register in self.registers][:-1]) + " and " + self.registers[-1].name
-        self.register_string_reversed = ", ".join([register.name for register in reversed(self.registers[1:])]) + " and " + self.registers[0].name
+        # state of the stack frame of the current function, without a frame pointer the parameters are addressed relative to the stack pointer,
+        # which moves with the pushed intermediate results and the saved registers
+        self.frame_pointer = True
+        self.stack_depth = 0
+        self.frame_instructions: list[Instruction] = [] # PUSHA and POPA, completed by 'finish_stack_frame'
+        self.stack_instructions: list[Instruction] = [] # loads and stores of parameters relative to the stack pointer
+        self.stored_reservations: set[Register] = set() # reserved registers stored over a call and not written since then
+        self.stale_registers: set[Register] = set() # operands of the current instruction holding global variables, which a call may have changed
+        # indexes kept up to date on every change of a register, heap entries are (usage, register index) or register indices 
+        # and are removed lazily when they no longer match the register
+        self.named_registers = {register.name: register for register in self.registers}
+        self._reset_indexes()
 
     def load_operand(self, operand: Variable|Constant|IntermediateResult, with_value = True) -> Register:
         if isinstance(operand, Constant) or isinstance(operand, Variable):
-            already_loaded_registers = list(filter(lambda register: register.value == operand, self.registers))
-            if len(already_loaded_registers) > 0:
-                register = already_loaded_registers[0]
-            else:
+            register = self.operand_registers.get(operand)
+            if register is None:
                 register = self._free_or_empty_register()
                 if register is None:
                     register = self._push_least_recently_used()
                     
-                register.populate(operand, self.usage_counter)
+                self._populate(register, operand, self.usage_counter)
                 self.usage_counter += 1
             
                 if isinstance(operand, Constant):
-                    self.writer.instruction(f"{HighAssemblyInstructions.MOV} {register.name} {operand.value}", f"{register.name} = {operand.value}")
+                    self.writer.instruction(HighAssemblyInstructions.MOV, (register.name, operand.value), f"{register.name} = {operand.value}" if self.comments else "")
                 elif isinstance(operand, Variable) and with_value:
                     if operand.stack_offset:
                         if operand.type == Types.ARRAY:
-                            self.writer.instruction(f"{HighAssemblyInstructions.MOV} {register.name} {self.EBP.name}", f"get base address of {operand.name}")
-                            self.writer.instruction(f"{HighAssemblyInstructions.ADD} {register.name} {register.name} {operand.stack_offset}", f"add stack offset of {operand.name}")
+                            self.writer.instruction(HighAssemblyInstructions.MOV, (register.name, self.EBP.name), f"get base address of {operand.name}" if self.comments else "")
+                            self.writer.instruction(HighAssemblyInstructions.ADD, (register.name, register.name, operand.stack_offset), f"add stack offset of {operand.name}" if self.comments else "")
                         else:
-                            self.writer.instruction(f"{HighAssemblyInstructions.LOAD} {register.name} [{self.EBP.name}{operand.stack_offset:+}]", f"{register.name} = {operand.name}")
+                            self._frame_instruction(HighAssemblyInstructions.LOAD, register.name, operand.stack_offset, f"{register.name} = {operand.name}" if self.comments else "")
                     else:
                         if operand.type == Types.ARRAY:
-                            self.writer.instruction(f"{HighAssemblyInstructions.MOV} {register.name} {operand.label}", f"{register.name} = &{operand.name}")
+                            self.writer.instruction(HighAssemblyInstructions.MOV, (register.name, GlobalVariableOperand(operand.name)), f"{register.name} = &{operand.name}" if self.comments else "")
                         else:
-                            self.writer.instruction(f"{HighAssemblyInstructions.LOAD} {register.name} {operand.label}", f"{register.name} = {operand.name}")
+                            self.writer.instruction(HighAssemblyInstructions.LOAD, (register.name, GlobalVariableOperand(operand.name)), f"{register.name} = {operand.name}" if self.comments else "")
+            elif register.state == RegisterStates.FREE: # the cached operand must not be replaced by the other operand of the instruction
+                register.state = RegisterStates.USED
 
             self.used_registers_in_instruction.append(register)
             self.last_assigned_register = register
             return register
               
         elif isinstance(operand, IntermediateResult):
-            intermediate_registers = list(filter(lambda register: isinstance(register.value, IntermediateResult) and register.value.number == operand.number, self.registers))
-            if len(intermediate_registers) == 0:
+            register = self.intermediate_result_registers.get(operand.number)
+            if register is None:
                 register = self._free_or_empty_register()
                 if register is None:
                     raise Exception("No free or empty register found.")
                 else:
-                    self.writer.instruction(f"{HighAssemblyInstructions.POP} {register.name}", f"pop {operand.comment}")
-            elif len(intermediate_registers) == 1:
-                register = intermediate_registers[0]
-            else:
-                raise Exception("Too many same intermediate results in registers.")
+                    self.writer.instruction(HighAssemblyInstructions.POP, (register.name,), f"pop {operand.comment}" if self.comments else "")
+                    self.stack_depth -= 1
             
             self.used_registers_in_instruction.append(register)
             self.last_assigned_register = register
@@ -94,31 +105,124 @@ class RegisterFile():
 
     def get_return_value(self, function: Function, next_function_call: bool = False) -> Register|None:
         if next_function_call: # two functions are called in a singe instruction, first result must be stored in EDX
-            self.writer.instruction(f"{HighAssemblyInstructions.STORE} [{self.EBP.name}-1] {self.EAX.name}", f"temporary storing {function.name}(...) return value")
+            self.writer.instruction(HighAssemblyInstructions.STORE, (MemoryOperand(self.EBP.name, -1), self.EAX.name), f"temporary storing {function.name}(...) return value" if self.comments else "")
             return None
         else:
             self.last_assigned_register = self.EAX
             return self.EAX
     
+    def load_arguments(self, arguments: list[Variable|Constant|IntermediateResult|ReturnValue|None]) -> list[tuple[Register, Variable|None]]:
+        # moves the arguments of a call with the register calling convention to r1, r2 and r3, the variables, constants, intermediate results
+        # and return values from where they are, the pushed arguments (None) from the stack, values needed after the call are saved, i.e.
+        # intermediate results are pushed, reserved variables are stored and cached variables are stored when written, the saved registers
+        # are returned for 'restore_registers'
+        targets = self.registers[:len(arguments)]
+        sources: dict[int, Register|None] = {}
+        for k, argument in enumerate(arguments):
+            if isinstance(argument, Variable):
+                sources[k] = self.operand_registers.get(argument)
+            elif isinstance(argument, IntermediateResult):
+                sources[k] = self.intermediate_result_registers[argument.number]
+        consumed = [sources[k] for k, argument in enumerate(arguments) if isinstance(argument, IntermediateResult)]
+        saved: list[tuple[Register, Variable|None]] = []
+        replaced: list[Register] = []
+        for k, register in enumerate(targets):
+            if register.value is None or register in consumed or sources.get(k) is register: # empty or holding an argument
+                continue
+            if isinstance(register.value, IntermediateResult):
+                self.writer.instruction(HighAssemblyInstructions.PUSH, (register.name,), f"push {register.name} over the call" if self.comments else "")
+                self.stack_depth += 1
+                saved.append((register, None))
+            elif register.state == RegisterStates.RESERVED:
+                if register not in self.stored_reservations:
+                    self._frame_instruction(HighAssemblyInstructions.STORE, register.name, register.value.stack_offset, f"store {register.value.name} over the call" if self.comments else "")
+                    self.stored_reservations.add(register)
+                saved.append((register, register.value))
+            else:
+                self._store(register)
+                replaced.append(register)
+
+        # register to register moves first, as they read the registers overwritten by the other arguments, a cycle is broken by EDX
+        moves = {targets[k].name: source.name for k, source in sources.items() if source is not None and source is not targets[k]}
+        while moves:
+            target_name = next((target_name for target_name in moves if target_name not in moves.values()), None)
+            if target_name is None:
+                target_name = next(iter(moves))
+                self.writer.instruction(HighAssemblyInstructions.MOV, (self.EDX.name, target_name), f"edx = {target_name}, breaking a cycle of arguments" if self.comments else "")
+                moves = {target: self.EDX.name if source == target_name else source for target, source in moves.items()}
+                continue
+            source_name = moves.pop(target_name)
+            self.writer.instruction(HighAssemblyInstructions.MOV, (target_name, source_name), f"{target_name} = {source_name}, argument" if self.comments else "")
+
+        pushed = arguments.count(None)
+        for k, (argument, register) in enumerate(zip(arguments, targets)):
+            if argument is None: # the last pushed argument is below the pushed intermediate results
+                pushed -= 1
+                offset = pushed + sum(variable is None for _, variable in saved)
+                self.writer.instruction(HighAssemblyInstructions.LOAD, (register.name, MemoryOperand(self.ESP.name, offset)), f"{register.name} = pushed argument" if self.comments else "")
+            elif isinstance(argument, Constant):
+                self.writer.instruction(HighAssemblyInstructions.MOV, (register.name, argument.value), f"{register.name} = {argument.value}" if self.comments else "")
+            elif isinstance(argument, ReturnValue):
+                self.writer.instruction(HighAssemblyInstructions.MOV, (register.name, self.EAX.name), f"{register.name} = {argument.comment}" if self.comments else "")
+            elif isinstance(argument, Variable) and sources[k] is None:
+                if argument.global_scope:
+                    self.writer.instruction(HighAssemblyInstructions.LOAD, (register.name, GlobalVariableOperand(argument.name)), f"{register.name} = {argument.name}" if self.comments else "")
+                else:
+                    self._frame_instruction(HighAssemblyInstructions.LOAD, register.name, argument.stack_offset, f"{register.name} = {argument.name}" if self.comments else "")
+
+        for register in replaced + consumed:
+            self._empty(register)
+        return saved
+
+    def restore_registers(self, saved: list[tuple[Register, Variable|None]], pushed_arguments: int):
+        # the callee preserves r1, r2 and r3, only the saved values are restored, the other registers hold the arguments, which are not cached
+        for register, variable in reversed(saved):
+            if variable is None:
+                self.writer.instruction(HighAssemblyInstructions.POP, (register.name,), f"pop {register.name}" if self.comments else "")
+                self.stack_depth -= 1
+            else:
+                self._frame_instruction(HighAssemblyInstructions.LOAD, register.name, variable.stack_offset, f"{register.name} = {variable.name}, kept in register" if self.comments else "")
+        if pushed_arguments:
+            self.writer.instruction(HighAssemblyInstructions.ADD, (self.ESP.name, self.ESP.name, pushed_arguments), f"clean {pushed_arguments} pushed argument{'s' if pushed_arguments != 1 else ''} from the stack" if self.comments else "")
+
+    def pass_tail_call_arguments(self, parameters: list[Variable], passed: list[bool]):
+        # the pushed arguments of a recursive tail call replace the parameters in the stack frame, the last pushed argument is at the top
+        # of the stack, the parameters passed unchanged are stored, when they were changed in a register, all of them are loaded again
+        pushed = passed.count(True)
+        for parameter, argument_passed in zip(parameters, passed):
+            if argument_passed:
+                pushed -= 1
+                self.writer.instruction(HighAssemblyInstructions.LOAD, (self.EDX.name, MemoryOperand(self.ESP.name, pushed)), f"edx = argument {parameter.name}" if self.comments else "")
+                self._frame_instruction(HighAssemblyInstructions.STORE, self.EDX.name, parameter.stack_offset, f"{parameter.name} = edx" if self.comments else "")
+            else:
+                register = self.operand_registers.get(parameter)
+                if register is not None and ((register.state == RegisterStates.RESERVED and register not in self.stored_reservations) or register.written):
+                    self._frame_instruction(HighAssemblyInstructions.STORE, register.name, parameter.stack_offset, f"store {parameter.name}" if self.comments else "")
+        if passed.count(True):
+            self.writer.instruction(HighAssemblyInstructions.ADD, (self.ESP.name, self.ESP.name, passed.count(True)), f"clean {passed.count(True)} pushed argument{'s' if passed.count(True) != 1 else ''} from the stack" if self.comments else "")
+
     def resolve_register_names(self, register_names: list[str]):
         for i, register_name in enumerate(register_names):
             if register_name is None:
-                self.writer.instruction(f"{HighAssemblyInstructions.LOAD} {self.EDX.name} [{self.EBP.name}-1]", f"loading temporary stored return value")
+                self.writer.instruction(HighAssemblyInstructions.LOAD, (self.EDX.name, MemoryOperand(self.EBP.name, -1)), f"loading temporary stored return value")
                 register_names[i] = self.EDX.name
                 return
     
     def get_for_intermediate_result(self) -> Register:
         for register in self.used_registers_in_instruction: # allow registers used in last instruction to be used again
-            if not isinstance(register.value, IntermediateResult) or not register.value.address_register:
-                register.clear()
+            if register in self.stale_registers and not register.written:
+                self._empty(register)
+            elif not isinstance(register.value, IntermediateResult) or not register.value.address_register:
+                self._clear(register)
         self.used_registers_in_instruction = []
+        self.stale_registers = set()
 
         register = self._free_or_empty_register()
         if register is None: # no empty register, some must be pushed to the stack
             register = self._push_least_recently_used()
         
         intermediate_result = IntermediateResult(self.intermediate_results_counter)
-        register.populate(intermediate_result, self.usage_counter)
+        self._populate(register, intermediate_result, self.usage_counter)
         self.intermediate_results_counter += 1
         self.usage_counter += 1
 
@@ -129,100 +233,270 @@ class RegisterFile():
         intermediate_result_register.value.address_register = address_register
     
     def write_register(self, register_name: str):
-        register = list(filter(lambda register: register.name == register_name, self.registers))[0]
-        register.written = True # mark register as written to update value of the underlying variable when it will be cleared
+        register = self.named_registers[register_name]
+        if register.state != RegisterStates.RESERVED: # reserved registers are the only copy of their variable, which is never stored
+            register.written = True # mark register as written to update value of the underlying variable when it will be cleared
+        else:
+            self.stored_reservations.discard(register)
+
+    def reserve(self, register_name: str, variable: Variable, load: bool = False):
+        # the register holds the variable until it is released, its value is loaded only when it was set before, e.g. for parameters
+        register = self.named_registers[register_name]
+        cached_register = self.operand_registers.get(variable)
+        for evicted_register in (register, cached_register):
+            if evicted_register is not None and evicted_register.value is not None:
+                if isinstance(evicted_register.value, IntermediateResult):
+                    raise Exception(f"Register {evicted_register.name} cannot be reserved during an expression.")
+                self._store(evicted_register)
+                self._empty(evicted_register)
+
+        self._populate(register, variable, self.usage_counter)
+        self.usage_counter += 1
+        register.state = RegisterStates.RESERVED
+        if load or cached_register is not None:
+            self._frame_instruction(HighAssemblyInstructions.LOAD, register.name, variable.stack_offset, f"{register.name} = {variable.name}, kept in register" if self.comments else "")
+
+    def release(self, register_name: str):
+        self.stored_reservations.discard(self.named_registers[register_name])
+        self._empty(self.named_registers[register_name])
     
-    def clear_last_instruction(self):
+    def clear_last_instruction(self, assigned_register: str|None = None):
+        # the register assigned by the instruction keeps its variable, even if a call in the instruction made it stale, as its value is replaced
         for register in self.used_registers_in_instruction: # allow registers used in last instruction to be used again
-            register.clear()
+            if register in self.stale_registers and not register.written and register.name != assigned_register:
+                self._empty(register)
+            else:
+                self._clear(register)
         self.used_registers_in_instruction = []
+        self.stale_registers = set()
         
     def expression_end(self):
         self.intermediate_results_counter = 0
         for register in self.registers:
             if isinstance(register.value, IntermediateResult): # invalidate all intermediate results
                 if register.value.address_register and register.written:
-                    self.writer.instruction(f"{HighAssemblyInstructions.STORE} [{register.value.address_register.name}] {register.name}", f"store *{register.value.address_register.value.name}") 
-                register.empty()
+                    self.writer.instruction(HighAssemblyInstructions.STORE, (MemoryOperand(register.value.address_register.name), register.name), f"store *{register.value.address_register.value.name}" if self.comments else "") 
+                self._empty(register)
     
     def assign_return_register(self, intermediate_result_lookup: Callable[[int], IntermediateResult]):
         # if-elif is here just to print a comment in the assembly code, it does not affect the code itself
-        if isinstance(self.last_assigned_register.value, IntermediateResult):
+        return_comment = ""
+        if self.comments and isinstance(self.last_assigned_register.value, IntermediateResult):
             intermediate_result = intermediate_result_lookup(self.last_assigned_register.value.number)
             if intermediate_result:
                 return_comment = f"return {intermediate_result.comment}"
             else:
                 return_comment = f"return {self.last_assigned_register.name}"
-        elif isinstance(self.last_assigned_register.value, Construct):
+        elif self.comments and isinstance(self.last_assigned_register.value, Construct):
             return_comment = f"return {self.last_assigned_register.value.comment}"
         
         if self.last_assigned_register.name == self.EAX.name:
             self.writer.comment("return value already in EAX")
         else:
-            self.writer.instruction(f"{HighAssemblyInstructions.MOV} {self.EAX.name} {self.last_assigned_register.name}", return_comment)
+            self.writer.instruction(HighAssemblyInstructions.MOV, (self.EAX.name, self.last_assigned_register.name), return_comment)
         
-    def create_stack_frame(self, number_of_variables: int):
-        self.writer.instruction(f"{HighAssemblyInstructions.PUSH} {self.EBP.name}", "stack frame, store base pointer")
-        self.writer.instruction(f"{HighAssemblyInstructions.MOV} {self.EBP.name} {self.ESP.name}", "stack frame, set base pointer")
-        if number_of_variables > 0: # space for local variables
-            self.writer.instruction(f"{HighAssemblyInstructions.SUB} {self.ESP.name} {self.ESP.name} {number_of_variables}", "stack frame, space for local variables and temporary return value")
+    def create_stack_frame(self, number_of_variables: int, frame_pointer: bool = True):
+        # each function starts with an empty register file, so its code does not depend on the previously generated function
+        for register in self.registers:
+            register.empty()
+        self.invalidate()
+        self.used_registers_in_instruction = []
+        self.last_assigned_register = None
+        self.usage_counter = 0
+        self.intermediate_results_counter = 0
+        self.frame_pointer = frame_pointer
+        self.stack_depth = 0
+        self.frame_instructions = []
+        self.stack_instructions = []
 
-        self.writer.instruction(f"{HighAssemblyInstructions.PUSHA}", f"stack frame, push {self.register_string}")
+        if frame_pointer:
+            self.writer.instruction(HighAssemblyInstructions.PUSH, (self.EBP.name,), "stack frame, store base pointer")
+            self.writer.instruction(HighAssemblyInstructions.MOV, (self.EBP.name, self.ESP.name), "stack frame, set base pointer")
+            if number_of_variables > 0: # space for local variables
+                self.writer.instruction(HighAssemblyInstructions.SUB, (self.ESP.name, self.ESP.name, number_of_variables), "stack frame, space for local variables and temporary return value")
+
+        register_names = [register.name for register in self.registers]
+        self.frame_instructions.append(self.writer.instruction(HighAssemblyInstructions.PUSHA, (), f"stack frame, push {self._register_list(register_names)}" if self.comments else "", patchable=True))
     
     def destroy_stack_frame(self):
-        self.writer.instruction(f"{HighAssemblyInstructions.POPA}", f"stack frame, pop {self.register_string_reversed}")
-        self.writer.instruction(f"{HighAssemblyInstructions.MOV} {self.ESP.name} {self.EBP.name}", "stack frame, restore stack pointer")
-        self.writer.instruction(f"{HighAssemblyInstructions.POP} {self.EBP.name}", "stack frame, restore base pointer")
+        register_names = [register.name for register in reversed(self.registers)]
+        self.frame_instructions.append(self.writer.instruction(HighAssemblyInstructions.POPA, (), f"stack frame, pop {self._register_list(register_names)}" if self.comments else "", patchable=True))
+        if self.frame_pointer:
+            self.writer.instruction(HighAssemblyInstructions.MOV, (self.ESP.name, self.EBP.name), "stack frame, restore stack pointer")
+            self.writer.instruction(HighAssemblyInstructions.POP, (self.EBP.name,), "stack frame, restore base pointer")
+        elif self.stack_depth != 0:
+            raise Exception(f"Stack pointer moved by {self.stack_depth} at the return of a function without a frame pointer.")
         self.usage_counter = 0
         self.intermediate_results_counter = 0
         self.stack_offset = 0
+
+    def finish_stack_frame(self):
+        # PUSHA and POPA save only the general purpose registers used by the function and are left out, when it uses none of them,
+        # the offsets relative to the stack pointer are increased by the number of the saved registers
+        register_names = [register.name for register in self.registers]
+        used = set()
+        for instruction in self.writer.section_instructions():
+            for operand in instruction.operands:
+                if operand.__class__ is str and operand in self.named_registers:
+                    used.add(operand)
+        saved = [register_name for register_name in register_names if register_name in used]
+
+        for instruction in self.stack_instructions:
+            memory = instruction.operands[1] if instruction.opcode == HighAssemblyInstructions.LOAD else instruction.operands[0]
+            memory.offset += len(saved)
+            self.writer.patch(instruction)
+        if len(saved) == len(register_names):
+            return
+        if not saved:
+            self.writer.remove(self.frame_instructions)
+            return
+        for instruction in self.frame_instructions:
+            if instruction.opcode == HighAssemblyInstructions.PUSHA:
+                instruction.operands = tuple(saved)
+                instruction.comment = f"stack frame, push {self._register_list(saved)}" if self.comments else ""
+            else:
+                instruction.operands = tuple(reversed(saved))
+                instruction.comment = f"stack frame, pop {self._register_list(saved[::-1])}" if self.comments else ""
+            self.writer.patch(instruction)
     
     def store_written(self):
         for register in self.registers:
             if isinstance(register.value, Variable) and register.written:
-                if register.value.global_scope:
-                    self.writer.instruction(f"{HighAssemblyInstructions.STORE} {register.value.label} {register.name}", f"store {register.value.name}")
-                else:
-                    self.writer.instruction(f"{HighAssemblyInstructions.STORE} [{self.EBP.name}{register.value.stack_offset:+}] {register.name}", f"store {register.value.name}") 
-                register.empty()
+                self._store(register)
+                self._empty(register)
     
     def store_global_variables(self):
         for register in self.registers:
             if isinstance(register.value, Variable) and register.written:
                 if register.value.global_scope:
-                    self.writer.instruction(f"{HighAssemblyInstructions.STORE} {register.value.label} {register.name}", f"store {register.value.name}")
-                register.empty()
+                    self.writer.instruction(HighAssemblyInstructions.STORE, (GlobalVariableOperand(register.value.name), register.name), f"store {register.value.name}" if self.comments else "")
+                self._empty(register)
+    
+    def release_global_variables(self):
+        # the callee may read and write the global variables, so the written ones are stored before a call and the cached ones are loaded again
+        # after it, the operands of the current instruction keep their value until the instruction is done
+        for register in self.registers:
+            if isinstance(register.value, Variable) and register.value.global_scope:
+                self._store(register)
+                register.written = False
+                if register in self.used_registers_in_instruction:
+                    self.stale_registers.add(register)
+                else:
+                    self._empty(register)
     
     def get_EAX(self) -> str:
         return self.EAX.name
     
     def invalidate(self):
+        # reserved registers stay valid, they are the same on every path through the function
         for register in self.registers:
-            register.empty()
+            if register.state != RegisterStates.RESERVED:
+                register.empty()
+        self.stored_reservations = set() # the stored values may differ on the paths joining here
+        self._reset_indexes()
 
     def _free_or_empty_register(self) -> Register|None:
-        empty_registers = list(filter(lambda register: register.state == RegisterStates.EMPTY, self.registers))
-        if len(empty_registers) > 0: # first try empty registers
-            return empty_registers[0] 
+        empty_registers = self.empty_registers
+        while empty_registers: # first try empty registers
+            register = self.registers[empty_registers[0]]
+            if register.state == RegisterStates.EMPTY:
+                return register
+            heapq.heappop(empty_registers)
+        
+        # free registers ordered by usage, then by their order in the register file
+        free_registers = []
+        free_unwritten_register = None
+        while self.free_registers:
+            usage, index = heapq.heappop(self.free_registers)
+            register = self.registers[index]
+            if register.state == RegisterStates.FREE and register.usage == usage and (usage, index) not in free_registers[-1:]:
+                free_registers.append((usage, index))
+                if not register.written:
+                    free_unwritten_register = register
+                    break
+        for entry in free_registers:
+            heapq.heappush(self.free_registers, entry)
+
+        if free_unwritten_register is not None: # then try free registers that are not written
+            return free_unwritten_register
+        elif len(free_registers) > 0: # then try any free registers
+            free_register = self.registers[free_registers[0][1]]
+            if isinstance(free_register.value, Variable) and free_register.written:
+                self._store(free_register)
+                self._empty(free_register)
+            return free_register
         else:
-            free_registers = list(filter(lambda register: register.state == RegisterStates.FREE, self.registers))
-            free_registers = sorted(free_registers, key=lambda register: register.usage)
-            free_unwritten_registers = list(filter(lambda register: not register.written, free_registers))
-            if len(free_unwritten_registers) > 0: # then try free registers that are not written
-                return free_unwritten_registers[0]
-            elif len(free_registers) > 0: # then try any free registers
-                free_register = free_registers[0]
-                if isinstance(free_register.value, Variable) and free_register.written:
-                    if free_register.value.global_scope:
-                        self.writer.instruction(f"{HighAssemblyInstructions.STORE} {free_register.value.label} {free_register.name}", f"store {free_register.value.name}")
-                    else:
-                        self.writer.instruction(f"{HighAssemblyInstructions.STORE} [{self.EBP.name}{free_register.value.stack_offset:+}] {free_register.name}", f"store {free_register.value.name}") 
-                    free_register.empty()
-                return free_register
-            else:
-                return None
+            return None
             
     def _push_least_recently_used(self) -> Register:
-        register = sorted(self.registers, key=lambda register: register.usage)[0] # select the least recently used intermediate result
-        self.writer.instruction(f"{HighAssemblyInstructions.PUSH} {register.name}", f"push {register.name}")
+        while True: # select the least recently used intermediate result
+            usage, index = self.usage_order[0]
+            register = self.registers[index]
+            if register.usage == usage and isinstance(register.value, IntermediateResult):
+                break
+            heapq.heappop(self.usage_order)
+        self.writer.instruction(HighAssemblyInstructions.PUSH, (register.name,), f"push {register.name}" if self.comments else "")
+        self.stack_depth += 1
         return register
+
+    def _populate(self, register: Register, value: Variable|Constant|IntermediateResult, usage: int):
+        self._remove_from_index(register)
+        register.populate(value, usage)
+        if isinstance(value, IntermediateResult):
+            self.intermediate_result_registers[value.number] = register
+        else:
+            self.operand_registers[value] = register
+        heapq.heappush(self.usage_order, (usage, register.index))
+
+    def _frame_instruction(self, opcode: HighAssemblyInstructions, register_name: str, stack_offset: int, comment: str):
+        # loads or stores a local variable or a parameter, [ebp+offset] is [esp+offset-1+pushed words] without a frame pointer, as the return
+        # address is the last word pushed before the frame, the saved registers are added by 'finish_stack_frame'
+        if self.frame_pointer:
+            memory = MemoryOperand(self.EBP.name, stack_offset)
+        else:
+            memory = MemoryOperand(self.ESP.name, stack_offset - 1 + self.stack_depth)
+        operands = (register_name, memory) if opcode == HighAssemblyInstructions.LOAD else (memory, register_name)
+        instruction = self.writer.instruction(opcode, operands, comment, patchable=not self.frame_pointer)
+        if not self.frame_pointer:
+            self.stack_instructions.append(instruction)
+
+    def _register_list(self, register_names: list[str]) -> str:
+        if len(register_names) == 1:
+            return register_names[0]
+        return ", ".join(register_names[:-1]) + " and " + register_names[-1]
+
+    def _store(self, register: Register):
+        if isinstance(register.value, Variable) and register.written:
+            if register.value.global_scope:
+                self.writer.instruction(HighAssemblyInstructions.STORE, (GlobalVariableOperand(register.value.name), register.name), f"store {register.value.name}" if self.comments else "")
+            else:
+                self._frame_instruction(HighAssemblyInstructions.STORE, register.name, register.value.stack_offset, f"store {register.value.name}" if self.comments else "")
+
+    def _clear(self, register: Register):
+        if register.state == RegisterStates.RESERVED:
+            return
+        register.clear()
+        if register.index is not None:
+            heapq.heappush(self.free_registers, (register.usage, register.index))
+
+    def _empty(self, register: Register):
+        self._remove_from_index(register)
+        register.empty()
+        heapq.heappush(self.empty_registers, register.index)
+        heapq.heappush(self.usage_order, (register.usage, register.index))
+
+    def _remove_from_index(self, register: Register):
+        if isinstance(register.value, IntermediateResult):
+            if self.intermediate_result_registers.get(register.value.number) is register:
+                del self.intermediate_result_registers[register.value.number]
+        elif register.value is not None:
+            if self.operand_registers.get(register.value) is register:
+                del self.operand_registers[register.value]
+
+    def _reset_indexes(self):
+        # all registers except of the reserved ones are empty
+        self.operand_registers: dict[Variable|Constant, Register] = {register.value: register for register in self.registers if register.state == RegisterStates.RESERVED}
+        self.intermediate_result_registers: dict[int, Register] = {}
+        self.empty_registers = [register.index for register in self.registers]
+        self.free_registers: list[tuple[int, int]] = []
+        self.usage_order = [(0, register.index) for register in self.registers]
@@ -1,39 +1,79 @@
 import re
 import sys
+from typing import Iterable, Iterator
 from enums import Tokens
 
 class Scanner:
-    def __init__(self, program: str):
-        self.regex = (
-            r"(\n)|" +                                                              # new line
-            r"(#.*\n)|" +                                                           # preprocessor directive
-            r"(//.*\n)|" +                                                          # line comment
-            r"(return|if|else|for|while)|" +                                        # keywords
-            r"(int)|" +                                                             # types
-            r"(true|false)|"                                                        # booleans
-            r"([a-zA-Z_][a-zA-Z0-9_]*)|" +                                          # identifiers
-            r"(\()|(\))|(\{)|(\})|(\[)|(\])|" +                                     # brackets
-            r"(\d+)|" +                                                             # integers
-            r"(\+|-|\*|<<<|>>>|<<|>>|&&|&|\|\||\||\^|>=|<=|>|<|==|!=|!|~)|" +       # operators
-            r"(=)|" +                                                               # assignment
-            r"(;)|" +                                                               # semicolon
-            r"(,)|" +                                                               # comma
-            r"('.'|'\\.'|'\\[0-7]{1,3}'|'\\x[\da-fA-F]{2}')|" +                     # character
-            r"([^\s]*?)|"                                                           # not a whitespace
-        )
+    regex = re.compile(
+        r"(?P<NEW_LINE>\n)|" +                                                              # new line
+        r"[ \t\r\f\v]+|" +                                                                  # white spaces (no group)
+        r"(?P<PREPROCESSOR_DIRECTIVE>#.*\n)|" +                                             # preprocessor directive
+        r"(?P<COMMENT>//.*\n)|" +                                                           # line comment
+        r"(?P<KEYWORD>return|if|else|for|while)|" +                                         # keywords
+        r"(?P<TYPE>int)|" +                                                                 # types
+        r"(?P<BOOLEAN>true|false)|"                                                         # booleans
+        r"(?P<IDENTIFIER>[a-zA-Z_][a-zA-Z0-9_]*)|" +                                        # identifiers
+        r"(?P<OPENED_BRACKET>\()|(?P<CLOSED_BRACKET>\))|" +                                 # brackets
+        r"(?P<OPENED_CURLY_BRACKET>\{)|(?P<CLOSED_CURLY_BRACKET>\})|" +
+        r"(?P<OPENED_SQUARE_BRACKET>\[)|(?P<CLOSED_SQUARE_BRACKET>\])|" +
+        r"(?P<INTEGER>\d+)|" +                                                              # integers
+        r"(?P<OPERATOR>\+|-|\*|<<<|>>>|<<|>>|&&|&|\|\||\||\^|>=|<=|>|<|==|!=|!|~)|" +       # operators
+        r"(?P<ASSIGNMENT>=)|" +                                                             # assignment
+        r"(?P<SEMICOLON>;)|" +                                                              # semicolon
+        r"(?P<COMMA>,)|" +                                                                  # comma
+        r"(?P<CHARACTER>'.'|'\\.'|'\\[0-7]{1,3}'|'\\x[\da-fA-F]{2}')|" +                    # character
+        r"(?P<UNEXPECTED>[^\s]*?)|"                                                         # not a whitespace
+    )
+    # token of each group indexed by 'match.lastindex', None for groups which are not tokens
+    token_table: list[Tokens|None] = [None, None, None] + [Tokens[name] for name in list(regex.groupindex)[2:-1]] + [None]
+    unexpected_group = regex.groupindex["UNEXPECTED"]
+
+    def __init__(self, program: str = "", file_names: list[str]|None = None):
         self.program = program
+        self.file_names = file_names if file_names is not None else []
         self.line_number = 1
         self.token_number = 0
-    
-    def scan(self) -> tuple[Tokens, str, int, int]:
-        for match in re.finditer(self.regex, self.program):
-            for i in range(1, len(match.groups()) + 1):
-                if match.group(i):
-                    if i <= 2:
-                        self.line_number += 1
-                        self.token_number = 0
-                    elif i == len(match.groups()):
-                        raise Exception(f"Unexpected character{'s' if len(match.group(i)) > 1 else ''} '{match.group(i)}' at line {self.line_number}")
-                    else:
-                        self.token_number += 1
-                        yield Tokens(i - 2), match.group(i), self.line_number, self.token_number
+
+    def scan(self) -> Iterator[tuple[Tokens, str, int, int]]:
+        token_table = self.token_table
+        unexpected_group = self.unexpected_group
+        for line in self._lines():
+            for match in self.regex.finditer(line):
+                i = match.lastindex
+                if i is None: # white spaces
+                    continue
+                value = match.group(i)
+                if not value:
+                    continue
+                elif i <= 2:
+                    self.line_number += 1
+                    self.token_number = 0
+                elif i == unexpected_group:
+                    raise Exception(f"Unexpected character{'s' if len(value) > 1 else ''} '{value}' at line {self.line_number}")
+                else:
+                    self.token_number += 1
+                    yield token_table[i], value, self.line_number, self.token_number
+
+    def _lines(self) -> Iterator[str]:
+        # lines of the program followed by lines of the files, files are streamed as if they were concatenated
+        unfinished_line = ""
+        for lines in self._sources():
+            for line in lines:
+                if unfinished_line:
+                    line = unfinished_line + line
+                    unfinished_line = ""
+                if line.endswith('\n'):
+                    yield line
+                else:
+                    unfinished_line = line
+
+        if unfinished_line:
+            yield unfinished_line
+
+    def _sources(self) -> Iterator[Iterable[str]]:
+        if self.program:
+            yield self.program.splitlines(keepends=True)
+
+        for file_name in self.file_names:
+            with open(file_name, "r") as f:
+                yield f
@@ -0,0 +1,134 @@
+import copy
+from enums import InternalAlphabet, Keywords, Operators, Types
+from constructs import Comment, ConditionJump, Constant, Function, IntermediateResult, ReturnValue
+from register_allocation import BOUNDARY_COMMANDS, RESULTLESS_OPERATORS
+
+# operators with a single operand, the other operators have two
+UNARY_OPERATORS = (Operators.LOGICAL_NOT, Operators.BITWISE_NOT, Operators.UNARY_PLUS, Operators.UNARY_MINUS, Operators.DEREFERENCE,
+                   Operators.ASSIGNMENT_DEREFERENCE, Operators.PARAMETER_ASSIGNMENT)
+# operators resulting in 0 or 1 by the values of their operands compared with zero, the conditions are split at them
+LOGICAL_OPERATORS = (Operators.LOGICAL_NOT, Operators.LOGICAL_AND, Operators.LOGICAL_OR)
+
+def short_circuit_conditions(function: Function) -> Function:
+    # a copy of the function, whose conditions of 'if', 'else if', 'while' and 'for' statements are split at '&&', '||' and '!' into parts,
+    # each part is a statement jumping to the next part, only when the value of the condition is not known yet, and otherwise to the body or
+    # past it, a comparison with zero is tested by the jump itself, the conditions with calls or assignments are evaluated as a whole,
+    # as the calls are not evaluated from left to right
+    body = []
+    changed = False
+    start = 0
+    for i, command in enumerate(function.body):
+        if isinstance(command, (Keywords, Comment)) or command in BOUNDARY_COMMANDS:
+            body.append(command)
+            start = i + 1
+        elif command == InternalAlphabet.EXPRESSION_END:
+            statement = function.body[start:i + 1]
+            parts = _condition_parts(statement[:-2]) if len(statement) > 2 and statement[-2] == InternalAlphabet.EQUAL_ZERO_JUMP else None
+            body += statement if parts is None else parts
+            changed = changed or parts is not None
+            start = i + 1
+    if not changed:
+        return function
+    function = copy.copy(function)
+    function.body = body + function.body[start:]
+    return function
+
+def _condition_parts(condition: list) -> list|None:
+    # the statements evaluating the condition part by part, the last one jumps past the body, None when the condition is not split
+    if any(isinstance(command, ReturnValue) or command == Operators.ASSIGNMENT for command in condition):
+        return None
+    produced = [p for p, command in enumerate(condition) if isinstance(command, Operators) and command not in RESULTLESS_OPERATORS]
+    operands = lambda p: [p - 1] if condition[p] in UNARY_OPERATORS else [p - 2, p - 1]
+    computed = lambda q: produced[condition[q].number] if isinstance(condition[q], IntermediateResult) else q # position computing the operand at 'q'
+    is_zero = lambda q: isinstance(condition[q], Constant) and condition[q].value == 0
+    parts: list[tuple[int, list|None, list|None]] = [] # position computing each part and the parts it jumps to, when it is true and when it is false
+
+    def split(p: int, true: list|None, false: list|None):
+        # a target is a list holding the number of a part, which is known only after the preceding parts are split, or None past the body
+        command = condition[p]
+        if command == Operators.LOGICAL_AND or command == Operators.LOGICAL_OR:
+            following = []
+            split(computed(p - 2), following if command == Operators.LOGICAL_AND else true, false if command == Operators.LOGICAL_AND else following)
+            following.append(len(parts))
+            split(computed(p - 1), true, false)
+        elif command == Operators.LOGICAL_NOT:
+            split(computed(p - 1), false, true)
+        elif (command == Operators.LOGICAL_EQUAL or command == Operators.LOGICAL_NOT_EQUAL) and (is_zero(p - 2) or is_zero(p - 1)):
+            operand = computed(p - 1 if is_zero(p - 2) else p - 2)
+            split(operand, true, false) if command == Operators.LOGICAL_NOT_EQUAL else split(operand, false, true)
+        else:
+            parts.append((p, true, false))
+
+    root = computed(len(condition) - 1)
+    into_body = []
+    split(root, into_body, None)
+    into_body.append(len(parts)) # the part after the last one
+    if len(parts) == 1 and parts[0][0] == root and parts[0][1] is into_body:
+        return None
+
+    statements = []
+    for number, (p, true, false) in enumerate(parts):
+        if p in produced:
+            computation = _computation(condition, p, operands, computed)
+            operators = [q for q in computation if q in produced]
+            statements += [IntermediateResult(operators.index(produced[condition[q].number])) if isinstance(condition[q], IntermediateResult) else condition[q]
+                           for q in computation]
+            statements.append(IntermediateResult(len(operators) - 1))
+        else:
+            statements.append(condition[p])
+        true = true[0] if true is not None else None
+        false = false[0] if false is not None else None
+        if number == len(parts) - 1:
+            statements.append(InternalAlphabet.EQUAL_ZERO_JUMP if true == number + 1 else InternalAlphabet.NOT_ZERO_JUMP)
+        else:
+            statements.append(ConditionJump(True, false) if true == number + 1 else ConditionJump(False, true))
+        statements.append(InternalAlphabet.EXPRESSION_END)
+    return statements
+
+def _computation(condition: list, root: int, operands, computed) -> list[int]:
+    # positions of the operator at 'root' and of the operators and operands computing its operands in the order of the condition
+    positions = []
+    pending = [root]
+    while pending:
+        p = pending.pop()
+        positions.append(p)
+        for q in operands(p):
+            positions.append(q)
+            if computed(q) != q:
+                pending.append(computed(q))
+    return sorted(positions)
+
+def logical_values(function: Function) -> Function:
+    # a copy of the function, whose '!', '&&' and '||' left after splitting the conditions are computed by comparisons with zero, i.e. '!a' as
+    # 'a == 0', 'a && b' as '(a != 0) & (b != 0)' and 'a || b' as '(a | b) != 0', so they result in 0 or 1 as in the split conditions,
+    # both their operands are evaluated
+    if not any(command in LOGICAL_OPERATORS for command in function.body):
+        return function
+    zero = lambda: Constant(Types.INT, 0, "0")
+    body = []
+    numbers: list[int] = [] # new number of each intermediate result of the current statement
+    for command in function.body:
+        if isinstance(command, IntermediateResult):
+            body.append(IntermediateResult(numbers[command.number]))
+        elif command == Operators.LOGICAL_NOT:
+            body += [zero(), Operators.LOGICAL_EQUAL]
+            numbers.append(len(numbers) and numbers[-1] + 1)
+        elif command == Operators.LOGICAL_OR:
+            number = len(numbers) and numbers[-1] + 1
+            body += [Operators.BITWISE_OR, IntermediateResult(number), zero(), Operators.LOGICAL_NOT_EQUAL]
+            numbers.append(number + 1)
+        elif command == Operators.LOGICAL_AND:
+            number = len(numbers) and numbers[-1] + 1
+            first, second = body[-2:]
+            body[-2:] = [first, zero(), Operators.LOGICAL_NOT_EQUAL, second, zero(), Operators.LOGICAL_NOT_EQUAL,
+                         IntermediateResult(number), IntermediateResult(number + 1), Operators.BITWISE_AND]
+            numbers.append(number + 2)
+        else:
+            if isinstance(command, Operators) and command not in RESULTLESS_OPERATORS:
+                numbers.append(len(numbers) and numbers[-1] + 1)
+            elif command == InternalAlphabet.EXPRESSION_END:
+                numbers = []
+            body.append(command)
+    function = copy.copy(function)
+    function.body = body
+    return function
@@ -0,0 +1,103 @@
+from enums import HighAssemblyInstructions, HighAssemblyDirectives, TargetAssemblyInstructions
+from high_assembly import Instruction, MemoryOperand
+
+# cycles of the HaDes instructions, the multiplications run in the multi-cycle 'hades_mul' unit, the other instructions in one cycle of the ALU
+INSTRUCTION_COSTS: dict[TargetAssemblyInstructions, int] = {
+    TargetAssemblyInstructions.MUL: 4,
+    TargetAssemblyInstructions.MULI: 4,
+    TargetAssemblyInstructions.MOV: 1,
+    TargetAssemblyInstructions.LDI: 1,
+    TargetAssemblyInstructions.ADD: 1,
+    TargetAssemblyInstructions.SUB: 1,
+    TargetAssemblyInstructions.SHLI: 1,
+}
+
+# registers, which can hold a copy of the multiplied register, when the product overwrites it
+SCRATCH_REGISTERS = ["edx", "r1", "r2", "r3", "eax"]
+
+# instructions writing their first operand, the other register operands are read
+WRITING_INSTRUCTIONS = {
+    HighAssemblyInstructions.MOV, HighAssemblyInstructions.LOAD, HighAssemblyInstructions.IN, HighAssemblyInstructions.POP,
+    HighAssemblyInstructions.ADD, HighAssemblyInstructions.SUB, HighAssemblyInstructions.MUL, HighAssemblyInstructions.AND,
+    HighAssemblyInstructions.OR, HighAssemblyInstructions.XOR, HighAssemblyInstructions.SHL, HighAssemblyInstructions.SHR,
+    HighAssemblyInstructions.ROL, HighAssemblyInstructions.ROR, HighAssemblyInstructions.EQ, HighAssemblyInstructions.NEQ,
+    HighAssemblyInstructions.LT, HighAssemblyInstructions.GT, HighAssemblyInstructions.LTE, HighAssemblyInstructions.GTE,
+    HighAssemblyInstructions.NOT, HighAssemblyInstructions.NEG,
+}
+
+def multiplication_sequence(constant: int, copy: bool = False) -> list[tuple[TargetAssemblyInstructions, int|None]]|None:
+    # the cheapest sequence of shifts, additions and subtractions computing 'constant' times a register, None when the multiplication is cheaper,
+    # the sequence is a Horner scheme over the terms of the binary or of the non adjacent form of the constant, e.g. 640 = ((1 << 2) + 1) << 7,
+    # each step is (SHLI, amount), (ADD, None) or (SUB, None) applied to the product and the multiplied register, (MOV, None) starts with a copy
+    if constant < 0: # immediates of MULI are sign extended, negative constants are multiplied
+        return None
+    if constant == 0:
+        return [(TargetAssemblyInstructions.LDI, 0)]
+
+    best = None
+    for terms in (_binary_terms(constant), _non_adjacent_terms(constant)):
+        sequence = _horner_sequence(terms)
+        if copy and len(terms) > 1: # the product overwrites the multiplied register, which is read again
+            sequence.insert(0, (TargetAssemblyInstructions.MOV, None))
+        if best is None or sequence_cost(sequence) < sequence_cost(best):
+            best = sequence
+    return best if sequence_cost(best) < INSTRUCTION_COSTS[TargetAssemblyInstructions.MULI] else None
+
+def sequence_cost(sequence: list[tuple[TargetAssemblyInstructions, int|None]]) -> int:
+    return sum(INSTRUCTION_COSTS[instruction] for instruction, _ in sequence)
+
+def is_dead(register: str, instructions: list[Instruction], start: int) -> bool:
+    # whether the value of the register is overwritten before it is read, the instructions are scanned up to the end of the basic block
+    for instruction in instructions[start:]:
+        opcode, operands = instruction.opcode, instruction.operands
+        if opcode in WRITING_INSTRUCTIONS:
+            if any(_reads(operand, register) for operand in operands[1:]):
+                return False
+            if operands[0] == register:
+                return True
+        elif opcode in (HighAssemblyInstructions.PUSH, HighAssemblyInstructions.STORE, HighAssemblyInstructions.OUT, HighAssemblyDirectives.COMMENT):
+            if any(_reads(operand, register) for operand in operands):
+                return False
+            if register == "edx" and opcode != HighAssemblyInstructions.OUT and len(operands) and isinstance(operands[-1], int): # constants are stored via edx
+                return True
+        elif opcode == HighAssemblyInstructions.POPA: # restores the listed registers or r1, r2 and r3, the others keep the values of the caller
+            return register in (operands or ("r1", "r2", "r3"))
+        elif opcode == HighAssemblyInstructions.CALL or (opcode == HighAssemblyInstructions.RET and len(operands)): # the return address is loaded to edx
+            return register == "edx"
+        else: # jumps, labels and the remaining instructions end the basic block
+            return False
+    return False
+
+def _reads(operand, register: str) -> bool:
+    return operand == register or (isinstance(operand, MemoryOperand) and operand.register == register)
+
+def _binary_terms(constant: int) -> list[tuple[int, int]]:
+    # (sign, exponent) of the set bits from the most significant one
+    return [(1, exponent) for exponent in range(constant.bit_length() - 1, -1, -1) if constant >> exponent & 1]
+
+def _non_adjacent_terms(constant: int) -> list[tuple[int, int]]:
+    # (sign, exponent) of the non adjacent form, i.e. the signed digit representation with the fewest nonzero digits, e.g. 7 = 8 - 1
+    terms = []
+    exponent = 0
+    while constant:
+        if constant & 1:
+            digit = 2 - (constant & 3) # 1 or -1
+            terms.append((digit, exponent))
+            constant -= digit
+        constant >>= 1
+        exponent += 1
+    return terms[::-1]
+
+def _horner_sequence(terms: list[tuple[int, int]]) -> list[tuple[TargetAssemblyInstructions, int|None]]:
+    # the most significant term is always positive
+    _, exponent = terms[0]
+    if len(terms) == 1:
+        return [(TargetAssemblyInstructions.SHLI, exponent) if exponent else (TargetAssemblyInstructions.MOV, None)]
+
+    sequence = [(TargetAssemblyInstructions.SHLI, exponent - terms[1][1])]
+    for i, (sign, exponent) in enumerate(terms[1:], 1):
+        sequence.append((TargetAssemblyInstructions.ADD if sign > 0 else TargetAssemblyInstructions.SUB, None))
+        next_exponent = terms[i + 1][1] if i + 1 < len(terms) else 0
+        if exponent > next_exponent:
+            sequence.append((TargetAssemblyInstructions.SHLI, exponent - next_exponent))
+    return sequence
@@ -1,146 +1,136 @@
-from enums import TargetAssemblyHelpers, TargetAssemblyInstructions, TargetAssemblyRegisters, HighAssemblyInstructions
+from typing import Callable
+from enums import TargetAssemblyHelpers, TargetAssemblyInstructions, TargetAssemblyRegisters, HighAssemblyInstructions, HighAssemblyDirectives, OperandTypes
+from high_assembly import Instruction, parse_instruction, FUNCTION_LABELS
 from writer import Writer
-import re
+from time_report import TimeReport
+from strength_reduction import SCRATCH_REGISTERS, multiplication_sequence, is_dead
+
+# registers saved by PUSHA without operands
+GENERAL_PURPOSE_REGISTERS = ("r1", "r2", "r3")
 
 class TargetAssemblyGenerator():
-    def __init__(self, high_assembly_code: str|list[str], writer: Writer, register_map: dict[str, str] = { 
+    def __init__(self, high_assembly_code: str|list[Instruction], writer: Writer, register_map: dict[str, str] = { 
                      "r0": TargetAssemblyRegisters.R0, "r1": TargetAssemblyRegisters.R1, "r2": TargetAssemblyRegisters.R2, 
                      "r3": TargetAssemblyRegisters.R3, "eax": TargetAssemblyRegisters.EAX, "edx": TargetAssemblyRegisters.EDX, 
                      "ebp": TargetAssemblyRegisters.EBP, "esp": TargetAssemblyRegisters.ESP },
-                 register_definitions: dict[str, str] = { "eax": "r4", "edx": "r5", "ebp": "r6", "esp": "r7"}):
+                 register_definitions: dict[str, str] = { "eax": "r4", "edx": "r5", "ebp": "r6", "esp": "r7"}, strength_reduction: bool = True):
         if isinstance(high_assembly_code, list):
             self.source_code = high_assembly_code
-        else:
-            self.source_code = high_assembly_code.split('\n')
-        self.register_map = register_map
+        else: # textual high assembly is parsed to instruction records
+            self.source_code = [instruction for instruction in map(parse_instruction, high_assembly_code.split('\n')) if instruction is not None]
+        self.register_map = {name: str(register) for name, register in register_map.items()} # formatted once, not in every instruction
         self.writer = writer
-        self.first_function = True
-        self.regex = ( # TODO: refactor
-            r"(^\s*@([a-z_][a-z0-9_]*):\s*(\-*\d+)\s*(;\s*(.*))*$)|" +  # @<identifier>: <value> (5 groups)
-            r"(^\s*\$([a-z_][a-z0-9_]*):\s*(;\s*(.*))*$)|" +            # $<function name>:      (4 groups)
-            HighAssemblyInstructions.PUSH.to_regex() +       # push <register|constant>          (4 and groups)
-            HighAssemblyInstructions.POP.to_regex() +        # pop <register>                    (4 groups)
-            HighAssemblyInstructions.PUSHA.to_regex() +      # pusha                             (3 groups)
-            HighAssemblyInstructions.POPA.to_regex() +       # popa                              (3 groups)
-            HighAssemblyInstructions.LOAD.to_regex() +       # load <register> <memory|global variable>           (7 and 5 groups)
-            HighAssemblyInstructions.MOV.to_regex() +        # move <register> <constant|register>                (5 and 5 groups)
-            HighAssemblyInstructions.STORE.to_regex() +      # store <memory|global variable> <register>          (7 and 5 groups)
-            HighAssemblyInstructions.ADD.to_regex() +        # add <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.SUB.to_regex() +        # sub <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.MUL.to_regex() +        # mul <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.AND.to_regex() +        # and <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.OR.to_regex() +         # or  <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.XOR.to_regex() +        # xor <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.SHL.to_regex() +        # shl <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.SHR.to_regex() +        # shr <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.ROR.to_regex() +        # ror <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.ROL.to_regex() +        # rol <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.CALL.to_regex() +       # call <function name>                               (4 groups)
-            HighAssemblyInstructions.RET.to_regex() +        # ret [number of cleared parameters from the stack]  (4 or 3 groups)
-            HighAssemblyInstructions.RETI.to_regex() +       # reti [number of cleared parameters from the stack] (4 or 3 groups)
-            HighAssemblyInstructions.JMP.to_regex() +        # jmp <label>                                        (4 groups)
-            HighAssemblyInstructions.JZ.to_regex() +         # je  <register> <label>                             (5 groups)
-            HighAssemblyInstructions.JNZ.to_regex() +        # jne <register> <label>                             (5 groups)
-            HighAssemblyInstructions.EQ.to_regex() +         # eq  <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.NEQ.to_regex() +        # neq <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.LT.to_regex() +         # lt  <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.GT.to_regex() +         # gt  <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.LTE.to_regex() +        # lte <register> <register> <constant|register>      (6 and 6 groups)
-            HighAssemblyInstructions.GTE.to_regex() +        # gte <register> <register> <constant|register>      (6 and 6 groups)
-            r"(^\s*([a-z_][a-z0-9_\.]*):\s*(;\s*(.*))*$)|" + # <label>:                                           (4 groups)
-            HighAssemblyInstructions.NOT.to_regex() +        # not <register> <constant|register>                 (5 and 5 groups)
-            HighAssemblyInstructions.NEG.to_regex() +        # neg <register> <constant|register>                 (5 and 5 groups)
-            HighAssemblyInstructions.IN.to_regex() +         # in  <register> <positive constant>                 (5 groups)
-            HighAssemblyInstructions.OUT.to_regex() +        # out <register> <positive constant>                 (5 groups)
-            HighAssemblyInstructions.ENI.to_regex() +        # eni                                                (3 groups)
-            HighAssemblyInstructions.DEI.to_regex() +        # dsi                                                (3 groups)
-            HighAssemblyInstructions.SISA.to_regex() +       # sisa <function> <interrupt level>                  (5 groups)
-            r"(^\s*&([a-z_][a-z0-9_\.]*):\s*(;\s*(.*))*$)|"  # <function name without stack frame>                (4 groups)
-            r"(^\s*(;\s*(.*))*$)|" +                         # line comment                                       (3 groups)
-            HighAssemblyInstructions.EOF.to_regex()          # eof                                                (3 groups)
-         )
-        self.group_dict = { # TODO: refactor
-            0: self.handle_global_variable,
-            5: self.handle_function_label, 
-            9: self.handle_variable_push, 
-            13: self.handle_constant_push,
-            17: self.handle_pop, 
-            21: self.handle_pusha, 
-            24: self.handle_popa, 
-            27: self.handle_memory_load, 
-            34: self.handle_global_variable_load, 
-            39: self.handle_constant_move, 
-            44: self.handle_register_move, 
-            49: self.handle_memory_store, 
-            56: self.handle_global_variable_store, 
-            61: self.handle_constant_store, 
-            68: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.ADDI), 
-            74: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.ADD), 
-            80: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SUBI), 
-            86: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SUB), 
-            92: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.MULI), 
-            98: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.MUL), 
-            104: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.ANDI), 
-            110: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.AND), 
-            116: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.ORI), 
-            122: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.OR), 
-            128: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.XORI), 
-            134: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.XOR), 
-            140: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SHLI), 
-            146: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SHL), 
-            152: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SHRI), 
-            158: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SHR), 
-            164: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.CSHLI), 
-            170: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.CSHL), 
-            176: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.CSHRI), 
-            182: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.CSHR), 
-            188: self.handle_call, 
-            192: self.handle_return, 
-            196: self.handle_return_without_value,
-            199: self.handle_interrupt_return,
-            203: self.handle_interrupt_return_without_value,
-            206: self.handle_jump, 
-            210: self.handle_jump_if_zero, 
-            215: self.handle_jump_if_not_zero, 
-            220: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SEQI), 
-            226: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SEQ), 
-            232: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SNEI), 
-            238: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SNE), 
-            244: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SLTI), 
-            250: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SLT), 
-            256: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SGTI), 
-            262: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SGT), 
-            268: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SLEI), 
-            274: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SLE), 
-            280: lambda x: self._handle_constant_ALU_instruction(x, TargetAssemblyInstructions.SGRI), 
-            286: lambda x: self._handle_register_ALU_instruction(x, TargetAssemblyInstructions.SGR), 
-            292: self.handle_label, 
-            296: self.handle_constant_not, 
-            301: self.handle_register_not, 
-            306: self.handle_constant_negate, 
-            311: self.handle_register_negate, 
-            316: self.handle_input, 
-            321: self.handle_output, 
-            326: self.handle_enable_interrupts,
-            329: self.handle_disable_interrupts,
-            332: self.handle_set_interrupt_routine,
-            337: self.handle_function_label_without_stack,
-            341: self.handle_line_comment,
-            344: self.handle_end_of_function,
+        self.strength_reduction = strength_reduction
+        self.instructions: list[Instruction] = [] # instructions being translated and the position in them, the rest of a basic block is inspected
+        self.position = 0
+        self.first_function = True # no function is open, i.e. before the first function or after the end of a function
+        # instructions are dispatched by their opcode and the types of their operands
+        self.instruction_table: dict[HighAssemblyInstructions|HighAssemblyDirectives, dict[tuple[OperandTypes, ...], Callable[[tuple, str], None]]] = {
+            HighAssemblyInstructions.PUSH: {
+                (OperandTypes.IDENTIFIER,): self.handle_variable_push,
+                (OperandTypes.CONSTANT,): self.handle_constant_push,
+            },
+            HighAssemblyInstructions.POP: { (OperandTypes.IDENTIFIER,): self.handle_pop },
+            HighAssemblyInstructions.PUSHA: { (OperandTypes.IDENTIFIER,) * i: self.handle_pusha for i in range(len(GENERAL_PURPOSE_REGISTERS) + 1) },
+            HighAssemblyInstructions.POPA: { (OperandTypes.IDENTIFIER,) * i: self.handle_popa for i in range(len(GENERAL_PURPOSE_REGISTERS) + 1) },
+            HighAssemblyInstructions.LOAD: {
+                (OperandTypes.IDENTIFIER, OperandTypes.MEMORY): self.handle_memory_load,
+                (OperandTypes.IDENTIFIER, OperandTypes.GLOBAL_VARIABLE): self.handle_global_variable_load,
+            },
+            HighAssemblyInstructions.MOV: {
+                (OperandTypes.IDENTIFIER, OperandTypes.CONSTANT): self.handle_constant_move,
+                (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER): self.handle_register_move,
+            },
+            HighAssemblyInstructions.STORE: {
+                (OperandTypes.MEMORY, OperandTypes.IDENTIFIER): self.handle_memory_store,
+                (OperandTypes.GLOBAL_VARIABLE, OperandTypes.IDENTIFIER): self.handle_global_variable_store,
+                (OperandTypes.MEMORY, OperandTypes.CONSTANT): self.handle_constant_store,
+            },
+            HighAssemblyInstructions.ADD: self._ALU_instruction(TargetAssemblyInstructions.ADDI, TargetAssemblyInstructions.ADD),
+            HighAssemblyInstructions.SUB: self._ALU_instruction(TargetAssemblyInstructions.SUBI, TargetAssemblyInstructions.SUB),
+            HighAssemblyInstructions.MUL: {
+                (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER, OperandTypes.CONSTANT): self.handle_constant_multiply,
+                (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER): 
+                    lambda operands, comment: self._handle_register_ALU_instruction(operands, comment, TargetAssemblyInstructions.MUL),
+            },
+            HighAssemblyInstructions.AND: self._ALU_instruction(TargetAssemblyInstructions.ANDI, TargetAssemblyInstructions.AND),
+            HighAssemblyInstructions.OR: self._ALU_instruction(TargetAssemblyInstructions.ORI, TargetAssemblyInstructions.OR),
+            HighAssemblyInstructions.XOR: self._ALU_instruction(TargetAssemblyInstructions.XORI, TargetAssemblyInstructions.XOR),
+            HighAssemblyInstructions.SHL: self._ALU_instruction(TargetAssemblyInstructions.SHLI, TargetAssemblyInstructions.SHL),
+            HighAssemblyInstructions.SHR: self._ALU_instruction(TargetAssemblyInstructions.SHRI, TargetAssemblyInstructions.SHR),
+            HighAssemblyInstructions.ROR: self._ALU_instruction(TargetAssemblyInstructions.CSHLI, TargetAssemblyInstructions.CSHL),
+            HighAssemblyInstructions.ROL: self._ALU_instruction(TargetAssemblyInstructions.CSHRI, TargetAssemblyInstructions.CSHR),
+            HighAssemblyInstructions.CALL: { (OperandTypes.IDENTIFIER,): self.handle_call },
+            HighAssemblyInstructions.RET: {
+                (OperandTypes.CONSTANT,): self.handle_return,
+                (): self.handle_return_without_value,
+            },
+            HighAssemblyInstructions.RETI: {
+                (OperandTypes.CONSTANT,): self.handle_interrupt_return,
+                (): self.handle_interrupt_return_without_value,
+            },
+            HighAssemblyInstructions.JMP: { (OperandTypes.IDENTIFIER,): self.handle_jump },
+            HighAssemblyInstructions.JZ: { (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER): self.handle_jump_if_zero },
+            HighAssemblyInstructions.JNZ: { (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER): self.handle_jump_if_not_zero },
+            HighAssemblyInstructions.EQ: self._ALU_instruction(TargetAssemblyInstructions.SEQI, TargetAssemblyInstructions.SEQ),
+            HighAssemblyInstructions.NEQ: self._ALU_instruction(TargetAssemblyInstructions.SNEI, TargetAssemblyInstructions.SNE),
+            HighAssemblyInstructions.LT: self._ALU_instruction(TargetAssemblyInstructions.SLTI, TargetAssemblyInstructions.SLT),
+            HighAssemblyInstructions.GT: self._ALU_instruction(TargetAssemblyInstructions.SGTI, TargetAssemblyInstructions.SGT),
+            HighAssemblyInstructions.LTE: self._ALU_instruction(TargetAssemblyInstructions.SLEI, TargetAssemblyInstructions.SLE),
+            HighAssemblyInstructions.GTE: self._ALU_instruction(TargetAssemblyInstructions.SGRI, TargetAssemblyInstructions.SGR),
+            HighAssemblyInstructions.NOT: {
+                (OperandTypes.IDENTIFIER, OperandTypes.CONSTANT): self.handle_constant_not,
+                (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER): self.handle_register_not,
+            },
+            HighAssemblyInstructions.NEG: {
+                (OperandTypes.IDENTIFIER, OperandTypes.CONSTANT): self.handle_constant_negate,
+                (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER): self.handle_register_negate,
+            },
+            HighAssemblyInstructions.IN: { (OperandTypes.IDENTIFIER, OperandTypes.CONSTANT): self.handle_input },
+            HighAssemblyInstructions.OUT: { (OperandTypes.IDENTIFIER, OperandTypes.CONSTANT): self.handle_output },
+            HighAssemblyInstructions.ENI: { (): self.handle_enable_interrupts },
+            HighAssemblyInstructions.DEI: { (): self.handle_disable_interrupts },
+            HighAssemblyInstructions.SISA: { (OperandTypes.CONSTANT, OperandTypes.IDENTIFIER): self.handle_set_interrupt_routine },
+            HighAssemblyInstructions.EOF: { (): self.handle_end_of_function },
+            HighAssemblyDirectives.LABEL: { (OperandTypes.IDENTIFIER,): self.handle_label },
+            HighAssemblyDirectives.GLOBAL_VARIABLE: { (OperandTypes.IDENTIFIER, OperandTypes.CONSTANT): self.handle_global_variable },
+            HighAssemblyDirectives.FUNCTION_LABEL: { (OperandTypes.IDENTIFIER,): self.handle_function_label },
+            HighAssemblyDirectives.FUNCTION_LABEL_WITHOUT_STACK_FRAME: { (OperandTypes.IDENTIFIER,): self.handle_function_label_without_stack },
+            HighAssemblyDirectives.COMMENT: { (): self.handle_line_comment },
         }
         self.register_definitions = register_definitions
 
-    def generate(self):
+    def generate(self, time_report: TimeReport = TimeReport(enabled=False)):
+        self.generate_header()
+        if time_report.enabled:
+            self.translate_functions(self.source_code, time_report)
+        else:
+            self.translate(self.source_code)
+        self.generate_footer()
+
+    def generate_header(self):
         for key, value in self.register_definitions.items():
             self.writer.raw(f'{TargetAssemblyHelpers.DEFINE_PREFIX} {key} "{value}"', 'register definitions')
         self.writer.new_line()
 
-        for line in self.source_code:
-            match = re.match(self.regex, line, re.IGNORECASE)
-            for i, handler in self.group_dict.items():
-                if match.groups()[i]:
-                    handler(match.groups()[i + 1:])
-        
+    def translate(self, instructions: list[Instruction]):
+        self.instructions = instructions
+        for self.position, instruction in enumerate(instructions):
+            self._translate_instruction(instruction)
+
+    def translate_functions(self, instructions: list[Instruction], time_report: TimeReport):
+        # translates the code split at function labels, so each function is measured separately
+        starts = [i for i, instruction in enumerate(instructions) if instruction.opcode in FUNCTION_LABELS]
+        for start, end in zip([0] + starts, starts + [len(instructions)]):
+            if start == end:
+                continue
+            function_name = instructions[start].operands[0] if instructions[start].opcode in FUNCTION_LABELS else "(global code)"
+            number_of_lines = len(self.writer.buffer)
+            with time_report.function(function_name, "target assembly"):
+                self.translate(instructions[start:end])
+            time_report.count_function(function_name, "target assembly", lines=len(self.writer.buffer) - number_of_lines)
+
+    def generate_footer(self):
         if not self.first_function:
             self.writer.raw(f"{TargetAssemblyHelpers.SCOPE_CLOSE}")
         self.writer.raw(
@@ -157,166 +147,204 @@ idle:
 """            
         )
     
-    def handle_global_variable(self, matches: tuple[str]):
-        self.writer.raw(f"{TargetAssemblyHelpers.DATA_LABEL} {matches[0]} {TargetAssemblyHelpers.SCOPE_OPEN}")
-        self.writer.instruction(f"{TargetAssemblyHelpers.CONSTANT_PREFIX}{matches[1]}", matches[3])
+    def handle_global_variable(self, operands: tuple, comment: str):
+        self.writer.raw(f"{TargetAssemblyHelpers.DATA_LABEL} {operands[0]} {TargetAssemblyHelpers.SCOPE_OPEN}")
+        self.writer.instruction(f"{TargetAssemblyHelpers.CONSTANT_PREFIX}{operands[1]}", comment)
         self.writer.raw(f"{TargetAssemblyHelpers.SCOPE_CLOSE}")
 
-    def handle_function_label(self, matches: tuple[str]):
+    def handle_function_label(self, operands: tuple, comment: str):
         if self.first_function:
-            self._function_call(matches)
+            self._function_call(operands, comment)
             self.first_function = False
         else:
             self.writer.raw(f"{TargetAssemblyHelpers.SCOPE_CLOSE}")
-            self._function_call(matches)
+            self._function_call(operands, comment)
     
-    def handle_variable_push(self, matches: tuple[str]):
+    def handle_variable_push(self, operands: tuple, comment: str):
         self.writer.instruction(f"{TargetAssemblyInstructions.SUBI} {TargetAssemblyRegisters.ESP}, #1", "increase stack size for a variable")
-        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map[matches[0]]}, {TargetAssemblyRegisters.ESP}, #0", matches[2])
+        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map[operands[0]]}, {TargetAssemblyRegisters.ESP}, #0", comment)
     
-    def handle_constant_push(self, matches: tuple[str]):
+    def handle_constant_push(self, operands: tuple, comment: str):
         self.writer.instruction(f"{TargetAssemblyInstructions.SUBI} {TargetAssemblyRegisters.ESP}, #1", "increase stack size for a constant")
-        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {self.register_map['edx']}, {TargetAssemblyHelpers.CONSTANT_PREFIX}{matches[0]}", f"edx = {matches[0]}")
-        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map['edx']}, {TargetAssemblyRegisters.ESP}, #0", f"push {matches[0]} loaded to edx")
+        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {self.register_map['edx']}, {TargetAssemblyHelpers.CONSTANT_PREFIX}{operands[0]}", f"edx = {operands[0]}")
+        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map['edx']}, {TargetAssemblyRegisters.ESP}, #0", f"push {operands[0]} loaded to edx")
     
-    def handle_pop(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {self.register_map[matches[0]]}, {TargetAssemblyRegisters.ESP}, #0", matches[2])
+    def handle_pop(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {self.register_map[operands[0]]}, {TargetAssemblyRegisters.ESP}, #0", comment)
         self.writer.instruction(f"{TargetAssemblyInstructions.ADDI} {TargetAssemblyRegisters.ESP}, #1", "clear a variable from the stack")
     
-    def handle_pusha(self, matches: tuple[str]):
-        self.writer.comment(matches[2])
-        self.writer.instruction(f"{TargetAssemblyInstructions.SUBI} {TargetAssemblyRegisters.ESP}, #3", "stack frame, increase stack size to store general purpose registers")
-        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {TargetAssemblyRegisters.R1}, {TargetAssemblyRegisters.ESP}, #0", "stack frame, store r1")
-        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {TargetAssemblyRegisters.R2}, {TargetAssemblyRegisters.ESP}, #1", "stack frame, store r2")
-        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {TargetAssemblyRegisters.R3}, {TargetAssemblyRegisters.ESP}, #2", "stack frame, store r3")
+    def handle_pusha(self, operands: tuple, comment: str):
+        # without operands all general purpose registers are saved, the first one at the top of the stack
+        registers = operands or GENERAL_PURPOSE_REGISTERS
+        self.writer.instruction(f"{TargetAssemblyInstructions.SUBI} {TargetAssemblyRegisters.ESP}, #{len(registers)}", "stack frame, increase stack size to store general purpose registers")
+        for i, register in enumerate(registers):
+            self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map[register]}, {TargetAssemblyRegisters.ESP}, #{i}", f"stack frame, store {register}")
 
-    def handle_popa(self, matches: tuple[str]):
-        self.writer.comment(matches[2])
-        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {TargetAssemblyRegisters.R3}, {TargetAssemblyRegisters.ESP}, #2", "stack frame, restore r3")
-        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {TargetAssemblyRegisters.R2}, {TargetAssemblyRegisters.ESP}, #1", "stack frame, restore r2")
-        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {TargetAssemblyRegisters.R1}, {TargetAssemblyRegisters.ESP}, #0", "stack frame, restore r1")
-        self.writer.instruction(f"{TargetAssemblyInstructions.ADDI} {TargetAssemblyRegisters.ESP}, #3", "stack frame, clear stack from general purpose registers")
+    def handle_popa(self, operands: tuple, comment: str):
+        # the operands are in the reversed order of PUSHA
+        registers = operands or GENERAL_PURPOSE_REGISTERS[::-1]
+        for i, register in enumerate(registers):
+            self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {self.register_map[register]}, {TargetAssemblyRegisters.ESP}, #{len(registers) - 1 - i}", f"stack frame, restore {register}")
+        self.writer.instruction(f"{TargetAssemblyInstructions.ADDI} {TargetAssemblyRegisters.ESP}, #{len(registers)}", "stack frame, clear stack from general purpose registers")
 
-    def handle_memory_load(self, matches: tuple[str]):
-        matches = list(matches[:6])
-        matches[2] = matches[2] if matches[2] == '-' else ''
-        matches[3] = matches[3] if matches[3] else 0
-        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {self.register_map[matches[0]]}, {self.register_map[matches[1]]}, #{matches[2]}{matches[3]}", matches[5])
+    def handle_memory_load(self, operands: tuple, comment: str):
+        memory = operands[1]
+        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {self.register_map[operands[0]]}, {self.register_map[memory.register]}, #{memory.offset or 0}", comment)
 
-    def handle_global_variable_load(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {self.register_map[matches[0]]}, {TargetAssemblyRegisters.R0}, *d*{matches[1]}", matches[3])
+    def handle_global_variable_load(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {self.register_map[operands[0]]}, {TargetAssemblyRegisters.R0}, *d*{operands[1].name}", comment)
 
-    def handle_constant_move(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {self.register_map[matches[0]]}, #{matches[1]}", matches[3])
+    def handle_constant_move(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {self.register_map[operands[0]]}, #{operands[1]}", comment)
 
-    def handle_register_move(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.MOV} {self.register_map[matches[1]]}, {self.register_map[matches[0]]}", matches[3])
+    def handle_register_move(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.MOV} {self.register_map[operands[1]]}, {self.register_map[operands[0]]}", comment)
 
-    def handle_memory_store(self, matches: tuple[str]):
-        matches = list(matches[:6])
-        matches[1] = matches[1] if matches[1] == '-' else ''
-        matches[2] = matches[2] if matches[2] else 0
-        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map[matches[3]]}, {self.register_map[matches[0]]}, #{matches[1] if matches[1] == '-' else ''}{matches[2]}", matches[5])
+    def handle_memory_store(self, operands: tuple, comment: str):
+        memory = operands[0]
+        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map[operands[1]]}, {self.register_map[memory.register]}, #{memory.offset or 0}", comment)
 
-    def handle_global_variable_store(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map[matches[1]]}, {TargetAssemblyRegisters.R0}, *d*{matches[0]}", matches[3])
+    def handle_global_variable_store(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {self.register_map[operands[1]]}, {TargetAssemblyRegisters.R0}, *d*{operands[0].name}", comment)
     
-    def handle_constant_store(self, matches: tuple[str]):
-        matches = list(matches[:6])
-        matches[1] = matches[1] if matches[1] == '-' else ''
-        matches[2] = matches[2] if matches[2] else 0
-        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {TargetAssemblyRegisters.EDX}, #{matches[3]}", f"edx = {matches[3]}")
-        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {TargetAssemblyRegisters.EDX}, {self.register_map[matches[0]]}, #{matches[1]}{matches[2]}", f"store {matches[3]} loaded to edx")
+    def handle_constant_store(self, operands: tuple, comment: str):
+        memory = operands[0]
+        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {TargetAssemblyRegisters.EDX}, #{operands[1]}", f"edx = {operands[1]}")
+        self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {TargetAssemblyRegisters.EDX}, {self.register_map[memory.register]}, #{memory.offset or 0}", f"store {operands[1]} loaded to edx")
 
-    def handle_call(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.JAL} {TargetAssemblyRegisters.EDX}, *{matches[0]}", matches[2])
+    def handle_call(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.JAL} {TargetAssemblyRegisters.EDX}, *{operands[0]}", comment)
     
-    def handle_return(self, matches: tuple[str]):
-        cleared_words = int(matches[0]) + 1
+    def handle_return(self, operands: tuple, comment: str):
+        cleared_words = operands[0] + 1
         self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {TargetAssemblyRegisters.EDX}, {TargetAssemblyRegisters.ESP}, #0", "return value, load return value from stack")
         self.writer.instruction(f"{TargetAssemblyInstructions.ADDI} {TargetAssemblyRegisters.ESP}, #{cleared_words}", f"decrease stack size by the number of parameters + the return value")
-        self.writer.instruction(f"{TargetAssemblyInstructions.JREG} {TargetAssemblyRegisters.EDX}", matches[2])
+        self.writer.instruction(f"{TargetAssemblyInstructions.JREG} {TargetAssemblyRegisters.EDX}", comment)
     
-    def handle_return_without_value(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.JREG} {TargetAssemblyRegisters.EDX}", matches[1])
+    def handle_return_without_value(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.JREG} {TargetAssemblyRegisters.EDX}", comment)
     
-    def handle_interrupt_return(self, matches: tuple[str]):
-        cleared_words = int(matches[0]) + 1
+    def handle_interrupt_return(self, operands: tuple, comment: str):
+        cleared_words = operands[0] + 1
         self.writer.instruction(f"{TargetAssemblyInstructions.LOAD} {TargetAssemblyRegisters.EDX}, {TargetAssemblyRegisters.ESP}, #0", "return value, load return value from stack")
         self.writer.instruction(f"{TargetAssemblyInstructions.ADDI} {TargetAssemblyRegisters.ESP}, #{cleared_words}", f"decrease stack size by the number of parameters + the return value")
-        self.writer.instruction(f"{TargetAssemblyInstructions.RETI} {TargetAssemblyRegisters.EDX}", matches[2])
+        self.writer.instruction(f"{TargetAssemblyInstructions.RETI} {TargetAssemblyRegisters.EDX}", comment)
     
-    def handle_interrupt_return_without_value(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.RETI}", matches[1])
+    def handle_interrupt_return_without_value(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.RETI}", comment)
     
-    def handle_jump(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.JMP} #{matches[0].replace('.', '__')}", matches[2])
+    def handle_jump(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.JMP} #{operands[0].replace('.', '__')}", comment)
     
-    def handle_jump_if_zero(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.BEQZ} {self.register_map[matches[0]]}, #{matches[1].replace('.', '__')}", matches[3])
+    def handle_jump_if_zero(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.BEQZ} {self.register_map[operands[0]]}, #{operands[1].replace('.', '__')}", comment)
     
-    def handle_jump_if_not_zero(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.BNEZ} {self.register_map[matches[0]]}, #{matches[1].replace('.', '__')}", matches[3])
+    def handle_jump_if_not_zero(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.BNEZ} {self.register_map[operands[0]]}, #{operands[1].replace('.', '__')}", comment)
 
-    def handle_jump_if_overflow(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.BOV} #{matches[0]}", matches[2])
+    def handle_jump_if_overflow(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.BOV} #{operands[0]}", comment)
     
-    def handle_label(self, matches: tuple[str]):
-        self.writer.label(matches[0].replace('.', '__'), matches[2])
+    def handle_label(self, operands: tuple, comment: str):
+        self.writer.label(operands[0].replace('.', '__'), comment)
 
-    def handle_constant_not(self, matches: tuple[str]):
-        not_value = (~int(matches[1])) & 0xFFFF # limit to 16 bit
-        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {self.register_map[matches[0]]}, #{not_value}", matches[3])
+    def handle_constant_not(self, operands: tuple, comment: str):
+        not_value = (~operands[1]) & 0xFFFF # limit to 16 bit
+        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {self.register_map[operands[0]]}, #{not_value}", comment)
 
-    def handle_register_not(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.XORI} {self.register_map[matches[0]]}, {self.register_map[matches[1]]}, #-1", matches[3])
+    def handle_register_not(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.XORI} {self.register_map[operands[0]]}, {self.register_map[operands[1]]}, #-1", comment)
 
-    def handle_constant_negate(self, matches: tuple[str]):
-        negate_value = (-int(matches[1])) & 0xFFFF # limit to 16 bit
-        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {self.register_map[matches[0]]}, #{negate_value}", matches[3])
+    def handle_constant_negate(self, operands: tuple, comment: str):
+        negate_value = (-operands[1]) & 0xFFFF # limit to 16 bit
+        self.writer.instruction(f"{TargetAssemblyInstructions.LDI} {self.register_map[operands[0]]}, #{negate_value}", comment)
 
-    def handle_register_negate(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.XORI} {self.register_map[matches[0]]}, {self.register_map[matches[1]]}, #-1", f"{matches[3]} part 1")
-        self.writer.instruction(f"{TargetAssemblyInstructions.SUBI} {self.register_map[matches[0]]}, {self.register_map[matches[1]]}, #1", f"{matches[3]} part 2")
+    def handle_register_negate(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.XORI} {self.register_map[operands[0]]}, {self.register_map[operands[1]]}, #-1", f"{comment} part 1")
+        self.writer.instruction(f"{TargetAssemblyInstructions.SUBI} {self.register_map[operands[0]]}, {self.register_map[operands[1]]}, #1", f"{comment} part 2")
     
-    def handle_input(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.IN} {self.register_map[matches[0]]}, #{matches[1]}", matches[3])
+    def handle_constant_multiply(self, operands: tuple, comment: str):
+        # multiplication by a constant is replaced by shifts, additions and subtractions, when they take less cycles than the multiplier
+        product, register, constant = operands
+        sequence = None
+        if self.strength_reduction:
+            sequence = multiplication_sequence(constant, copy=product == register)
+            if sequence and sequence[0][0] == TargetAssemblyInstructions.MOV and product == register: # a copy of the multiplied register is needed
+                register = next((scratch for scratch in SCRATCH_REGISTERS if scratch != product and is_dead(scratch, self.instructions, self.position + 1)), None)
+                sequence = sequence if register else None
+        if sequence is None:
+            self._handle_constant_ALU_instruction(operands, comment, TargetAssemblyInstructions.MULI)
+            return
+
+        product, multiplied = self.register_map[product], self.register_map[operands[1]]
+        computed = False # whether the product register holds a partial product
+        for i, (instruction, operand) in enumerate(sequence):
+            part_comment = comment if len(sequence) == 1 or not comment else f"{comment} part {i + 1}"
+            if instruction == TargetAssemblyInstructions.MOV and len(sequence) > 1: # copy to the scratch register
+                self.writer.instruction(f"{instruction} {multiplied}, {self.register_map[register]}", part_comment)
+                multiplied = self.register_map[register]
+            elif instruction == TargetAssemblyInstructions.MOV:
+                self.writer.instruction(f"{instruction} {multiplied}, {product}", part_comment)
+            elif instruction == TargetAssemblyInstructions.LDI:
+                self.writer.instruction(f"{instruction} {product}, #{operand}", part_comment)
+            elif instruction == TargetAssemblyInstructions.SHLI:
+                self.writer.instruction(f"{instruction} {product}, {product if computed else multiplied}, #{operand}", part_comment)
+                computed = True
+            else:
+                self.writer.instruction(f"{instruction} {product}, {product}, {multiplied}", part_comment)
+
+    def handle_input(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.IN} {self.register_map[operands[0]]}, #{operands[1]}", comment)
     
-    def handle_output(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.OUT} {self.register_map[matches[0]]}, #{matches[1]}", matches[3])
+    def handle_output(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.OUT} {self.register_map[operands[0]]}, #{operands[1]}", comment)
     
-    def handle_function_label_without_stack(self, matches: tuple[str]):
+    def handle_function_label_without_stack(self, operands: tuple, comment: str):
         if self.first_function:
-            self.writer.raw(f"{TargetAssemblyHelpers.CODE_LABEL} {matches[0]} {TargetAssemblyHelpers.SCOPE_OPEN}", matches[2])
+            self.writer.raw(f"{TargetAssemblyHelpers.CODE_LABEL} {operands[0]} {TargetAssemblyHelpers.SCOPE_OPEN}", comment)
             self.first_function = False
         else:
             self.writer.raw(f"{TargetAssemblyHelpers.SCOPE_CLOSE}")
-            self.writer.raw(f"{TargetAssemblyHelpers.CODE_LABEL} {matches[0]} {TargetAssemblyHelpers.SCOPE_OPEN}", matches[2])
+            self.writer.raw(f"{TargetAssemblyHelpers.CODE_LABEL} {operands[0]} {TargetAssemblyHelpers.SCOPE_OPEN}", comment)
 
-    def handle_line_comment(self, matches: tuple[str]):
-        self.writer.comment(matches[1])
+    def handle_line_comment(self, operands: tuple, comment: str):
+        self.writer.comment(comment)
 
-    def handle_end_of_function(self, matches: tuple[str]):
-        self.writer.raw(f"@}} {matches[0] if matches[0] else ''}\n")
+    def handle_end_of_function(self, operands: tuple, comment: str):
+        self.writer.raw(f"@}} {'; ' + comment if comment is not None and self.writer.comments else ''}\n")
         self.first_function = True
     
-    def handle_enable_interrupts(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.ENI}", matches[1])
+    def handle_enable_interrupts(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.ENI}", comment)
     
-    def handle_disable_interrupts(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.DEI}", matches[1])
+    def handle_disable_interrupts(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.DEI}", comment)
 
-    def handle_set_interrupt_routine(self, matches: tuple[str]):
-        self.writer.instruction(f"{TargetAssemblyInstructions.SISA} #{matches[0]}, *{matches[1]}", matches[3])
+    def handle_set_interrupt_routine(self, operands: tuple, comment: str):
+        self.writer.instruction(f"{TargetAssemblyInstructions.SISA} #{operands[0]}, *{operands[1]}", comment)
     
-    def _handle_constant_ALU_instruction(self, matches: tuple[str], instruction: TargetAssemblyInstructions):
-        self.writer.instruction(f"{instruction} {self.register_map[matches[0]]}, {self.register_map[matches[1]]}, #{matches[2]}", matches[4])
+    def _handle_constant_ALU_instruction(self, operands: tuple, comment: str, instruction: TargetAssemblyInstructions):
+        self.writer.instruction(f"{instruction} {self.register_map[operands[0]]}, {self.register_map[operands[1]]}, #{operands[2]}", comment)
     
-    def _handle_register_ALU_instruction(self, matches: tuple[str], instruction: TargetAssemblyInstructions):
-        self.writer.instruction(f"{instruction} {self.register_map[matches[0]]}, {self.register_map[matches[1]]}, {self.register_map[matches[2]]}", matches[4])
+    def _handle_register_ALU_instruction(self, operands: tuple, comment: str, instruction: TargetAssemblyInstructions):
+        self.writer.instruction(f"{instruction} {self.register_map[operands[0]]}, {self.register_map[operands[1]]}, {self.register_map[operands[2]]}", comment)
 
-    def _function_call(self, matches: tuple[str]):
-        self.writer.raw(f"{TargetAssemblyHelpers.CODE_LABEL} {matches[0]} {TargetAssemblyHelpers.SCOPE_OPEN}", matches[2])
+    def _ALU_instruction(self, constant_instruction: TargetAssemblyInstructions, 
+                         register_instruction: TargetAssemblyInstructions) -> dict[tuple[OperandTypes, ...], Callable[[tuple, str], None]]:
+        return {
+            (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER, OperandTypes.CONSTANT): 
+                lambda operands, comment: self._handle_constant_ALU_instruction(operands, comment, constant_instruction),
+            (OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER, OperandTypes.IDENTIFIER): 
+                lambda operands, comment: self._handle_register_ALU_instruction(operands, comment, register_instruction),
+        }
+
+    def _function_call(self, operands: tuple, comment: str):
+        self.writer.raw(f"{TargetAssemblyHelpers.CODE_LABEL} {operands[0]} {TargetAssemblyHelpers.SCOPE_OPEN}", comment)
         self.writer.instruction(f"{TargetAssemblyInstructions.SUBI} {TargetAssemblyRegisters.ESP}, #1", "return value, increase stack size to store the return value")
         self.writer.instruction(f"{TargetAssemblyInstructions.STORE} {TargetAssemblyRegisters.EDX}, {TargetAssemblyRegisters.ESP}, #0", "return value, store return address")
-        
\ No newline at end of file
+
+    def _translate_instruction(self, instruction: Instruction):
+        handler = self.instruction_table[instruction.opcode].get(instruction.operand_types())
+        if handler is None:
+            raise Exception(f"Unknown high assembly instruction '{instruction}'.")
+        handler(instruction.operands, instruction.comment)
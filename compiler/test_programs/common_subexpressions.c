@@ -0,0 +1,51 @@
+int scale = 3;
+
+int bump()
+{
+    scale = scale + 1;
+    return scale;
+}
+
+int area(int w, int h)
+{
+    int inner = (w - 2) * (h - 2) + w;
+    int outer = (w - 2) * (h - 2) + h;
+    return inner * 100 + outer;
+}
+
+// computations repeated in a basic block are computed once with and without -ncs, prints 2222 63 37 24 18 23
+int main()
+{
+    int a = 4;
+    int b = 5;
+    putnum(area(a + 2, b + 1));
+    putchar(' ');
+
+    int x = (a + b) * scale + 9;
+    int y = (a + b) * scale;
+    putnum(x + y);
+    putchar(' ');
+
+    x = a * scale + b;
+    bump();
+    y = a * scale + b;
+    putnum(x + y - 1);
+    putchar(' ');
+
+    x = a * b + a;
+    a = 6;
+    y = a * b + a;
+    putnum(x + y - 36);
+    putchar(' ');
+
+    int values[2];
+    values[1] = b;
+    x = values[1] * 2 + a;
+    values[1] = 9;
+    y = values[1] * 2 + a;
+    putnum(x + y - 22);
+    putchar(' ');
+    putnum(y - 1);
+    putchar('\n');
+    return 0;
+}
@@ -0,0 +1,31 @@
+int zero = 0;
+int one = 1;
+int five = 5;
+int thirty_one = 31;
+
+int show(int folded, int propagated, int computed)
+{
+    putnum(folded);
+    putchar(' ');
+    putnum(propagated);
+    putchar(' ');
+    putnum(computed);
+    putchar('\n');
+    return 0;
+}
+
+// each line shows the same value folded at compile time, folded from propagated local variables and computed at runtime
+int main()
+{
+    int local_zero = 0;
+    int local_one = 1;
+    int local_five = 5;
+
+    show(1 >>> 31, local_one >>> 31, one >>> thirty_one);
+    show(64 <<< 30, (local_one << 6) <<< 30, (one << 6) <<< thirty_one - 1);
+    show(5 << 33, local_five << 33, five << thirty_one + 2);
+    show((0 - 5) >> 28, (local_zero - local_five) >> 28, (zero - five) >> 28);
+    show((0 - 5) < 1, (local_zero - local_five) < local_one, (zero - five) < one);
+    show((9 - 7) * 3 + (~0 & 15), (local_five + 4 - 7) * 3 + (~local_zero & 15), (five + 4 - 7) * 3 + (~zero & 15));
+    return 0;
+}
@@ -0,0 +1,49 @@
+int ga = 3;
+int gb = 7;
+int calls = 0;
+
+int f(int x)
+{
+    if (x < 1)
+    {
+        return 40;
+    }
+    return f(x - 1) + 1;
+}
+
+int next(int x)
+{
+    calls = calls + 1;
+    return x + 1;
+}
+
+// global variables assigned the values of calls, which may change them, prints 41 5 5 43 7 46
+int main()
+{
+    ga = gb;
+    ga = f(1);
+    putnum(ga);
+    putchar(' ');
+
+    int i = 0;
+    while (i < 5)
+    {
+        gb = ga;
+        gb = next(i);
+        i = gb;
+    }
+    putnum(gb);
+    putchar(' ');
+    putnum(calls);
+    putchar(' ');
+
+    gb = next(ga) + next(0);
+    putnum(gb);
+    putchar(' ');
+    putnum(calls);
+    putchar(' ');
+    ga = ga + next(4);
+    putnum(ga);
+    putchar('\n');
+    return 0;
+}
@@ -0,0 +1,78 @@
+int total = 0;
+
+int square(int x)
+{
+    return x * x;
+}
+
+int add_to_total(int x)
+{
+    total = total + x;
+    return total;
+}
+
+int clamp(int x, int low, int high)
+{
+    if (x < low)
+    {
+        return low;
+    }
+    if (x > high)
+    {
+        return high;
+    }
+    return x;
+}
+
+int twice(int x)
+{
+    x = x + x;
+    return x;
+}
+
+int sum_of_squares(int n)
+{
+    int sum = 0;
+    int i = 1;
+    while (i <= n)
+    {
+        int s = square(i);
+        sum = sum + s;
+        i = i + 1;
+    }
+    return sum;
+}
+
+// calls of small functions, which are inlined by default, prints 55 9 0 10 16 18 36
+int main()
+{
+    int x = 3;
+    int y = sum_of_squares(5);
+    putnum(y);
+    putchar(' ');
+    y = square(x);
+    putnum(y);
+    putchar(' ');
+    y = clamp(x - 5, 0, 10);
+    putnum(y);
+    putchar(' ');
+    y = clamp(y + square(x) + 7, 0, 10);
+    putnum(y);
+    putchar(' ');
+    int i = 0;
+    while (i < 4)
+    {
+        add_to_total(i);
+        i = i + 1;
+    }
+    putnum(add_to_total(total + 4));
+    putchar(' ');
+    y = twice(twice(x)) + x * 2;
+    putnum(y);
+    putchar(' ');
+    y = twice(x);
+    y = square(y);
+    putnum(y);
+    putchar('\n');
+    return 0;
+}
@@ -0,0 +1,72 @@
+int limit = 3;
+int step = 2;
+
+int grow()
+{
+    step = step + 1;
+    return step;
+}
+
+int nested(int x, int y)
+{
+    int sum = 0;
+    int i = 0;
+    while (i < 3)
+    {
+        int j = 0;
+        while (j < x + y)
+        {
+            sum = sum + (x * y) + (i * y) + j;
+            j = j + 1;
+        }
+        i = i + 1;
+    }
+    return sum;
+}
+
+// computations, which do not change in the loops, are computed once before them with and without -nli, prints 84 20 18 8 165
+int main()
+{
+    int a = 5;
+    int b = 6;
+    int total = 0;
+    for (int i = a - 4; i <= a + b - 8; i = i + 1)
+    {
+        total = total + a * b - i;
+    }
+    putnum(total);
+    putchar(' ');
+
+    int i = 0;
+    total = 0;
+    while (i < limit + 1)
+    {
+        total = total + step + limit;
+        i = i + 1;
+    }
+    putnum(total);
+    putchar(' ');
+
+    i = 0;
+    total = 0;
+    while (i < limit)
+    {
+        total = total + step * 2;
+        grow();
+        i = i + 1;
+    }
+    putnum(total);
+    putchar(' ');
+
+    i = 0;
+    while (i < 4 && a + b > 10)
+    {
+        a = a - 1;
+        i = i + 1;
+    }
+    putnum(a * 2);
+    putchar(' ');
+    putnum(nested(2, 3));
+    putchar('\n');
+    return 0;
+}
@@ -0,0 +1,70 @@
+int truth(int a, int b)
+{
+    int r = 0;
+    int i = 0;
+    while (i < 2)
+    {
+        if (a == b + i || a + b + i == 3 && !(a == 0))
+        {
+            r = r + 2;
+        }
+        else
+        {
+            r = r + 1;
+        }
+        i = i + 1;
+    }
+    return r;
+}
+
+int values(int x, int y)
+{
+    int not_x = !x;
+    int and = x && y;
+    int or = x || !y;
+    int count = 0;
+    if (!x == 0)
+    {
+        count = count + 1;
+    }
+    if (not_x == 0)
+    {
+        count = count + 1;
+    }
+    if (x && y)
+    {
+        count = count + 1;
+    }
+    if (and)
+    {
+        count = count + 1;
+    }
+    if (!(x || !y) == !or)
+    {
+        count = count + 1;
+    }
+    return count * 1000 + not_x * 100 + and * 10 + or;
+}
+
+// conditions and values of '!', '&&' and '||' are 0 or 1 with and without -nsc, prints 23 34 43 33 and 1101 3001 1100 5011
+int main()
+{
+    int a = 0;
+    while (a < 4)
+    {
+        putnum(truth(a, 3 - a));
+        putnum(truth(a, a));
+        putchar(' ');
+        a = a + 1;
+    }
+    putchar('\n');
+    putnum(values(0, 0));
+    putchar(' ');
+    putnum(values(2, 0));
+    putchar(' ');
+    putnum(values(0, 5));
+    putchar(' ');
+    putnum(values(2, 5));
+    putchar('\n');
+    return 0;
+}
@@ -0,0 +1,160 @@
+import contextlib
+import json
+import time
+import tracemalloc
+from typing import Iterable, Iterator
+
+class Measurement():
+    def __init__(self):
+        self.time = 0.0         # wall time in seconds
+        self.peak_memory = 0    # peak of the memory allocated by Python in bytes
+        self.counts: dict[str, int] = {}
+
+    def add(self, time: float, peak_memory: int):
+        self.time += time
+        self.peak_memory = max(self.peak_memory, peak_memory)
+
+    def count(self, **counts: int):
+        for name, count in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + count
+
+    def as_dict(self) -> dict:
+        return {"time": self.time, "peak_memory": self.peak_memory, **self.counts}
+
+class TimeReport():
+    # wall time, peak allocated memory and counts of tokens/instructions of the phases of a compilation and of each function,
+    # when disabled the phases are a shared empty context and the iterables are not wrapped, so the compilation is not slowed down
+    def __init__(self, enabled: bool = True, trace_memory: bool = True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory # tracing of the allocations slows the compilation down
+        self.total = Measurement()
+        self.phases: dict[str, Measurement] = {}
+        self.functions: dict[str, dict[str, Measurement]] = {}
+        self._running: list[list] = [] # [time of nested phases, peak memory] of the phases being measured
+        self._start = 0.0
+        self._tracing = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exception):
+        self.stop()
+
+    def start(self):
+        if self.enabled:
+            self._tracing = self.trace_memory and not tracemalloc.is_tracing()
+            if self._tracing:
+                tracemalloc.start()
+            self._reset_peak_memory()
+            self._start = time.perf_counter()
+
+    def stop(self):
+        if self.enabled:
+            self.total.add(time.perf_counter() - self._start, self._peak_memory())
+            for measurement in self.phases.values():
+                self.total.peak_memory = max(self.total.peak_memory, measurement.peak_memory)
+            if self._tracing:
+                tracemalloc.stop()
+
+    def phase(self, name: str) -> contextlib.AbstractContextManager:
+        # time of a phase excludes the time of phases nested in it, e.g. scanning in parsing
+        if not self.enabled:
+            return _DISABLED
+        return self._measure(self.phases.setdefault(name, Measurement()), exclusive=True)
+
+    def function(self, function_name: str, phase: str) -> contextlib.AbstractContextManager:
+        # a part of a phase spent on one function, it is included in the time of the phase
+        if not self.enabled:
+            return _DISABLED
+        return self._measure(self.functions.setdefault(function_name, {}).setdefault(phase, Measurement()), exclusive=False)
+
+    def iterate(self, phase: str, iterable: Iterable, unit: str) -> Iterable:
+        # measures the production of the items of the iterable, e.g. tokens of the scanner consumed by the parser
+        if not self.enabled:
+            return iterable
+        return self._iterate(phase, iterable, unit)
+
+    def count(self, phase: str, **counts: int):
+        if self.enabled:
+            self.phases.setdefault(phase, Measurement()).count(**counts)
+
+    def count_function(self, function_name: str, phase: str, **counts: int):
+        if self.enabled:
+            self.functions.setdefault(function_name, {}).setdefault(phase, Measurement()).count(**counts)
+
+    def as_dict(self) -> dict:
+        return {"total": self.total.as_dict(),
+                "phases": {name: measurement.as_dict() for name, measurement in self.phases.items()},
+                "functions": {function_name: {phase: measurement.as_dict() for phase, measurement in phases.items()}
+                              for function_name, phases in self.functions.items()}}
+
+    def json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def table(self) -> str:
+        lines = [f"{'Phase':<24} {'Time [ms]':>10} {'Share':>7} {'Peak memory [KiB]':>18}  Counts"]
+        for name, measurement in list(self.phases.items()) + [("total", self.total)]:
+            share = measurement.time / self.total.time * 100 if self.total.time else 0
+            lines.append(f"{name:<24} {measurement.time * 1000:>10.2f} {share:>6.1f}% {measurement.peak_memory / 1024:>18.1f}  {_counts(measurement)}")
+        if self.functions:
+            lines += ["", f"{'Function':<24} {'Phase':<16} {'Time [ms]':>10} {'Peak memory [KiB]':>18}  Counts"]
+            function_time = lambda item: sum(measurement.time for measurement in item[1].values())
+            for function_name, phases in sorted(self.functions.items(), key=function_time, reverse=True):
+                for phase, measurement in phases.items():
+                    lines.append(f"{function_name:<24} {phase:<16} {measurement.time * 1000:>10.2f} {measurement.peak_memory / 1024:>18.1f}  {_counts(measurement)}")
+        return '\n'.join(lines)
+
+    @contextlib.contextmanager
+    def _measure(self, measurement: Measurement, exclusive: bool) -> Iterator[None]:
+        # the peak of allocated memory is reset for each measurement, the measurement around it takes the peak so far over
+        if self._running:
+            self._running[-1][1] = max(self._running[-1][1], self._peak_memory())
+        self._reset_peak_memory()
+        self._running.append([0.0, 0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested_time, peak_memory = self._running.pop()
+            peak_memory = max(peak_memory, self._peak_memory())
+            measurement.add(elapsed - nested_time if exclusive else elapsed, peak_memory)
+            if self._running:
+                self._running[-1][1] = max(self._running[-1][1], peak_memory)
+                if exclusive:
+                    self._running[-1][0] += elapsed
+
+    def _iterate(self, phase: str, iterable: Iterable, unit: str) -> Iterator:
+        # measured without a context for each item, the peak of allocated memory is the one of the phase consuming the items
+        measurement = self.phases.setdefault(phase, Measurement())
+        iterator = iter(iterable)
+        number_of_items = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                item = next(iterator, _END)
+                elapsed = time.perf_counter() - start
+                measurement.time += elapsed
+                if self._running:
+                    self._running[-1][0] += elapsed
+                if item is _END:
+                    return
+                number_of_items += 1
+                yield item
+        finally:
+            measurement.add(0, self._peak_memory())
+            measurement.count(**{unit: number_of_items})
+
+    def _peak_memory(self) -> int:
+        return tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+
+    def _reset_peak_memory(self):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+_DISABLED = contextlib.nullcontext()
+_END = object()
+
+def _counts(measurement: Measurement) -> str:
+    return ', '.join(f"{name}={count}" for name, count in measurement.counts.items())
@@ -7,48 +7,63 @@ class VariableTable():
         self.current_scope = None
         self.scope_ids: int = []
         self.current_scope_index = 0
-    
+        # enclosing scopes of the current scope and their ids, innermost last
+        self.scope_chain: list[dict[str, Variable]] = []
+        self.scope_chain_ids: list[str] = []
+        # flattened view of the scope chain filled by lookups, names missing in all scopes are cached as None
+        self.lookup_cache: dict[str, Variable|None] = {}
+
     def increase_scope(self):
         if self.current_scope_index == len(self.scope_ids):
             self.scope_ids.append(0)
         else:
             self.scope_ids[self.current_scope_index] += 1
 
+        scope_id = str(self.scope_ids[self.current_scope_index])
+        if self.scope_chain_ids:
+            scope_id = f"{self.scope_chain_ids[-1]}_{scope_id}"
         self.current_scope_index += 1
         self.current_scope = {}
-        self.scopes['_'.join(map(lambda x: str(x), self.scope_ids[:self.current_scope_index]))] = self.current_scope
-    
+        self.scopes[scope_id] = self.current_scope
+        self.scope_chain.append(self.current_scope)
+        self.scope_chain_ids.append(scope_id)
+
     def decrease_scope(self, function_name: str = None):
-        self.scopes['_'.join(map(lambda x: str(x), self.scope_ids[:self.current_scope_index]))] = self.current_scope
+        self.scope_chain.pop()
+        self.scope_chain_ids.pop()
         self.current_scope_index -= 1
-        self.current_scope = self.scopes['_'.join(map(lambda x: str(x), self.scope_ids[:self.current_scope_index]))]
+        self.current_scope = self.scope_chain[-1]
+        self.lookup_cache.clear()
 
     def add(self, variable: Variable):
         if variable.name in self.current_scope:
             raise Exception(f"Variable {variable.name} already exists.")
         self.current_scope[variable.name] = variable
-    
+        self.lookup_cache.pop(variable.name, None)
+
     def find(self, name: str) -> Variable:
-        for i in range(self.current_scope_index, 0, -1):
-            scope_id = '_'.join(map(lambda x: str(x), self.scope_ids[:i]))
-            if name in self.scopes[scope_id]:
-                return self.scopes[scope_id][name]
-            
-        return None
-    
+        if name in self.lookup_cache:
+            return self.lookup_cache[name]
+
+        variable = None
+        for scope in reversed(self.scope_chain):
+            if name in scope:
+                variable = scope[name]
+                break
+        self.lookup_cache[name] = variable
+        return variable
+
     def exists(self, name: str) -> bool:
-        for i in range(self.current_scope_index, 0, -1):
-            scope_id = '_'.join(map(lambda x: str(x), self.scope_ids[:i]))
-            if name in self.scopes[scope_id]:
-                return True
-            
-        return False
+        return self.find(name) is not None
 
     def reset_scope_counter(self):
         self.current_scope_index = 0
         for i in range(len(self.scope_ids)):
             self.scope_ids[i] = 0
-    
+        self.scope_chain = []
+        self.scope_chain_ids = []
+        self.lookup_cache.clear()
+
     def __str__(self) -> str:
         summary_string = ""
         indent = ""
@@ -58,4 +73,3 @@ class VariableTable():
             for variable in scope.values():
                 summary_string += f"{indent}{variable}\n"
         return summary_string
-    
\ No newline at end of file
@@ -1,13 +1,21 @@
 from io import TextIOWrapper
+import bisect
 import sys
+from enums import HighAssemblyInstructions, HighAssemblyDirectives
+from high_assembly import Instruction, parse_instruction, FUNCTION_LABELS
 
 class Writer():
-    def __init__(self, in_file: bool = True, in_memory: bool = False, output_file: TextIOWrapper|None = sys.stdout, indent: str = "   "):
+    def __init__(self, in_file: bool = True, in_memory: bool = False, output_file: TextIOWrapper|None = sys.stdout, indent: str = "   ", 
+                 buffered: bool = False, comments: bool = True):
         self.indent = indent
         self.output_file = output_file
         self.additional_indent = ""
         self.memory = []
         self.in_file = in_file
+        self.comments = comments
+        # buffered lines are joined and written by 'flush' at once instead of a print per line
+        self.buffer: list[str] = []
+        self.write_line = self.buffer.append if buffered else self._print_line
 
         if self.output_file == None and in_file:
             raise ValueError("Cannot write to file if no file is provided.")
@@ -50,49 +58,167 @@ class Writer():
     
     def new_line(self):
         if self.in_file and self.output_file != None:
-            print(file=self.output_file)
+            self.write_line("")
     
     def raw(self, text: str, comment: str = ""):
         self.raw_write_function(text, comment)
 
+    def write_lines(self, lines: list[str]):
+        # lines already formatted by another writer with the same options
+        if self.in_file and self.output_file != None:
+            for line in lines:
+                self.write_line(line)
+
     def retrieve_memory(self) -> list[str]:
         return self.memory
     
     def clear_memory(self):
         self.memory = []
+
+    def flush(self):
+        if self.buffer:
+            self.output_file.write('\n'.join(self.buffer))
+            self.output_file.write('\n')
+            self.buffer.clear()
     
     def _write_in_memory_instruction(self, instruction: str, comment: str):
         self.memory.append(f"{instruction} {'; ' + comment if comment else ''}")
 
     def _write_in_file_instruction(self, instruction: str, comment: str):
-        if not isinstance(comment, str):
-            comment = ""
-        padding = " " * ((40 - len(instruction + self.indent + self.additional_indent)) * (len(comment) > 0))
-        print(f"{self.additional_indent}{self.indent}{instruction}{padding}{'; ' + comment if comment else ''}", file=self.output_file)
+        self.write_line(self._format_instruction(instruction, comment, self.additional_indent))
+
+    def _format_instruction(self, instruction: str, comment: str, additional_indent: str) -> str:
+        if comment and self.comments and isinstance(comment, str):
+            return f"{f'{additional_indent}{self.indent}{instruction}':<40}; {comment}"
+        return f"{additional_indent}{self.indent}{instruction}"
     
     def _write_in_memory_label(self, label: str, comment: str):
         self.memory.append(f"{label}: {'; ' + comment if comment else ''}")
     
     def _write_in_file_label(self, label: str, comment: str):
-        if not isinstance(comment, str):
-            comment = ""
-        padding = " " * ((40 - len(label + self.additional_indent) - 1) * (len(comment) > 0))
-        print(f"{self.additional_indent}{label}:{padding}{'; ' + comment if comment else ''}", file=self.output_file)
+        if comment and self.comments and isinstance(comment, str):
+            self.write_line(f"{f'{self.additional_indent}{label}:':<40}; {comment}")
+        else:
+            self.write_line(f"{self.additional_indent}{label}:")
     
     def _write_in_memory_raw(self, text: str, comment: str):
         self.memory.append(f"{text} {'; ' + comment if comment else ''}")
     
     def _write_in_file_raw(self, text: str, comment: str):
-        if not isinstance(comment, str):
-            comment = ""
-        padding = " " * ((40 - len(text)) * (len(comment) > 0))
-        print(f"{text}{padding}{'; ' + comment if comment else ''}", file=self.output_file)
+        if comment and self.comments and isinstance(comment, str):
+            self.write_line(f"{text:<40}; {comment}")
+        else:
+            self.write_line(text)
     
     def _write_in_memory_comment(self, comment: str):
-        if isinstance(comment, str) and len(comment) > 0:
+        if self.comments and isinstance(comment, str) and len(comment) > 0:
             self.memory.append(f"; {comment}")
     
     def _write_in_file_comment(self, comment: str):
-        if isinstance(comment, str) and len(comment) > 0:
-            print(f"; {comment}", file=self.output_file)
-    
\ No newline at end of file
+        if self.comments and isinstance(comment, str) and len(comment) > 0:
+            self.write_line(f"; {comment}")
+
+    def _print_line(self, line: str):
+        print(line, file=self.output_file)
+    
+class HighAssemblyWriter(Writer):
+    # keeps the high assembly as instruction records, the text is only written when a file is requested
+    def __init__(self, in_file: bool = False, output_file: TextIOWrapper|None = None, indent: str = "   ", 
+                 buffered: bool = False, comments: bool = True):
+        super().__init__(in_file=in_file, in_memory=True, output_file=output_file, indent=indent, buffered=buffered, comments=comments)
+        # starts of the code of each function (name, index in memory, index in buffer), code before the first function has no name
+        self.section_starts: list[tuple[str|None, int, int]] = [(None, 0, 0)]
+        # lines in the buffer and their indentation of the instructions of the current section, which can still be patched or removed
+        self.patchable_lines: dict[Instruction, tuple[int, str]] = {}
+
+    def comment(self, comment: str):
+        if self.comments and isinstance(comment, str) and len(comment) > 0:
+            self.memory.append(Instruction(HighAssemblyDirectives.COMMENT, (), comment))
+            if self.in_file:
+                self._write_in_file_comment(comment)
+
+    def instruction(self, opcode: HighAssemblyInstructions, operands: tuple = (), comment: str = "", patchable: bool = False) -> Instruction:
+        instruction = Instruction(opcode, operands, comment)
+        self.memory.append(instruction)
+        if self.in_file:
+            if patchable:
+                self.patchable_lines[instruction] = (len(self.buffer), self.additional_indent)
+            self._write_in_file_instruction(str(instruction), comment)
+        return instruction
+
+    def patch(self, instruction: Instruction):
+        # writes the line of a patchable instruction again, after its operands or its comment were changed
+        if self.in_file:
+            line, additional_indent = self.patchable_lines[instruction]
+            self.buffer[line] = self._format_instruction(str(instruction), instruction.comment, additional_indent)
+
+    def remove(self, instructions: list[Instruction]):
+        # removes patchable instructions of the current section, the lines of the other patchable instructions move
+        _, memory_start, _ = self.section_starts[-1]
+        removed = set(instructions)
+        self.memory[memory_start:] = [instruction for instruction in self.memory[memory_start:] if instruction not in removed]
+        if self.in_file:
+            lines = sorted(self.patchable_lines.pop(instruction)[0] for instruction in instructions)
+            for line in reversed(lines):
+                del self.buffer[line]
+            for instruction, (line, additional_indent) in self.patchable_lines.items():
+                self.patchable_lines[instruction] = (line - bisect.bisect_left(lines, line), additional_indent)
+
+    def section_instructions(self) -> list[Instruction]:
+        # instructions of the current section, i.e. of the function being generated
+        return self.memory[self.section_starts[-1][1]:]
+
+    def label(self, label: str, comment: str = ""):
+        self.memory.append(Instruction(HighAssemblyDirectives.LABEL, (label,), comment))
+        if self.in_file:
+            self._write_in_file_label(label, comment)
+
+    def function_label(self, function_name: str, comment: str = ""):
+        self.start_section(function_name)
+        self.memory.append(Instruction(HighAssemblyDirectives.FUNCTION_LABEL, (function_name,), comment))
+        if self.in_file:
+            self._write_in_file_label(f"{HighAssemblyDirectives.FUNCTION_LABEL.value}{function_name}", comment)
+
+    def global_variable(self, name: str, value: int, comment: str = ""):
+        instruction = Instruction(HighAssemblyDirectives.GLOBAL_VARIABLE, (name, value), comment)
+        self.memory.append(instruction)
+        if self.in_file:
+            self._write_in_file_raw(str(instruction), comment)
+
+    def end_of_function(self, comment: str = ""):
+        self.memory.append(Instruction(HighAssemblyInstructions.EOF, (), comment))
+        if self.in_file:
+            self._write_in_file_raw(f"{HighAssemblyInstructions.EOF} ; {comment}" if comment and self.comments else f"{HighAssemblyInstructions.EOF}", "")
+
+    def raw(self, text: str, comment: str = ""):
+        # hand written high assembly, parsed to a record once
+        instruction = parse_instruction(f"{text} ; {comment}" if comment else text)
+        if not self.comments and instruction is not None:
+            if instruction.opcode == HighAssemblyDirectives.COMMENT:
+                return
+            instruction.comment = None
+            text = text.partition(';')[0].rstrip()
+        if instruction is not None:
+            if instruction.opcode in FUNCTION_LABELS:
+                self.start_section(instruction.operands[0])
+            self.memory.append(instruction)
+        if self.in_file:
+            self._write_in_file_raw(text, comment)
+
+    def start_section(self, function_name: str):
+        self.section_starts.append((function_name, len(self.memory), len(self.buffer)))
+        self.patchable_lines = {}
+
+    def sections(self) -> list[tuple[str|None, list[Instruction], list[str]]]:
+        # code split by functions, so the code of functions which are never called can be left out
+        ends = self.section_starts[1:] + [(None, len(self.memory), len(self.buffer))]
+        return [(name, self.memory[memory_start:memory_end], self.buffer[buffer_start:buffer_end]) 
+                for (name, memory_start, buffer_start), (_, memory_end, buffer_end) in zip(self.section_starts, ends)]
+
+    def extend(self, instructions: list[Instruction], lines: list[str]):
+        # appends high assembly generated by another writer with the same options, e.g. a cached library unit
+        self.memory.extend(instructions)
+        self.write_lines(lines)
+
+    def retrieve_memory(self) -> list[Instruction]:
+        return self.memory